@@ -0,0 +1,187 @@
+"""Crash recovery for SmartLab: a snapshot plus an append-only edit journal.
+
+The GUI thread hands AutosaveJournal the records of the items each edit
+touched; a background thread appends them to the journal file and keeps a
+mirror of the design built from the same records. Every so often the
+thread writes its mirror out as a snapshot (an ordinary project file) and
+starts the journal afresh, so the GUI thread's cost stays proportional to
+the edits however large the design is.
+
+Journal lines are either a full record that replaces any earlier one with
+the same key, or a drop of a key:
+
+    {"op": "put", "record": {"type": "component", "id": 7, ...}}
+    {"op": "drop", "type": "wire", "id": 12}
+
+Both are idempotent, so replaying a journal over a snapshot written after
+some of its lines is still correct.
+"""
+import json
+import os
+import queue
+import threading
+
+from project_file import read_project, write_project
+
+SNAPSHOT_NAME = "autosave.slab"
+JOURNAL_NAME = "autosave.journal"
+RECORD_ORDER = ("subcircuit", "component", "wire", "probe")  # Blocks, then parts, then the wires between them
+
+
+def _key(record, index):
+    return record['type'], record.get('id', index)
+
+
+def _ordered(state):
+    """Records in loading order, leaving out wires whose parts are gone"""
+    for kind in RECORD_ORDER:
+        for (record_type, _), record in state.items():
+            if record_type != kind:
+                continue
+            if kind == "wire" and (("component", record['from'][0]) not in state or
+                                   ("component", record['to'][0]) not in state):
+                continue
+            yield record
+
+
+def has_recovery(directory):
+    """True if directory holds autosave files left by a session that did not close"""
+    return any(os.path.exists(os.path.join(directory, name)) for name in (SNAPSHOT_NAME, JOURNAL_NAME))
+
+
+def recover(directory):
+    """Records of the design saved in directory: the snapshot with the journal replayed over it.
+
+    A journal line cut short by the crash is ignored, as is everything after it.
+    """
+    state = {}
+    snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+    if os.path.exists(snapshot_path):
+        for index, record in enumerate(read_project(snapshot_path)):
+            state[_key(record, index)] = record
+    journal_path = os.path.join(directory, JOURNAL_NAME)
+    if os.path.exists(journal_path):
+        decode = json.JSONDecoder().decode
+        with open(journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = decode(line)
+                except ValueError:
+                    break
+                if entry.get('op') == "put":
+                    state[_key(entry['record'], None)] = entry['record']
+                elif entry.get('op') == "drop":
+                    state.pop((entry['type'], entry['id']), None)
+    return list(_ordered(state))
+
+
+def discard(directory):
+    """Delete the autosave files in directory"""
+    for name in (SNAPSHOT_NAME, JOURNAL_NAME):
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+class AutosaveJournal:
+    """Background writer of the autosave snapshot and journal in one directory.
+
+    All methods are called from the GUI thread and only queue work; records
+    passed in must not be changed afterwards. compact_every is the number of
+    journal lines after which the snapshot is rewritten.
+    """
+
+    def __init__(self, directory, compact_every=5000):
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+        self.journal_path = os.path.join(directory, JOURNAL_NAME)
+        self.compact_every = compact_every
+        self.error = None  # Last write failure, if any; the journal keeps trying
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    def reset(self, records):
+        """Make records the whole design, e.g. after opening a project"""
+        self._queue.put(("reset", records))
+
+    def put(self, records):
+        """Store the current state of added or changed items"""
+        if records:
+            self._queue.put(("put", records))
+
+    def drop(self, keys):
+        """Forget removed items, given as (record type, id) pairs"""
+        if keys:
+            self._queue.put(("drop", keys))
+
+    def close(self, keep_files=False):
+        """Finish pending writes and stop; the files are deleted unless keep_files"""
+        if self._thread is None:
+            return
+        self._queue.put(("close", keep_files))
+        self._thread.join()
+        self._thread = None
+
+    # Writer thread
+
+    def _run(self):
+        state = {}
+        journal = None
+        lines = 0  # Journal lines since the last snapshot
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                for op, payload in batch:
+                    if op == "close":
+                        if journal is not None:
+                            journal.close()
+                        if not payload:
+                            discard(self.directory)
+                        return
+                    if op == "reset":
+                        state = {_key(record, index): record for index, record in enumerate(payload)}
+                        journal = self._compact(state, journal)
+                        lines = 0
+                        continue
+                    if journal is None:
+                        journal = self._compact(state, journal)
+                    if op == "put":
+                        for record in payload:
+                            state[_key(record, None)] = record
+                            journal.write(json.dumps({"op": "put", "record": record},
+                                                     ensure_ascii=False, separators=(",", ":")) + "\n")
+                    else:
+                        for record_type, record_id in payload:
+                            state.pop((record_type, record_id), None)
+                            journal.write(json.dumps({"op": "drop", "type": record_type, "id": record_id}) + "\n")
+                    lines += len(payload)
+                if journal is not None:
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                if lines >= self.compact_every:
+                    journal = self._compact(state, journal)
+                    lines = 0
+                self.error = None
+            except (OSError, ValueError) as e:
+                self.error = e
+                if journal is not None:
+                    journal.close()
+                journal = None  # Start over from a fresh snapshot on the next write
+
+    def _compact(self, state, journal):
+        """Write the mirrored design as the snapshot and start an empty journal"""
+        if journal is not None:
+            journal.close()
+        write_project(self.snapshot_path, _ordered(state))
+        return open(self.journal_path, "w", encoding="utf-8", newline="\n")
@@ -0,0 +1,446 @@
+"""Performance benchmarks for SmartLab's hot paths, with synthetic circuits.
+
+Circuits are generated as SPICE cards, so one description feeds both the
+simulator (CircuitSimulator.from_netlist) and a placed schematic
+(CircuitCanvas.import_netlist):
+
+    ladder       a source driving series resistors with shunt capacitors
+    mesh         a square grid of resistors fed across its diagonal
+    random_rc    a connected random graph of resistors and capacitors
+    random_rlc   the same with inductors as well
+
+Each benchmark is timed at several sizes so scaling curves can be compared
+between versions:
+
+    python benchmark.py --output before.json
+    python benchmark.py --output after.json --compare before.json
+
+Qt runs offscreen unless QT_QPA_PLATFORM says otherwise. The benchmarks use
+a bare CircuitCanvas rather than the SmartLab window, so no autosave
+journal is opened and an interrupted run never leaves files behind that
+would ask about recovery the next time SmartLab starts.
+
+Each size of a benchmark that builds Qt items runs in a process of its
+own, so no run inherits another's scene and a crash costs one result.
+Sizes whose process fails are listed under "failures" in the JSON and the
+rest of the suite goes on. PySide6 6.12.0 needs this: its bindings drop a
+reference to None on every call that returns None, and Python aborts
+with "none_dealloc" within a few hundred placed parts. Every size
+completes on 6.11.2:
+
+    pip install "PySide6==6.11.2"
+"""
+import argparse
+import gc
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+import PySide6
+from PySide6.QtCore import QEvent, QPointF, Qt
+from PySide6.QtGui import QMouseEvent
+from PySide6.QtWidgets import QApplication
+
+from spectral import calculate_fft
+from spice import VALUE_PROPERTIES, Card, card_line, format_value
+from smartlab import CircuitCanvas, ComponentItem, EnhancedCircuitSimulator, WaveformView
+
+RESULTS_VERSION = 1
+BROKEN_PYSIDE6 = ("6.12.0",)          # Releases that abort large runs, see above
+CIRCUIT_SIZES = (10, 100, 1000)       # Parts in each generated circuit
+# Laid out in card order, a random net's wires route across the whole
+# sheet; 1000 random parts take over a minute to place
+RANDOM_SCHEMATIC_SIZES = (10, 100, 300)
+# The DC solver goes further on ladders and meshes; a 20000 part mesh has 10000 nodes
+SOLVER_SIZES = (10, 100, 1_000, 10_000, 20_000)
+SAMPLE_SIZES = (1_000, 10_000, 100_000, 1_000_000)  # Samples per trace or FFT
+SIMULATION = (0.1, 0.001)             # Duration and step of every simulate() call
+PLOT_TRACES = 9                       # Parts of the ladder behind the plot update, one trace each
+
+# Ranges of part values, as powers of ten, in the random networks
+VALUE_DECADES = {"Resistor": (1, 5), "Capacitor": (-9, -5), "Inductor": (-6, -2)}
+
+
+# Circuit generators: each returns a list of spice Cards with about n parts
+
+def _card(name, component, nodes, value):
+    return Card(name, component, tuple(nodes), {VALUE_PROPERTIES[component]: format_value(value)})
+
+
+def ladder(n):
+    """RC ladder: V1 feeding n/2 sections of series R and shunt C"""
+    cards = [_card("V1", "Battery", ("n0", "0"), 10)]
+    for k in range(1, max(1, (n - 1) // 2) + 1):
+        cards.append(_card(f"R{k}", "Resistor", (f"n{k - 1}", f"n{k}"), 1e3))
+        cards.append(_card(f"C{k}", "Capacitor", (f"n{k}", "0"), 1e-6))
+    return cards
+
+
+def mesh(n):
+    """Square grid of 1k resistors with V1 across the corners"""
+    side = max(2, round(math.sqrt(n / 2)) + 1)
+
+    def node(row, column):
+        return "0" if (row, column) == (side - 1, side - 1) else f"n{row}_{column}"
+
+    cards = [_card("V1", "Battery", (node(0, 0), "0"), 10)]
+    for row in range(side):
+        for column in range(side):
+            if column + 1 < side:
+                cards.append(_card(f"R{len(cards)}", "Resistor", (node(row, column), node(row, column + 1)), 1e3))
+            if row + 1 < side:
+                cards.append(_card(f"R{len(cards)}", "Resistor", (node(row, column), node(row + 1, column)), 1e3))
+    return cards
+
+
+def random_network(n, kinds=("Resistor", "Capacitor"), seed=None):
+    """Connected random graph of n parts of the given kinds on n/2 nodes, plus V1.
+
+    Inductors, shorts at DC, only go on branches of the spanning tree other
+    than the one across V1, so they never close a loop and the circuit
+    always has a DC solution. The same n and seed always give the same circuit.
+    """
+    rng = random.Random(n if seed is None else seed)
+    nodes = ["0"] + [f"n{k}" for k in range(1, max(2, n // 2))]
+    # A spanning tree first, so every node is reached, then random extra branches
+    pairs = [(nodes[k], nodes[rng.randrange(k)]) for k in range(1, len(nodes))]
+    tree = len(pairs)
+    while len(pairs) < n - 1:
+        a, b = rng.sample(nodes, 2)
+        pairs.append((a, b))
+    loop_kinds = [kind for kind in kinds if kind != "Inductor"] or ["Resistor"]
+    cards = [_card("V1", "Battery", (nodes[1], "0"), 10)]
+    for k, pair in enumerate(pairs, 1):
+        kind = rng.choice(kinds if 1 < k <= tree else loop_kinds)
+        low, high = VALUE_DECADES[kind]
+        cards.append(_card(f"{kind[0]}{k}", kind, pair, 10 ** rng.uniform(low, high)))
+    return cards
+
+
+def random_rc(n):
+    return random_network(n, ("Resistor", "Capacitor"))
+
+
+def random_rlc(n):
+    return random_network(n, ("Resistor", "Capacitor", "Inductor"))
+
+
+GENERATORS = {"ladder": ladder, "mesh": mesh, "random_rc": random_rc, "random_rlc": random_rlc}
+
+
+def netlist_lines(cards, title="benchmark circuit"):
+    """Cards as the lines of a SPICE netlist"""
+    return [title] + [card_line(card) for card in cards] + [".end"]
+
+
+# Benchmarks: each takes a case and a size, does its setup and returns the
+# function to time
+
+def _simulator(lines):
+    return EnhancedCircuitSimulator.from_netlist(lines)
+
+
+def _placed(lines):
+    canvas = CircuitCanvas()
+    canvas.resize(1200, 800)
+    canvas.show()
+    canvas.import_netlist(lines)
+    return canvas
+
+
+def bench_simulate(case, size):
+    simulator = _simulator(netlist_lines(GENERATORS[case](size)))
+    return lambda: simulator.simulate(*SIMULATION)
+
+
+def bench_operating_point(case, size):
+    """A solve from scratch, ordering and symbolic analysis included"""
+    simulator = _simulator(netlist_lines(GENERATORS[case](size)))
+
+    def solve():
+        simulator.dc_system = None
+        return simulator.operating_point()
+    return solve
+
+
+def bench_dc_sweep(case, size):
+    """One step of a sweep of the first resistor: restamp, numeric refactorization and solve"""
+    simulator = _simulator(netlist_lines(GENERATORS[case](size)))
+    resistor = next(component_id for component_id, component in simulator.components.items()
+                    if component['type'] == "Resistor")
+    values = itertools.cycle((1e3, 2e3))
+
+    def step():
+        simulator.add_component(resistor, "Resistor", next(values))
+        return simulator.operating_point()
+    return step
+
+
+def bench_prepare_simulation(case, size):
+    return _placed(netlist_lines(GENERATORS[case](size))).prepareSimulation
+
+
+def bench_validate_circuit(case, size):
+    return _placed(netlist_lines(GENERATORS[case](size))).validateCircuit
+
+
+def bench_import_netlist(case, size):
+    canvas = CircuitCanvas()
+    lines = netlist_lines(GENERATORS[case](size))
+    return lambda: canvas.import_netlist(lines)
+
+
+def bench_load_records(case, size):
+    canvas = _placed(netlist_lines(GENERATORS[case](size)))
+    records = list(canvas.project_records())  # Wires keep their routes, as in a saved project
+    return lambda: canvas.load_records(records, "benchmark")
+
+
+def bench_pin_hit_test(case, size, moves=40):
+    """One wire-drawing gesture: press on a pin, drag across the row, release on empty space"""
+    canvas = _placed(netlist_lines(GENERATORS[case](size)))
+    parts = [item for item in canvas.scene.items(Qt.AscendingOrder) if isinstance(item, ComponentItem)]
+    start = parts[len(parts) // 2].scene_pin(0)
+    canvas.centerOn(start)
+    path = [start + QPointF(step * 5, 0) for step in range(moves)]
+    path.append(start + QPointF(0, canvas.NETLIST_SPACING[1] / 2))  # Between rows, near no pin
+
+    def event(kind, scene_pos):
+        pos = QPointF(canvas.mapFromScene(scene_pos))
+        return QMouseEvent(kind, pos, QPointF(canvas.viewport().mapToGlobal(pos.toPoint())),
+                           Qt.LeftButton, Qt.LeftButton, Qt.NoModifier)
+
+    press = event(QEvent.MouseButtonPress, start)
+    drags = [event(QEvent.MouseMove, pos) for pos in path]
+    release = event(QEvent.MouseButtonRelease, path[-1])
+
+    def gesture():
+        canvas.wire_mode = True
+        canvas.mousePressEvent(press)
+        for drag in drags:
+            canvas.mouseMoveEvent(drag)
+        canvas.mouseReleaseEvent(release)
+    return gesture
+
+
+def bench_calculate_fft(case, size):
+    signal = np.random.default_rng(size).standard_normal(size)
+    return lambda: calculate_fft(signal, 1e4, case)
+
+
+def _plot_update(view, size):
+    """The voltage plot update of the live results dialog, over traces of size samples"""
+    canvas = CircuitCanvas()
+    cards = ladder(PLOT_TRACES)
+    step = SIMULATION[0] / size
+    canvas.simulator = _simulator(netlist_lines(cards))
+    canvas.simulator.time_step = step
+    canvas.simulator.simulate(SIMULATION[0], step)
+    canvas.simulator.current_time = SIMULATION[0]
+    view.resize(800, 500)
+    view.show()
+    QApplication.processEvents()  # Until the window is exposed, repaint() draws nothing
+    view.setup_plot("Voltage vs. Time", "Time (s)", "Voltage (V)")
+    return lambda: view.draw_traces(canvas._live_traces('voltage'), message="No data available")
+
+
+def bench_plot_update(case, size):
+    if case == "native":
+        view = WaveformView()
+        update = _plot_update(view, size)
+
+        def frame():
+            update()
+            view.repaint()
+        return frame
+    from matplotlib_canvas import AnimatedMatplotlibCanvas
+    view = AnimatedMatplotlibCanvas(None, width=8, height=5, dpi=100)
+    update = _plot_update(view, size)
+
+    def frame():
+        update()
+        view.draw()  # draw_traces only schedules a draw
+    return frame
+
+
+CIRCUITS = {case: CIRCUIT_SIZES for case in GENERATORS}
+SOLVER_CIRCUITS = dict(CIRCUITS, ladder=SOLVER_SIZES, mesh=SOLVER_SIZES)
+SCHEMATICS = {"ladder": CIRCUIT_SIZES, "mesh": CIRCUIT_SIZES, "random_rc": RANDOM_SCHEMATIC_SIZES}
+# name -> (benchmark, {case: sizes})
+BENCHMARKS = {
+    "simulate": (bench_simulate, CIRCUITS),
+    "operating_point": (bench_operating_point, SOLVER_CIRCUITS),
+    "dc_sweep": (bench_dc_sweep, SOLVER_CIRCUITS),
+    "prepare_simulation": (bench_prepare_simulation, SCHEMATICS),
+    "validate_circuit": (bench_validate_circuit, SCHEMATICS),
+    "pin_hit_test": (bench_pin_hit_test, SCHEMATICS),
+    "import_netlist": (bench_import_netlist, SCHEMATICS),
+    "load_records": (bench_load_records, SCHEMATICS),
+    "calculate_fft": (bench_calculate_fft, {"Hann": SAMPLE_SIZES, "Flat Top": SAMPLE_SIZES}),
+    "plot_update": (bench_plot_update, {"native": SAMPLE_SIZES, "matplotlib": SAMPLE_SIZES}),
+}
+# Benchmarks that build Qt items; each of their sizes runs in a fresh process
+ISOLATED = {"prepare_simulation", "validate_circuit", "pin_hit_test", "import_netlist", "load_records",
+            "plot_update"}
+
+
+def measure(function, repeat, budget):
+    """Seconds taken by each of up to repeat calls, after one untimed warm-up call.
+
+    Timing stops early once the calls so far, warm-up included, took budget
+    seconds; at least one call is always timed.
+    """
+    start = time.perf_counter()
+    function()
+    spent = time.perf_counter() - start
+    times = []
+    while len(times) < repeat and (not times or spent < budget):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+        spent += times[-1]
+    return times
+
+
+def run_one(name, case, size, repeat, budget):
+    """Result record of one benchmark at one size, timed in this process"""
+    benchmark, _ = BENCHMARKS[name]
+    function = benchmark(case, size)
+    times = measure(function, repeat, budget)
+    del function
+    gc.collect()
+    return {"benchmark": name, "case": case, "size": size, "times": times,
+            "min": min(times), "median": statistics.median(times)}
+
+
+def run_isolated(name, case, size, repeat, budget):
+    """run_one in a fresh process; a failed run gives a record with an error instead of times"""
+    command = [sys.executable, os.path.abspath(__file__), "--single", name, case, str(size),
+               "--repeat", str(repeat), "--budget", str(budget)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    lines = completed.stdout.splitlines()
+    if lines:
+        try:
+            return json.loads(lines[-1])  # Printed once timed, even if the process then crashes on exit
+        except ValueError:
+            pass
+    errors = [line for line in completed.stderr.splitlines() if line.strip()]
+    error = next((line for line in errors if line.startswith("Fatal Python error")),
+                 errors[-1] if errors else f"exit status {completed.returncode}")
+    return {"benchmark": name, "case": case, "size": size, "error": error}
+
+
+def run(names, repeat, budget, max_size=None, log=None):
+    """Time the named benchmarks; returns result records in run order.
+
+    Records of sizes that failed in their own process have an error in
+    place of times.
+    """
+    results = []
+    for name in names:
+        _, cases = BENCHMARKS[name]
+        for case, sizes in cases.items():
+            for size in sizes:
+                if max_size is not None and size > max_size:
+                    continue
+                timer = run_isolated if name in ISOLATED else run_one
+                result = timer(name, case, size, repeat, budget)
+                results.append(result)
+                if log is not None:
+                    log(result)
+    return results
+
+
+def environment():
+    """What the results were measured on"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pyside6": PySide6.__version__,
+        "qt_platform": QApplication.platformName(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def _key(result):
+    return result["benchmark"], result["case"], result["size"]
+
+
+def format_result(result, baseline=None):
+    line = f"{result['benchmark']:<20} {result['case']:<11} {result['size']:>9}  "
+    if "error" in result:
+        return line + f"failed: {result['error']}"
+    line += f"min {result['min'] * 1000:10.3f} ms  median {result['median'] * 1000:10.3f} ms"
+    old = baseline.get(_key(result)) if baseline else None
+    if old is not None:
+        line += f"  {result['min'] / old['min']:6.2f}x of {old['min'] * 1000:.3f} ms"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", help="Comma separated benchmarks to run (default: all of "
+                                       f"{', '.join(BENCHMARKS)})")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per size (default: 5)")
+    parser.add_argument("--budget", type=float, default=5.0,
+                        help="Seconds after which a size stops being repeated (default: 5)")
+    parser.add_argument("--max-size", type=int, default=None, help="Skip sizes above this")
+    parser.add_argument("--output", help="Write the results as JSON to this file, or - for stdout")
+    parser.add_argument("--compare", help="JSON results of an earlier run to show ratios against")
+    parser.add_argument("--single", nargs=3, metavar=("BENCHMARK", "CASE", "SIZE"),
+                        help=argparse.SUPPRESS)  # One isolated size; prints its record as JSON
+    args = parser.parse_args(argv)
+    if args.single:
+        name, case, size = args.single
+        _app = QApplication.instance() or QApplication(sys.argv[:1])
+        print(json.dumps(run_one(name, case, int(size), args.repeat, args.budget)), flush=True)
+        return 0
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+    if PySide6.__version__ in BROKEN_PYSIDE6:
+        print(f"warning: PySide6 {PySide6.__version__} leaks references to None, so larger schematic "
+              "sizes fail; every size completes on PySide6 6.11.2", file=sys.stderr)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {_key(result): result for result in json.load(f)["results"]}
+
+    _app = QApplication.instance() or QApplication(sys.argv[:1])  # Kept alive until the run ends
+    # With the JSON on stdout, the readable lines go to stderr
+    stream = sys.stderr if args.output == "-" else sys.stdout
+    results = run(names, args.repeat, args.budget, args.max_size,
+                  lambda result: print(format_result(result, baseline), file=stream, flush=True))
+    document = {"version": RESULTS_VERSION, "environment": environment(), "repeat": args.repeat,
+                "budget": args.budget, "results": [result for result in results if "error" not in result],
+                "failures": [result for result in results if "error" in result]}
+    if args.output == "-":
+        json.dump(document, sys.stdout, indent=1)
+        print()
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=1)
+    return 1 if document["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Component types and their typed parameters.
+
+Every type SmartLab knows is described once here: its symbol, pin count and
+parameters. A parameter has a property label, a field name and a kind:
+numbers are written in engineering notation (4.7k, 10u, 2.2Meg), choices
+come from a fixed list, text is free and fixed text is shown but not
+edited. A component keeps its properties as display text for the editor
+and project files, and a parsed record of them that the simulator reads:
+
+    COMPONENT_TYPES["Resistor"].parse({"Resistance (Ω)": "4.7k"}).resistance  -> 4700.0
+
+Records are built once per edit and never changed afterwards, so parts left
+at their defaults all share their type's default record and properties.
+"""
+from operator import attrgetter
+from types import MappingProxyType
+
+from nodal import SUBCIRCUIT
+from spice import parse_value
+
+NUMBER = "number"
+CHOICE = "choice"
+TEXT = "text"
+FIXED = "fixed"
+
+
+class Parameter:
+    """One component property: label shown to the user, record field, kind and default text"""
+    __slots__ = ("label", "field", "kind", "default", "choices")
+
+    def __init__(self, label, field, kind=NUMBER, default="", choices=()):
+        self.label = label
+        self.field = field
+        self.kind = kind
+        self.default = default
+        self.choices = tuple(choices)
+
+    def parse(self, text):
+        """Typed value of property text; raises ValueError for a number that does not parse"""
+        if self.kind != NUMBER:
+            return text
+        value = parse_value(str(text).strip())
+        if value is None:
+            raise ValueError(f"{self.label}: '{text}' is not a number")
+        return value
+
+
+class ParameterValues:
+    """Base of the parsed parameter records; each type adds a slot per parameter.
+
+    value is the parameter the simulator uses for the type, or 0.0 when it has none.
+    """
+    __slots__ = ()
+    value = 0.0
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class ComponentType:
+    """Symbol, pin count and parameters of a kind of component.
+
+    value names the field the simulator reads as the part's value.
+    """
+    __slots__ = ("name", "symbol", "pins", "parameters", "defaults", "record", "default_values")
+
+    def __init__(self, name, symbol, pins, parameters, value=None):
+        self.name = name
+        self.symbol = symbol
+        self.pins = pins
+        self.parameters = {parameter.label: parameter for parameter in parameters}
+        self.defaults = MappingProxyType({parameter.label: parameter.default for parameter in parameters})
+        namespace = {"__slots__": tuple(parameter.field for parameter in parameters)}
+        if value is not None:
+            namespace["value"] = property(attrgetter(value))
+        self.record = type(f"{name.replace(' ', '')}Values", (ParameterValues,), namespace)
+        self.default_values = None
+        self.default_values = self.parse(self.defaults)
+
+    def parse(self, properties):
+        """Parameter record for property texts; missing ones take their defaults, unknown ones are ignored"""
+        if properties == self.defaults and self.default_values is not None:
+            return self.default_values
+        record = self.record()
+        for label, parameter in self.parameters.items():
+            setattr(record, parameter.field, parameter.parse(properties.get(label, parameter.default)))
+        return record
+
+
+def _number(label, field, default):
+    return Parameter(label, field, NUMBER, default)
+
+
+def _choice(label, field, choices):
+    return Parameter(label, field, CHOICE, choices[0], choices)
+
+
+# The parts in the component library, in the order listed there
+LIBRARY_TYPES = (
+    ComponentType("Resistor", "R", 2, (
+        _number("Resistance (Ω)", "resistance", "1000"),
+        _number("Power (W)", "power", "0.25"),
+        _number("Tolerance (%)", "tolerance", "5"),
+    ), value="resistance"),
+    ComponentType("Capacitor", "C", 2, (
+        _number("Capacitance (F)", "capacitance", "0.000001"),
+        _number("Voltage Rating (V)", "voltage_rating", "25"),
+        _choice("Type", "dielectric", ("Ceramic", "Electrolytic", "Tantalum", "Film")),
+    ), value="capacitance"),
+    ComponentType("Inductor", "L", 2, (
+        _number("Inductance (H)", "inductance", "0.001"),
+        _number("Current Rating (A)", "current_rating", "1.0"),
+    ), value="inductance"),
+    ComponentType("Battery", "V", 2, (
+        _number("Voltage (V)", "voltage", "9.0"),
+        _choice("Type", "source", ("DC", "AC")),
+    ), value="voltage"),
+    ComponentType("LED", "LED", 2, (
+        _number("Forward Voltage (V)", "forward_voltage", "2.0"),
+        _number("Current (mA)", "current", "20"),
+        _choice("Color", "color", ("Red", "Green", "Blue", "Yellow", "White", "RGB")),
+    ), value="forward_voltage"),
+    ComponentType("Transistor", "T", 3, (
+        _choice("Type", "polarity", ("NPN", "PNP", "MOSFET-N", "MOSFET-P")),
+        _number("Gain (hFE)", "gain", "100"),
+        _number("Vce max (V)", "vce_max", "40"),
+    )),
+    ComponentType("Diode", "D", 2, (
+        _number("Forward Voltage (V)", "forward_voltage", "0.7"),
+        _number("Current (mA)", "current", "100"),
+    )),
+    ComponentType("Switch", "SW", 2, (
+        _choice("Type", "poles", ("SPST", "SPDT", "DPST", "DPDT")),
+        _number("Current Rating (A)", "current_rating", "1.0"),
+    )),
+    ComponentType("Potentiometer", "POT", 3, (
+        _number("Resistance (Ω)", "resistance", "10000"),
+        _number("Power (W)", "power", "0.5"),
+    )),
+    ComponentType("IC", "IC", 4, (
+        _choice("Type", "function", ("Op-Amp", "Microcontroller", "Logic Gate", "Timer")),
+        Parameter("Supply Voltage (V)", "supply", TEXT, "±15"),
+    )),
+)
+
+COMPONENT_TYPES = {component_type.name: component_type for component_type in LIBRARY_TYPES}
+# Symbol and pin count of a block instance come from its definition
+COMPONENT_TYPES[SUBCIRCUIT] = ComponentType(SUBCIRCUIT, "X", 0, (
+    Parameter("Subcircuit", "block", FIXED),
+))
+
+_untyped = {}  # Types met in files or netlists but not described above, by name
+
+
+def component_type(name):
+    """The registered type called name; an unknown name gets a type with no parameters"""
+    found = COMPONENT_TYPES.get(name)
+    if found is None:
+        found = _untyped.get(name)
+        if found is None:
+            found = _untyped[name] = ComponentType(name, name[:3], 2, ())
+    return found
@@ -0,0 +1,104 @@
+"""Matplotlib plot widgets for SmartLab's results dialogs and live instruments.
+
+Importing matplotlib's Qt backend takes longer than starting the rest of
+the application, so smartlab.py imports this module only when a plot is
+first shown.
+"""
+from matplotlib.animation import FuncAnimation
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
+from matplotlib.figure import Figure
+
+from perf_trace import TRACE
+
+
+class MatplotlibCanvas(FigureCanvasQTAgg):
+    """Canvas for displaying matplotlib plots in Qt"""
+    def __init__(self, parent=None, width=5, height=4, dpi=100):
+        self.fig = Figure(figsize=(width, height), dpi=dpi)
+        self.axes = self.fig.add_subplot(111)
+        super().__init__(self.fig)
+        self.setParent(parent)
+
+    def draw(self):
+        with TRACE.span("matplotlib draw", "plot"):
+            super().draw()
+
+# Fix the animation warning by adding save_count parameter in AnimatedMatplotlibCanvas class
+class AnimatedMatplotlibCanvas(MatplotlibCanvas):
+    """Enhanced matplotlib canvas with animation support"""
+    def __init__(self, parent=None, width=5, height=4, dpi=100):
+        super().__init__(parent, width, height, dpi)
+        self.animations = []
+        self.toolbar = NavigationToolbar2QT(self, parent)
+        
+    def setup_plot(self, title, xlabel, ylabel):
+        """Setup the plot with appropriate labels and styling"""
+        if getattr(self, 'plot_labels', None) == (title, xlabel, ylabel):
+            return
+        self.plot_labels = (title, xlabel, ylabel)
+        self.axes.set_title(title)
+        self.axes.set_xlabel(xlabel)
+        self.axes.set_ylabel(ylabel)
+        self.axes.grid(True, linestyle='--', alpha=0.7)
+        self.fig.tight_layout()
+        
+    def start_animation(self, update_func, interval=50):
+        """Start a matplotlib animation"""
+        # Add save_count parameter to fix the warning
+        anim = FuncAnimation(self.fig, update_func, interval=interval, blit=False, 
+                             save_count=100)  # Limit frames cached to 100
+        self.animations.append(anim)
+        return anim
+        
+    def clear_animations(self):
+        """Clear all animations"""
+        for anim in self.animations:
+            anim.event_source.stop()
+        self.animations.clear()
+        
+    def reset_plot(self):
+        """Clear the plot and reset to initial state"""
+        self.clear_animations()
+        self.axes.clear()
+        self.draw()
+
+    def draw_traces(self, traces, markers=(), xlim=None, ylim=None, message=None, xy=False):
+        """Draw one frame of (label, x, y, color) traces and (x, y, text, color) markers"""
+        title, xlabel, ylabel = getattr(self, 'plot_labels', ("", "", ""))
+        self.axes.clear()
+        self.axes.set_title(title)
+        self.axes.set_xlabel(xlabel)
+        self.axes.set_ylabel(ylabel)
+        self.axes.grid(True, linestyle='--', alpha=0.7)
+        
+        for label, x, y, color in traces:
+            self.axes.plot(x, y, color=color, label=label, linewidth=1.5)
+
+        for x, y, text, color in markers:
+            if y is None:
+                # Vertical marker line (trigger, peak frequency...)
+                self.axes.axvline(x=x, color=color, linestyle='--', alpha=0.8, linewidth=1.5)
+                if text:
+                    self.axes.text(x, self.axes.get_ylim()[1] * 0.95, text,
+                                   color=color, fontweight='bold', ha='center')
+            else:
+                self.axes.plot(x, y, 'o', color=color, markersize=6)
+                if text:
+                    self.axes.text(x, y, f"  {text}", va='center', color=color)
+
+        if xlim is not None:
+            self.axes.set_xlim(*xlim)
+        if ylim is not None:
+            self.axes.set_ylim(*ylim)
+
+        if traces:
+            self.axes.legend(loc='upper right', framealpha=0.7)
+        elif message:
+            self.axes.text(0.5, 0.5, message, ha='center', va='center',
+                           transform=self.axes.transAxes, fontsize=12, color='gray')
+        self.draw_idle()
+
+    def refresh(self):
+        """Force the running animations to produce a new frame"""
+        for anim in self.animations:
+            anim.event_source.start()
@@ -0,0 +1,411 @@
+"""DC operating point by modified nodal analysis, with hierarchical subcircuits.
+
+A circuit is a mapping of part ids to (type, value) pairs plus the wires
+between their pins, each pin being an (id, pin index) pair. Resistors
+conduct, batteries are ideal sources and an inductor is a short at DC;
+capacitors and the nonlinear parts (diodes, LEDs, transistors) add
+nothing, so a node they alone reach is held only by GMIN.
+
+A subcircuit instance has type SUBCIRCUIT and a SubcircuitDefinition as its
+value. Its inner nodes are eliminated once per definition (a Schur
+complement, or Kron reduction), leaving a small Norton equivalent at the
+ports that every instance stamps as is. A board of many identical channels
+is therefore solved over its top-level nodes only.
+
+Batteries, inductors and shorts fix the voltage between their pins, so
+every tree of them merges its nodes into a supernode whose members sit at
+fixed offsets from one another. What remains is a symmetric positive
+definite system over the supernodes, solved sparse (see sparse_cholesky).
+A DCSystem keeps that analysis for one topology, so solving again with
+new part values only refactors the matrix numerically.
+"""
+from functools import partial
+
+import numpy as np
+
+from sparse_cholesky import SymmetricPattern
+
+SUBCIRCUIT = "Subcircuit"
+GMIN = 1e-12  # Siemens from every node to ground, so a node no part holds is not singular
+
+
+class CircuitError(ValueError):
+    """Raised for a circuit with no unique DC solution, such as a loop of batteries"""
+
+
+class SubcircuitDefinition:
+    """A reusable block of parts with some of their pins brought out as ports.
+
+    components is a list of (type, value) pairs; a nested block has type
+    SUBCIRCUIT and its definition as value. connections are pairs of
+    (index, pin) and ports lists the (index, pin) behind each port, in port
+    order. A definition is not changed once made, so its reduction is
+    computed on first use and shared by every instance.
+    """
+
+    def __init__(self, name, components, connections, ports):
+        self.name = name
+        self.components = [tuple(component) for component in components]
+        self.connections = [(tuple(a), tuple(b)) for a, b in connections]
+        self.ports = [tuple(port) for port in ports]
+        self._reduced = None
+
+    def __str__(self):
+        return self.name
+
+    def reduced(self):
+        """The block's ReducedStamp, worked out the first time it is asked for"""
+        if self._reduced is None:
+            self._reduced = ReducedStamp(self)
+        return self._reduced
+
+
+def _model(kind, value):
+    """DC model of a part: ("g", siemens), ("v", volts), ("stamp", ReducedStamp) or None if open"""
+    if kind == SUBCIRCUIT:
+        return "stamp", value.reduced()
+    if kind == "Resistor":
+        resistance = float(value)
+        return ("g", 1.0 / resistance) if resistance else ("v", 0.0)
+    if kind == "Battery":
+        return "v", float(value)
+    if kind == "Inductor":
+        return "v", 0.0
+    return None
+
+
+class _Equations:
+    """MNA system A x = b for a set of parts, A stamped as coordinates (COO).
+
+    Unknowns are the node voltages, then the current flowing into pin 0 of
+    each voltage source. Pins joined by wires share a node; extra_pins are
+    given nodes even if no part or wire uses them. Entry k of values is
+    added at (rows[k], cols[k]); stamp() gives the values and b again for
+    new part models on the same topology.
+    """
+
+    def __init__(self, components, connections, extra_pins=()):
+        parent = {}
+
+        def find(pin):
+            root = parent.setdefault(pin, pin)
+            while root != parent[root]:
+                root = parent[root]
+            while pin != root:
+                parent[pin], pin = root, parent[pin]
+            return root
+
+        models = {}
+        for cid, (kind, value) in components.items():
+            model = models[cid] = _model(kind, value)
+            if model is None:
+                continue
+            if model[0] == "stamp":
+                for port in range(model[1].port_count):
+                    find((cid, port))
+                for port, other in model[1].shorted:
+                    parent[find((cid, other))] = find((cid, port))
+            else:
+                find((cid, 0))
+                find((cid, 1))
+        for a, b in connections:
+            parent[find(a)] = find(b)
+        for pin in extra_pins:
+            find(pin)
+
+        roots = {}
+        self.node_of = {pin: roots.setdefault(find(pin), len(roots)) for pin in list(parent)}
+        self.node_count = n = len(roots)
+        kinds = {"g": [], "v": [], "stamp": []}
+        for cid, model in models.items():
+            if model is not None:
+                kinds[model[0]].append(cid)
+        self.conductors, self.sources, self.blocks = kinds["g"], kinds["v"], kinds["stamp"]
+        self.branch_of = {cid: n + k for k, cid in enumerate(self.sources)}
+        self.size = n + len(self.sources)
+        self.models = models
+
+        node_of = self.node_of
+
+        def nodes(ids, pin):
+            return np.array([node_of[(cid, pin)] for cid in ids], dtype=np.intp)
+
+        gp, gq = self.conductor_nodes = nodes(self.conductors, 0), nodes(self.conductors, 1)
+        vp, vq = self.source_nodes = nodes(self.sources, 0), nodes(self.sources, 1)
+        k = np.arange(n, self.size)
+        # Two ports may be wired to one outside node; their entries add up
+        self.block_nodes = [np.array([node_of[(cid, port)] for port in models[cid][1].nodes], dtype=np.intp)
+                            for cid in self.blocks]
+        self.rows = np.concatenate([gp, gq, gp, gq, vp, vq, k, k] +
+                                   [np.repeat(ports, len(ports)) for ports in self.block_nodes])
+        self.cols = np.concatenate([gp, gq, gq, gp, k, k, vp, vq] +
+                                   [np.tile(ports, len(ports)) for ports in self.block_nodes])
+        self.values, self.rhs = self.stamp(models)
+
+    def stamp(self, models):
+        """Entry values and right-hand side b for part models of the same topology"""
+        g = np.array([models[cid][1] for cid in self.conductors], dtype=float)
+        ones = np.ones(len(self.sources))
+        values = np.concatenate([g, g, -g, -g, ones, -ones, ones, -ones] +
+                                [models[cid][1].admittance.ravel() for cid in self.blocks])
+        b = np.zeros(self.size)
+        b[self.node_count:] = [models[cid][1] for cid in self.sources]
+        for cid, ports in zip(self.blocks, self.block_nodes):
+            np.add.at(b, ports, models[cid][1].injection)
+        return values, b
+
+    @property
+    def matrix(self):
+        """A as a new dense array, for a system small enough to hold one"""
+        A = np.zeros((self.size, self.size))
+        np.add.at(A, (self.rows, self.cols), self.values)
+        return A
+
+
+def _solve(A, b):
+    try:
+        return np.linalg.solve(A, b)
+    except np.linalg.LinAlgError:
+        raise CircuitError("Circuit has no unique DC solution (a loop of voltage sources?)") from None
+
+
+class ReducedStamp:
+    """A subcircuit's Norton equivalent at its ports, its inner nodes eliminated.
+
+    With v the voltages of the distinct port nodes, the currents flowing
+    into them are admittance @ v - injection. nodes lists the first port on
+    each distinct node; ports wired together inside the block are listed
+    in shorted as (first port, other port) and stamped as one node.
+    """
+
+    def __init__(self, definition):
+        eq = _Equations(dict(enumerate(definition.components)), definition.connections, definition.ports)
+        first = {}
+        self.shorted = []
+        for port, pin in enumerate(definition.ports):
+            node = eq.node_of[pin]
+            if node in first:
+                self.shorted.append((first[node], port))
+            else:
+                first[node] = port
+        self.port_count = len(definition.ports)
+        self.nodes = list(first.values())
+
+        outer = np.array(list(first), dtype=int)
+        inner = np.setdiff1d(np.arange(eq.size), outer)
+        A, b = eq.matrix, eq.rhs
+        inner_nodes = inner[inner < eq.node_count]
+        A[inner_nodes, inner_nodes] += GMIN
+        self.admittance = A[np.ix_(outer, outer)]
+        self.injection = b[outer]
+        if inner.size:
+            a_oi = A[np.ix_(outer, inner)]
+            solved = _solve(A[np.ix_(inner, inner)], np.column_stack([A[np.ix_(inner, outer)], b[inner]]))
+            self.admittance = self.admittance - a_oi @ solved[:, :-1]
+            self.injection = self.injection - a_oi @ solved[:, -1]
+
+    def port_currents(self, voltages):
+        """Current into every port for the voltages of the distinct port nodes"""
+        currents = np.zeros(self.port_count)
+        currents[self.nodes] = self.admittance @ voltages - self.injection
+        return currents
+
+
+class OperatingPoint:
+    """Node voltages and part currents found by solve_dc.
+
+    currents holds the current into pin 0 of each resistor, battery and
+    inductor, and an array of the currents into the ports of each instance.
+    """
+
+    def __init__(self, node_of, voltages, currents):
+        self.node_of = node_of
+        self.voltages = voltages
+        self.currents = currents
+
+    def voltage(self, pin):
+        """Voltage of an (id, pin) against ground; 0 for a pin no part or wire uses"""
+        node = self.node_of.get(pin)
+        return 0.0 if node is None else float(self.voltages[node])
+
+
+def _structure(components, models):
+    """What the pattern of a circuit's equations depends on besides its wires"""
+    structure = []
+    for (cid, (kind, _)), model in zip(components.items(), models):
+        if model is not None and model[0] == "stamp":
+            model = (model[1].port_count, tuple(model[1].shorted), tuple(model[1].nodes))
+        elif model is not None:
+            model = model[0]
+        structure.append((cid, kind, model))
+    return structure
+
+
+class DCSystem:
+    """The DC equations of one circuit topology, analysed once and solved for any part values.
+
+    Building one does the symbolic work: nodes, the supernodes merged by
+    voltage sources, the sparsity pattern and its ordering. solve() then
+    restamps the part values and refactors numerically only, or not at all
+    when just source voltages changed, so a sweep or a time loop pays for
+    the structure once.
+    """
+
+    def __init__(self, components, connections):
+        self.connections = list(connections)
+        self._analyse(components)
+
+    def _analyse(self, components):
+        eq = self.equations = _Equations(components, self.connections)
+        self.structure = _structure(components, eq.models.values())
+        n = eq.node_count
+        ground = next((eq.node_of[(cid, 1)] for cid, (kind, _) in components.items()
+                       if kind == "Battery"), 0)
+
+        # Each tree of voltage sources is one supernode, searched from ground first
+        self.sources = list(zip(*(nodes.tolist() for nodes in eq.source_nodes)))
+        touching = {}
+        for k, (p, q) in enumerate(self.sources):
+            touching.setdefault(p, []).append(k)
+            touching.setdefault(q, []).append(k)
+        root = np.arange(n)
+        self.tree = []  # (source, node, node it was reached from), from the roots outwards
+        reached = set()
+        crossed = set()
+        for start in [ground] + list(touching):
+            if start in reached or start not in touching:
+                continue
+            reached.add(start)
+            queue = [start]
+            for node in queue:
+                for k in touching[node]:
+                    if k in crossed:
+                        continue
+                    crossed.add(k)
+                    p, q = self.sources[k]
+                    other = q if p == node else p
+                    if other in reached:
+                        raise CircuitError(f"Circuit has no unique DC solution: {eq.sources[k]} "
+                                           "closes a loop of voltage sources")
+                    reached.add(other)
+                    root[other] = start
+                    self.tree.append((k, other, node))
+                    queue.append(other)
+
+        # One unknown per supernode but ground's; unknown is -1 on the nodes held at ground
+        is_root = root == np.arange(n)
+        is_root[ground:ground + 1] = False
+        self.unknown = np.where(is_root, np.cumsum(is_root) - 1, -1)[root]
+        self.free = np.flatnonzero(self.unknown >= 0)
+        self.unknowns = int(is_root.sum())
+
+        # The node to node entries, then GMIN on every node, moved onto the supernodes
+        entries = self.entries = np.flatnonzero((eq.rows < n) & (eq.cols < n))
+        self.entry_rows = np.concatenate([eq.rows[entries], np.arange(n)])
+        self.entry_cols = np.concatenate([eq.cols[entries], np.arange(n)])
+        rows, cols = self.unknown[self.entry_rows], self.unknown[self.entry_cols]
+        self.inside = (rows >= 0) & (cols >= 0)
+        self.matrix_rows, self.matrix_cols = rows[self.inside], cols[self.inside]
+        self.pattern = SymmetricPattern(self.unknowns, self.matrix_rows, self.matrix_cols)
+        self.factored = None  # (matrix values, their solve function) from the last solve
+
+    def _solver(self, matrix):
+        try:
+            return self.pattern.factor(matrix).solve
+        except np.linalg.LinAlgError:
+            # Not positive definite, as with a negative resistance; pivoting may still solve it
+            A = np.zeros((self.unknowns, self.unknowns))
+            np.add.at(A, (self.matrix_rows, self.matrix_cols), matrix)
+            return partial(_solve, A)
+
+    def solve(self, components=None):
+        """OperatingPoint for components, or for the parts the system was built with.
+
+        components must have the same ids, types and wires; only values may
+        differ. A value that changes the structure, such as a resistor set
+        to zero ohms, makes the system analyse the circuit again.
+        """
+        eq = self.equations
+        models = eq.models
+        if components is not None:
+            models = {cid: _model(kind, value) for cid, (kind, value) in components.items()}
+            if _structure(components, models.values()) != self.structure:
+                self._analyse(components)
+                eq = self.equations
+        n = eq.node_count
+        if not n:
+            return OperatingPoint(eq.node_of, np.zeros(0), {})
+        values, b = eq.stamp(models)
+
+        offset = np.zeros(n)
+        for k, node, parent in self.tree:
+            volts = b[n + k]
+            offset[node] = offset[parent] + (volts if node == self.sources[k][0] else -volts)
+        entry_values = np.concatenate([values[self.entries], np.full(n, GMIN)])
+        node_rhs = b[:n] - np.bincount(self.entry_rows, weights=entry_values * offset[self.entry_cols],
+                                       minlength=n)
+        rhs = np.bincount(self.unknown[self.free], weights=node_rhs[self.free], minlength=self.unknowns)
+
+        matrix = entry_values[self.inside]
+        factored = self.factored
+        if factored is None or not np.array_equal(factored[0], matrix):
+            factored = self.factored = (matrix, self._solver(matrix))
+        voltages = offset
+        voltages[self.free] += factored[1](rhs)[self.unknown[self.free]]
+
+        gp, gq = eq.conductor_nodes
+        currents = dict(zip(eq.conductors, (values[:len(gp)] * (voltages[gp] - voltages[gq])).tolist()))
+        # What flows out of each node through the other parts enters it through its sources
+        flow = b[:n] - np.bincount(self.entry_rows, weights=entry_values * voltages[self.entry_cols],
+                                   minlength=n)
+        branch = np.zeros(len(self.sources))
+        for k, node, parent in reversed(self.tree):
+            branch[k] = flow[node] if node == self.sources[k][0] else -flow[node]
+            flow[parent] += flow[node]
+        currents.update(zip(eq.sources, branch.tolist()))
+        for cid, ports in zip(eq.blocks, eq.block_nodes):
+            currents[cid] = models[cid][1].port_currents(voltages[ports])
+        return OperatingPoint(eq.node_of, voltages, currents)
+
+
+def solve_dc(components, connections):
+    """DC operating point of a circuit whose parts may be subcircuit instances.
+
+    Each distinct definition is reduced once, however many instances use
+    it. Ground is the negative pin of the first battery, or the first node
+    when there is none. To solve one topology again and again, keep its
+    DCSystem instead.
+    """
+    return DCSystem(components, connections).solve()
+
+
+def flatten(components, connections):
+    """The same circuit with every subcircuit instance replaced by its parts.
+
+    Parts inside an instance get ids "instance/index", nested as deep as
+    the blocks are. Returns (components, connections); solving the result
+    gives the same answer as the hierarchical circuit, only more slowly.
+    """
+    flat = {}
+    wires = []
+    port_pin = {}  # (instance id, port) -> the pin behind it, one level down
+
+    def add(cid, kind, value):
+        if kind != SUBCIRCUIT:
+            flat[cid] = (kind, value)
+            return
+        inner = [f"{cid}/{index}" for index in range(len(value.components))]
+        for inner_id, (inner_kind, inner_value) in zip(inner, value.components):
+            add(inner_id, inner_kind, inner_value)
+        wires.extend(((inner[a], pa), (inner[b], pb)) for (a, pa), (b, pb) in value.connections)
+        for port, (index, pin) in enumerate(value.ports):
+            port_pin[(cid, port)] = (inner[index], pin)
+
+    def resolve(pin):
+        while pin in port_pin:
+            pin = port_pin[pin]
+        return pin
+
+    for cid, (kind, value) in components.items():
+        add(cid, kind, value)
+    return flat, [(resolve(a), resolve(b)) for a, b in list(connections) + wires]
@@ -0,0 +1,144 @@
+"""Timing spans and log messages kept in a ring buffer, for finding stutters.
+
+Code that may hold up the UI wraps its work in a span, from any thread:
+
+    with TRACE.span("updateWireAnimations", "animation"):
+        ...
+
+and reports through message() instead of print(). Events go into a
+bounded deque, so tracing stays on all the time at the cost of a deque
+append per span and holds the last CAPACITY events when something goes
+wrong. summary() gives the performance HUD its figures for the last
+second; write_chrome_trace() saves the buffer as Chrome trace-event JSON,
+which chrome://tracing and Perfetto open with one track per thread.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+CAPACITY = 200_000  # Events kept; about 40 MB at most
+
+SPAN = "X"     # Chrome phase of a complete event: start and duration
+MESSAGE = "i"  # Chrome phase of an instant event
+ERROR = "error"  # Message category that is also written to stderr
+
+
+class _Span:
+    __slots__ = ("trace", "name", "category", "start")
+
+    def __init__(self, trace, name, category):
+        self.trace = trace
+        self.name = name
+        self.category = category
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        self.trace._record(SPAN, self.name, self.category, self.start, end - self.start)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class PerfTrace:
+    """Ring buffer of (phase, name, category, start ns, duration ns, thread id) events"""
+
+    def __init__(self, capacity=CAPACITY):
+        self.enabled = True
+        self.events = deque(maxlen=capacity)  # Appends are atomic, so threads need no lock
+        self.thread_names = {}
+        self.origin = time.perf_counter_ns()
+
+    def _record(self, phase, name, category, start, duration):
+        thread = threading.get_ident()
+        if thread not in self.thread_names:
+            self.thread_names[thread] = threading.current_thread().name
+        self.events.append((phase, name, category, start, duration, thread))
+
+    def span(self, name, category="app"):
+        """Context manager timing its block; does nothing while tracing is off"""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, category)
+
+    def traced(self, name, category="app"):
+        """Decorator timing every call of a function, such as a paint method, as a span"""
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self._record(SPAN, name, category, start, time.perf_counter_ns() - start)
+            return wrapper
+        return decorate
+
+    def message(self, text, category="log"):
+        """Record a log line as an instant event; errors are printed to stderr as well"""
+        if category == ERROR and sys.stderr is not None:
+            print(text, file=sys.stderr)
+        if self.enabled:
+            self._record(MESSAGE, text, category, time.perf_counter_ns(), 0)
+
+    def clear(self):
+        self.events.clear()
+
+    def summary(self, seconds=1.0):
+        """{span name: (count, total seconds, longest seconds)} for spans ending in the last seconds"""
+        now = time.perf_counter_ns()
+        since = now - int(seconds * 1e9)
+        totals = {}
+        for phase, name, _, start, duration, _ in reversed(self.events.copy()):
+            if start + duration < since:
+                break
+            if phase != SPAN:
+                continue
+            count, total, longest = totals.get(name, (0, 0, 0))
+            totals[name] = (count + 1, total + duration, max(longest, duration))
+        return {name: (count, total / 1e9, longest / 1e9)
+                for name, (count, total, longest) in totals.items()}
+
+    def chrome_trace(self):
+        """The buffer as a Chrome trace-event document, times in microseconds"""
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": thread, "args": {"name": name}}
+                  for thread, name in list(self.thread_names.items())]
+        for phase, name, category, start, duration, thread in self.events.copy():
+            event = {"name": name, "cat": category, "ph": phase, "pid": pid, "tid": thread,
+                     "ts": (start - self.origin) / 1000}
+            if phase == SPAN:
+                event["dur"] = duration / 1000
+            else:
+                event["s"] = "t"  # Instant events mark their own thread
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        """Save the buffer for chrome://tracing or Perfetto; returns the number of events"""
+        document = self.chrome_trace()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(document, f, separators=(",", ":"))
+        return len(document["traceEvents"])
+
+
+TRACE = PerfTrace()
@@ -0,0 +1,82 @@
+"""Versioned SmartLab project files.
+
+A project is a JSON Lines file: a header record naming the format and its
+version, then one record per subcircuit definition, component, wire and
+probe, in that order. Components carry an integer id that wire records
+refer to, so a file is written in a single pass over the canvas and read
+back as a stream without holding the whole design in memory twice.
+
+    {"format": "smartlab-project", "version": 2}
+    {"type": "subcircuit", "id": "Filter", "components": [["Resistor", 1000.0], ...],
+     "connections": [[[0, 1], [1, 0]], ...], "ports": [[0, 0], [1, 1]]}
+    {"type": "component", "id": 0, "name": "Resistor", "x": 0, "y": 0, ...}
+    {"type": "wire", "from": [0, 1], "to": [1, 0], "route": [[2, 0], ...]}
+    {"type": "probe", "id": 2, "x": 40, "y": 10, "measurement": "voltage"}
+
+Wire and probe ids only tell records apart, for the autosave journal.
+"""
+import json
+import os
+
+FORMAT = "smartlab-project"
+VERSION = 2  # 2 added subcircuit records
+EXTENSION = ".slab"
+FILE_FILTER = f"SmartLab Projects (*{EXTENSION});;All Files (*)"
+
+
+class ProjectFormatError(ValueError):
+    """Raised for a file that is not a readable SmartLab project"""
+
+
+def write_project(path, records):
+    """Write the header and every record of an iterable, one line each.
+
+    The file is written next to path and moved over it when complete, so an
+    interrupted save never leaves a truncated project behind.
+    """
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(encode({"format": FORMAT, "version": VERSION}))
+        f.write("\n")
+        f.writelines(f"{encode(record)}\n" for record in records)
+    os.replace(tmp_path, path)
+
+
+def read_project(path):
+    """Open a project file and check its header; returns an iterator of records.
+
+    The header is checked before anything is returned, so a caller can clear
+    its canvas knowing the file is a project it understands. Records are then
+    parsed one line at a time as the iterator is consumed. Raises
+    ProjectFormatError for a missing or foreign header, a version newer than
+    this build understands, or a line that is not JSON.
+    """
+    decode = json.JSONDecoder().decode
+    f = open(path, encoding="utf-8")
+    try:
+        header = decode(f.readline())
+    except ValueError:
+        header = None
+    try:
+        if not isinstance(header, dict) or header.get("format") != FORMAT:
+            raise ProjectFormatError(f"{os.path.basename(path)} is not a SmartLab project")
+        version = header.get("version")
+        if not isinstance(version, int) or version > VERSION:
+            raise ProjectFormatError(f"Project version {version} is newer than this SmartLab "
+                                     f"supports (version {VERSION})")
+    except ProjectFormatError:
+        f.close()
+        raise
+    return _records(f, decode)
+
+
+def _records(f, decode):
+    with f:
+        for line_number, line in enumerate(f, 2):
+            if not line.strip():
+                continue
+            try:
+                yield decode(line)
+            except ValueError as e:
+                raise ProjectFormatError(f"Line {line_number} is not valid: {e}") from None
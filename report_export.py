@@ -0,0 +1,220 @@
+"""Headless plot and report export for SmartLab simulation results.
+
+Figures are drawn on matplotlib's Agg canvas without Qt, so every plot of
+every circuit can be rendered in a separate worker process. matplotlib is
+imported by the workers when they first draw, not when SmartLab starts. A report is a
+folder per circuit with voltage, current, power and spectrum images plus an
+HTML page carrying the same tables as the Circuit Statistics tab, and an
+index page linking all circuits.
+"""
+import html
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from spectral import calculate_fft, sample_rate_of
+
+PLOT_KINDS = ("voltage", "current", "power", "spectrum")
+
+PLOT_TITLES = {
+    "voltage": ("Voltage vs. Time", "Time (s)", "Voltage (V)"),
+    "current": ("Current vs. Time", "Time (s)", "Current (A)"),
+    "power": ("Power Consumption", "Time (s)", "Power (W)"),
+    "spectrum": ("Voltage Spectrum", "Frequency (Hz)", "Magnitude (dB)"),
+}
+
+
+def circuit_statistics_html(simulator):
+    """HTML component table and simulation summary for a prepared simulator"""
+    # Count connections per component in one pass over the connection list
+    connection_counts = {}
+    for conn in simulator.connections:
+        for component_id in {conn['from'][0], conn['to'][0]}:
+            connection_counts[component_id] = connection_counts.get(component_id, 0) + 1
+
+    rows = []
+    for component_id, component in simulator.components.items():
+        rows.append(
+            f"<tr><td>{html.escape(str(component_id)[-6:])}</td>"
+            f"<td>{html.escape(str(component['type']))}</td>"
+            f"<td>{html.escape(str(component['value']))}</td>"
+            f"<td>{connection_counts.get(component_id, 0)}</td></tr>"
+        )
+
+    stats_html = "<h2>Circuit Components</h2><table border='1' cellspacing='0' cellpadding='5'>"
+    stats_html += "<tr><th>Component</th><th>Type</th><th>Value</th><th>Connections</th></tr>"
+    stats_html += "".join(rows)
+    stats_html += "</table>"
+
+    stats_html += f"""
+        <h2>Simulation Summary</h2>
+        <ul>
+            <li>Total components: {len(simulator.components)}</li>
+            <li>Voltage sources: {len(simulator.voltage_sources)}</li>
+            <li>Ground nodes: {len(simulator.ground_nodes)}</li>
+            <li>Connections: {len(simulator.connections)}</li>
+            <li>Simulation time: {getattr(simulator, 'max_time', 1.0):.3f}s</li>
+            <li>Time step: {getattr(simulator, 'time_step', 0.001):.6f}s</li>
+        </ul>
+        """
+    return stats_html
+
+
+def report_job(name, simulator, time_points, voltage_data, current_data):
+    """Collect the picklable data a report needs from a simulated circuit"""
+    labels = {
+        component_id: f"{component['type']} {str(component_id)[-4:]}"
+        for component_id, component in simulator.components.items()
+    }
+    return {
+        'name': name,
+        'time': np.asarray(time_points),
+        'voltage': {k: np.asarray(v) for k, v in voltage_data.items()},
+        'current': {k: np.asarray(v) for k, v in current_data.items()},
+        'labels': labels,
+        'statistics': circuit_statistics_html(simulator),
+    }
+
+
+def _slug(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "circuit"
+
+
+def _job_folders(jobs):
+    """A distinct folder name per job; names that slug alike get -2, -3, ... in job order"""
+    folders = []
+    used = set()  # Lower case, as Windows and macOS file systems ignore case
+    for job in jobs:
+        base = folder = _slug(job['name'])
+        number = 2
+        while folder.lower() in used:
+            folder = f"{base}-{number}"
+            number += 1
+        used.add(folder.lower())
+        folders.append(folder)
+    return folders
+
+
+def _plot_series(job, kind):
+    """Series (label, x, y) drawn on one report figure"""
+    time_points = job['time']
+    labels = job['labels']
+    if kind == "voltage":
+        return [(labels.get(k, k), time_points, v) for k, v in job['voltage'].items()]
+    if kind == "current":
+        return [(labels.get(k, k), time_points, v) for k, v in job['current'].items()]
+    if kind == "power":
+        return [(labels.get(k, k), time_points, job['voltage'][k] * job['current'][k])
+                for k in job['voltage'] if k in job['current']]
+
+    # Spectrum of each voltage waveform, limited like the spectrum analyzer view
+    sample_rate = sample_rate_of(time_points)
+    max_freq = min(sample_rate / 2, 1000)
+    series = []
+    for k, v in job['voltage'].items():
+        if len(v) < 2:
+            continue
+        freq, magnitude = calculate_fft(v, sample_rate, "Hann")
+        mask = freq <= max_freq
+        series.append((labels.get(k, k), freq[mask], magnitude[mask]))
+    return series
+
+
+def render_plot(name, kind, series, out_base, formats):
+    """Render one figure with the Agg canvas and save it in every requested format"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 5), dpi=100)
+    FigureCanvasAgg(fig)
+    axes = fig.add_subplot(111)
+
+    title, xlabel, ylabel = PLOT_TITLES[kind]
+    for label, x, y in series:
+        axes.plot(x, y, label=label, linewidth=1.2)
+    axes.set_title(f"{title} - {name}")
+    axes.set_xlabel(xlabel)
+    axes.set_ylabel(ylabel)
+    axes.grid(True, linestyle='--', alpha=0.7)
+    if series:
+        axes.legend(loc='upper right', fontsize='small')
+    else:
+        axes.text(0.5, 0.5, "No data available", ha='center', va='center',
+                  transform=axes.transAxes, fontsize=12, color='gray')
+    fig.tight_layout()
+
+    paths = []
+    for fmt in formats:
+        path = f"{out_base}.{fmt}"
+        fig.savefig(path, format=fmt)
+        paths.append(path)
+    return paths
+
+
+def _write_circuit_page(job, job_dir, images):
+    """Write the per-circuit HTML summary next to its images"""
+    figures = "".join(
+        f"<h3>{html.escape(PLOT_TITLES[kind][0])}</h3>"
+        f"<img src='{html.escape(os.path.basename(paths[0]))}' style='max-width:100%'>"
+        for kind, paths in images if paths
+    )
+    page = (
+        "<html><head><meta charset='utf-8'>"
+        f"<title>{html.escape(job['name'])}</title></head><body>"
+        f"<h1>{html.escape(job['name'])}</h1>"
+        f"{job['statistics']}{figures}</body></html>"
+    )
+    path = os.path.join(job_dir, "index.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(page)
+    return path
+
+
+def export_reports(jobs, out_dir, formats=("png",), workers=None):
+    """Render all figures of all jobs across a process pool and write HTML summaries.
+
+    Each (circuit, plot kind) pair is an independent task. workers=None uses
+    every core; workers=1 renders in the calling process. Returns the path of
+    the top-level index page.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    tasks = []
+    job_dirs = []
+    for job, folder in zip(jobs, _job_folders(jobs)):
+        job_dir = os.path.join(out_dir, folder)
+        os.makedirs(job_dir, exist_ok=True)
+        job_dirs.append(job_dir)
+        for kind in PLOT_KINDS:
+            out_base = os.path.join(job_dir, kind)
+            tasks.append((job['name'], kind, _plot_series(job, kind), out_base, tuple(formats)))
+
+    if workers == 1 or len(tasks) <= 1:
+        results = [render_plot(*task) for task in tasks]
+    else:
+        # Spawned workers start afresh: they re-import the main script as __mp_main__,
+        # where its __main__ guard keeps the GUI from starting, then this module
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            results = list(pool.map(render_plot, *zip(*tasks), chunksize=max(1, len(tasks) // 64)))
+
+    links = []
+    for index, (job, job_dir) in enumerate(zip(jobs, job_dirs)):
+        images = list(zip(PLOT_KINDS, results[index * len(PLOT_KINDS):(index + 1) * len(PLOT_KINDS)]))
+        page = _write_circuit_page(job, job_dir, images)
+        links.append(
+            f"<li><a href='{html.escape(os.path.relpath(page, out_dir))}'>"
+            f"{html.escape(job['name'])}</a></li>"
+        )
+
+    index_path = os.path.join(out_dir, "index.html")
+    with open(index_path, "w", encoding="utf-8") as f:
+        f.write(
+            "<html><head><meta charset='utf-8'><title>SmartLab Report</title></head><body>"
+            f"<h1>SmartLab Report</h1><p>{len(jobs)} circuit(s)</p><ul>{''.join(links)}</ul>"
+            "</body></html>"
+        )
+    return index_path
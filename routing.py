@@ -0,0 +1,561 @@
+"""Grid wire router for the schematic canvas.
+
+Wires are routed on the canvas grid lattice with A* over (cell, heading)
+states, so bends can be charged. Component bodies are blocked in an
+occupancy bitmap. Cells already used by other wires make a crossing
+cheap and running along another wire expensive. Each routed wire records
+the cells it uses, so an edit only re-routes wires whose corridor it hits,
+and then only the stretch of the old route the edit blocked.
+
+This module only depends on NumPy; the canvas passes plain coordinates in.
+"""
+import heapq
+import math
+
+import numpy as np
+
+# Headings are numbered 0: +x, 1: +y, 2: -x, 3: -y
+
+
+def _min_turns_table():
+    """Fewest turns from a heading to an arrival heading that still moves every required way.
+
+    Indexed [heading][arrival][sign of dx + 1][sign of dy + 1]; the A* heuristic
+    charges this many bends on top of the Manhattan distance.
+    """
+    table = [[[[0] * 3 for _ in range(3)] for _ in range(4)] for _ in range(4)]
+    for heading in range(4):
+        for arrival in range(4):
+            for sx in (-1, 0, 1):
+                for sy in (-1, 0, 1):
+                    required = set()
+                    if sx:
+                        required.add(0 if sx > 0 else 2)
+                    if sy:
+                        required.add(1 if sy > 0 else 3)
+                    # Breadth-first over heading sequences; each step is one turn
+                    frontier = {(heading, frozenset((heading,)))}
+                    turns = 0
+                    while not any(last == arrival and required <= seen for last, seen in frontier):
+                        frontier = {(nxt, seen | {nxt}) for last, seen in frontier
+                                    for nxt in ((last + 1) % 4, (last + 3) % 4)}
+                        turns += 1
+                    table[heading][arrival][sx + 1][sy + 1] = turns
+    return table
+
+
+MIN_TURNS = np.array(_min_turns_table())
+
+
+class OccupancyGrid:
+    """Count bitmaps over lattice cells, grown on demand around the used area.
+
+    blocked counts component bodies covering a cell; horizontal and vertical
+    count wires running through it in each orientation.
+    """
+    GROW_MARGIN = 64
+
+    def __init__(self):
+        self.x0 = self.y0 = 0
+        self.blocked = np.zeros((0, 0), dtype=np.int16)
+        self.horizontal = np.zeros((0, 0), dtype=np.int16)
+        self.vertical = np.zeros((0, 0), dtype=np.int16)
+
+    def ensure(self, x0, y0, x1, y1):
+        """Grow the bitmaps to cover lattice cells x0..x1, y0..y1 inclusive"""
+        h, w = self.blocked.shape
+        if w and self.x0 <= x0 and self.y0 <= y0 and x1 < self.x0 + w and y1 < self.y0 + h:
+            return
+        if w:
+            # Only the sides that must move grow, by half the bitmap or more,
+            # so filling a large design copies the bitmaps a few times at most
+            grow_x, grow_y = max(self.GROW_MARGIN, w // 2), max(self.GROW_MARGIN, h // 2)
+            x0 = self.x0 if x0 >= self.x0 else x0 - grow_x
+            y0 = self.y0 if y0 >= self.y0 else y0 - grow_y
+            x1 = self.x0 + w - 1 if x1 < self.x0 + w else x1 + grow_x
+            y1 = self.y0 + h - 1 if y1 < self.y0 + h else y1 + grow_y
+        else:
+            x0 -= self.GROW_MARGIN
+            y0 -= self.GROW_MARGIN
+            x1 += self.GROW_MARGIN
+            y1 += self.GROW_MARGIN
+        shape = (y1 - y0 + 1, x1 - x0 + 1)
+        for name in ("blocked", "horizontal", "vertical"):
+            old = getattr(self, name)
+            new = np.zeros(shape, dtype=np.int16)
+            if w:
+                oy, ox = self.y0 - y0, self.x0 - x0
+                new[oy:oy + h, ox:ox + w] = old
+            setattr(self, name, new)
+        self.x0, self.y0 = x0, y0
+
+    def window(self, name, x0, y0, x1, y1):
+        """View of one bitmap over lattice cells x0..x1, y0..y1 inclusive"""
+        self.ensure(x0, y0, x1, y1)
+        array = getattr(self, name)
+        return array[y0 - self.y0:y1 - self.y0 + 1, x0 - self.x0:x1 - self.x0 + 1]
+
+
+class WireRouter:
+    """Routes wires between component pins around component bodies.
+
+    Obstacles and wires are identified by caller-supplied keys (the canvas
+    uses the item objects themselves).
+    """
+    TILE = 16  # Cells per side of the tiles that index which wires run where
+
+    def __init__(self, grid_size=10, bend_penalty=3, crossing_penalty=4, overlap_penalty=25,
+                 margin=8):
+        self.grid_size = grid_size
+        self.bend_penalty = bend_penalty
+        self.crossing_penalty = crossing_penalty
+        self.overlap_penalty = overlap_penalty
+        self.margin = margin  # Cells of slack around the endpoints' bounding box
+        self.grid = OccupancyGrid()
+        self.obstacles = {}   # key -> (x0, y0, x1, y1) blocked lattice cells
+        self.routes = {}      # wire key -> (tiles, xs, ys, horizontal, vertical) cell usage
+        self.paths = {}       # wire key -> (endpoints, corner cells, scene polyline)
+        self.tile_wires = {}  # (x, y) // TILE -> wire keys whose route passes through the tile
+
+    # Obstacles
+
+    def set_obstacle(self, key, left, top, right, bottom):
+        """Block the lattice cells inside a scene rect (edges included).
+
+        Returns the keys of wires whose current route runs through the newly
+        blocked cells and therefore needs re-routing.
+        """
+        gs = self.grid_size
+        cells = (math.ceil(left / gs), math.ceil(top / gs),
+                 math.floor(right / gs), math.floor(bottom / gs))
+        if self.obstacles.get(key) == cells:
+            return set()
+        self.remove_obstacle(key)
+        x0, y0, x1, y1 = cells
+        if x1 < x0 or y1 < y0:
+            return set()
+        self.grid.window("blocked", x0, y0, x1, y1)[...] += 1
+        self.obstacles[key] = cells
+
+        hit = set()
+        if not (self.grid.window("horizontal", x0, y0, x1, y1).any() or
+                self.grid.window("vertical", x0, y0, x1, y1).any()):
+            return hit  # No wire uses these cells
+        size = self.TILE
+        candidates = set()
+        for tx in range(x0 // size, x1 // size + 1):
+            for ty in range(y0 // size, y1 // size + 1):
+                candidates.update(self.tile_wires.get((tx, ty), ()))
+        for key in candidates:
+            _, xs, ys, _, _ = self.routes[key]
+            if np.any((xs >= x0) & (xs <= x1) & (ys >= y0) & (ys <= y1)):
+                hit.add(key)
+        return hit
+
+    def remove_obstacle(self, key):
+        cells = self.obstacles.pop(key, None)
+        if cells is not None:
+            self.grid.window("blocked", *cells)[...] -= 1
+
+    # Routes
+
+    def remove_route(self, key):
+        """Release the cells used by a wire's route"""
+        self.paths.pop(key, None)
+        usage = self.routes.pop(key, None)
+        if usage is None:
+            return
+        tiles, xs, ys, horizontal, vertical = usage
+        grid = self.grid
+        grid.horizontal[ys - grid.y0, xs - grid.x0] -= horizontal
+        grid.vertical[ys - grid.y0, xs - grid.x0] -= vertical
+        tile_wires = self.tile_wires
+        for tile in tiles:
+            wires = tile_wires.get(tile)
+            if wires is not None:
+                wires.discard(key)
+                if not wires:
+                    del tile_wires[tile]
+
+    def route(self, key, start, start_center, end, end_center):
+        """Route wire key from pin start to pin end and record its cells.
+
+        Pins and component centers are (x, y) scene points; the center gives
+        the side of the component each pin leaves from. Returns the polyline
+        as a list of (x, y) scene points, or None if no route exists within
+        the search window (the caller then keeps its own fallback).
+
+        A wire whose pins have not moved keeps its route; if an obstacle now
+        blocks part of it, only that stretch is searched again.
+        """
+        s, s_dir = self._escape(start, start_center)
+        e, e_dir = self._escape(end, end_center)
+        # The wire arrives at the end escape cell heading back toward the pin
+        arrive_dir = (e_dir + 2) % 4
+        endpoints = (start, end, s_dir, e_dir)
+
+        corners = None
+        cached = self.paths.get(key)
+        if cached is not None and cached[0] == endpoints:
+            cells = _path_cells(cached[1])
+            xs = np.fromiter((x for x, _ in cells), dtype=np.int64, count=len(cells))
+            ys = np.fromiter((y for _, y in cells), dtype=np.int64, count=len(cells))
+            hits = np.flatnonzero(self.grid.blocked[ys - self.grid.y0, xs - self.grid.x0])
+            if not len(hits):
+                return cached[2]
+            self.remove_route(key)
+            corners = self._repair(cells, hits[0], hits[-1], s_dir, arrive_dir)
+        else:
+            self.remove_route(key)
+
+        if corners is None:
+            corners = self._simple_route(s, s_dir, e, arrive_dir)
+        if corners is None:
+            for margin in (self.margin, self.margin * 4):
+                corners = self._search(s, s_dir, e, arrive_dir, margin)
+                if corners is not None:
+                    break
+        if corners is None:
+            return None
+
+        self._record(key, corners)
+        return self._finish(key, endpoints, s, e, corners)
+
+    def restore(self, key, start, start_center, end, end_center, corners):
+        """Adopt a known route for wire key, such as one read from a saved project.
+
+        corners are lattice cells as returned by corners_of. The route is
+        taken as is when it still joins the pins' escape cells without
+        crossing a component; otherwise the wire is routed afresh.
+        """
+        s, s_dir = self._escape(start, start_center)
+        e, e_dir = self._escape(end, end_center)
+        corners = [tuple(corner) for corner in corners]
+        if (not corners or corners[0] != s or corners[-1] != e or
+                any(ax != bx and ay != by for (ax, ay), (bx, by) in zip(corners, corners[1:]))):
+            return self.route(key, start, start_center, end, end_center)
+        usage = xs, ys, _, _ = _route_usage(corners)
+        grid = self.grid
+        grid.ensure(*_bounds(corners))
+        if grid.blocked[ys - grid.y0, xs - grid.x0].any():
+            return self.route(key, start, start_center, end, end_center)
+
+        self.remove_route(key)
+        self._record(key, corners, usage)
+        return self._finish(key, (start, end, s_dir, e_dir), s, e, corners)
+
+    def corners_of(self, key):
+        """Corner cells of wire key's current route, or None if it has none"""
+        cached = self.paths.get(key)
+        return cached[1] if cached is not None else None
+
+    def _finish(self, key, endpoints, s, e, corners):
+        """Scene polyline for a recorded route from pin to pin, cached for key"""
+        start, end, s_dir, e_dir = endpoints
+        gs = self.grid_size
+        points = [start, (s[0] * gs, start[1]) if s_dir in (0, 2) else (start[0], s[1] * gs)]
+        points.extend((x * gs, y * gs) for x, y in corners)
+        points.append((e[0] * gs, end[1]) if e_dir in (0, 2) else (end[0], e[1] * gs))
+        points.append(end)
+        points = _simplify(points)
+        self.paths[key] = (endpoints, corners, points)
+        return points
+
+    def _repair(self, cells, first, last, s_dir, arrive_dir, slack=3):
+        """Detour the blocked cells first..last of a route, keeping the rest of it.
+
+        Returns the new corner cells, or None if no local detour was found.
+        """
+        i0 = max(0, first - slack)
+        i1 = min(len(cells) - 1, last + slack)
+        heading = s_dir if i0 == 0 else _heading(*cells[i0 - 1], *cells[i0])
+        leaving = arrive_dir if i1 == len(cells) - 1 else _heading(*cells[i1], *cells[i1 + 1])
+        detour = self._search(cells[i0], heading, cells[i1], leaving, self.margin)
+        if detour is None:
+            return None
+        return _simplify(cells[:i0] + detour + cells[i1 + 1:])
+
+    def _escape(self, pin, center):
+        """First free lattice cell outside the component in the pin's direction"""
+        gs = self.grid_size
+        vx, vy = pin[0] - center[0], pin[1] - center[1]
+        if abs(vx) >= abs(vy):
+            if vx >= 0:
+                return (math.floor(pin[0] / gs) + 1, math.floor(pin[1] / gs + 0.5)), 0
+            return (math.ceil(pin[0] / gs) - 1, math.floor(pin[1] / gs + 0.5)), 2
+        if vy >= 0:
+            return (math.floor(pin[0] / gs + 0.5), math.floor(pin[1] / gs) + 1), 1
+        return (math.floor(pin[0] / gs + 0.5), math.ceil(pin[1] / gs) - 1), 3
+
+    def _record(self, key, corners, usage=None):
+        """Mark the cells along a corner list as used by wire key; usage is _route_usage(corners) if known"""
+        grid = self.grid
+        grid.ensure(*_bounds(corners))
+        xs, ys, horizontal, vertical = usage or _route_usage(corners)
+        # Each cell appears once, so plain fancy-indexed updates are safe
+        grid.horizontal[ys - grid.y0, xs - grid.x0] += horizontal
+        grid.vertical[ys - grid.y0, xs - grid.x0] += vertical
+        size = self.TILE
+        tiles = set(zip((xs // size).tolist(), (ys // size).tolist()))
+        tile_wires = self.tile_wires
+        for tile in tiles:
+            tile_wires.setdefault(tile, set()).add(key)
+        self.routes[key] = (tiles, xs, ys, horizontal, vertical)
+
+    def _segment_cost(self, ax, ay, bx, by, heading, last=False):
+        """Cost of the cells after (ax, ay) up to (bx, by), or None if blocked.
+
+        The goal cell ending the last segment is free, as it is in the search.
+        """
+        x0, x1 = min(ax, bx), max(ax, bx)
+        y0, y1 = min(ay, by), max(ay, by)
+        blocked = self.grid.window("blocked", x0, y0, x1, y1).ravel()
+        same = self.grid.window("horizontal" if heading in (0, 2) else "vertical", x0, y0, x1, y1).ravel()
+        cross = self.grid.window("vertical" if heading in (0, 2) else "horizontal", x0, y0, x1, y1).ravel()
+        # Drop the segment's first cell, which the previous segment already paid for
+        if last:
+            keep = slice(1, -1)
+        else:
+            keep = slice(1, None) if (ax, ay) == (x0, y0) else slice(None, -1)
+        blocked, same, cross = blocked[keep], same[keep], cross[keep]
+        if blocked.any():
+            return None
+        return (len(blocked) + self.overlap_penalty * int(np.count_nonzero(same))
+                + self.crossing_penalty * int(np.count_nonzero(cross)))
+
+    def _simple_route(self, s, s_dir, e, arrive_dir):
+        """Best straight, L or Z route if one is clear of components and other wires.
+
+        Most wires on a sparse schematic take this path and never reach A*.
+        """
+        (sx, sy), (ex, ey) = s, e
+        if s == e:
+            return [s]
+        candidates = []
+        if sx == ex or sy == ey:
+            candidates.append([s, e])
+        else:
+            candidates.append([s, (ex, sy), e])
+            candidates.append([s, (sx, ey), e])
+            mid_x, mid_y = (sx + ex) // 2, (sy + ey) // 2
+            candidates.append([s, (mid_x, sy), (mid_x, ey), e])
+            candidates.append([s, (sx, mid_y), (ex, mid_y), e])
+
+        # A pin escaping into another part's body needs the full search
+        if self.grid.window("blocked", sx, sy, sx, sy)[0, 0]:
+            return None
+
+        best, best_cost = None, None
+        for corners in candidates:
+            cost = 0
+            heading = s_dir
+            for (ax, ay), (bx, by) in zip(corners, corners[1:]):
+                if (ax, ay) == (bx, by):
+                    continue
+                last = (bx, by) == e
+                segment_dir = _heading(ax, ay, bx, by)
+                if segment_dir == (heading + 2) % 4:
+                    cost = None  # Would double back over the previous segment or the pin stub
+                    break
+                if segment_dir != heading:
+                    cost += self.bend_penalty
+                heading = segment_dir
+                segment = self._segment_cost(ax, ay, bx, by, segment_dir, last)
+                if segment is None:
+                    cost = None
+                    break
+                cost += segment
+            if cost is None:
+                continue
+            if heading != arrive_dir:
+                if heading == (arrive_dir + 2) % 4:
+                    continue
+                cost += self.bend_penalty
+            if best_cost is None or cost < best_cost:
+                best, best_cost = corners, cost
+
+        if best is None:
+            return None
+        # Only trust the shortcut when it pays no crossing or overlap penalties
+        length = sum(abs(bx - ax) + abs(by - ay) for (ax, ay), (bx, by) in zip(best, best[1:]))
+        bends = sum(1 for a, b, c in zip(best, best[1:], best[2:])
+                    if _heading(*a, *b) != _heading(*b, *c))
+        bends += (_heading(*best[0], *best[1]) != s_dir) + (_heading(*best[-2], *best[-1]) != arrive_dir)
+        if best_cost > length + bends * self.bend_penalty:
+            return None
+        return _simplify(best)
+
+    def _search(self, s, s_dir, e, arrive_dir, margin):
+        """A* over (cell, heading) states inside the endpoints' box grown by margin.
+
+        Returns the corner cells of the cheapest route, or None.
+        """
+        x0 = min(s[0], e[0]) - margin
+        y0 = min(s[1], e[1]) - margin
+        x1 = max(s[0], e[0]) + margin
+        y1 = max(s[1], e[1]) + margin
+        w = x1 - x0 + 1
+        start = (s[1] - y0) * w + (s[0] - x0)
+        goal = (e[1] - y0) * w + (e[0] - x0)
+        bend = self.bend_penalty
+
+        # Cost of stepping into each cell along and across the rows, -1 where
+        # blocked; the window border is blocked so moves never leave it
+        blocked = self.grid.window("blocked", x0, y0, x1, y1) > 0
+        horizontal = self.grid.window("horizontal", x0, y0, x1, y1) > 0
+        vertical = self.grid.window("vertical", x0, y0, x1, y1) > 0
+        blocked = blocked.copy()
+        blocked[[0, -1], :] = True
+        blocked[:, [0, -1]] = True
+        move_costs = []
+        for same, cross in ((horizontal, vertical), (vertical, horizontal)):
+            cost = 1 + self.overlap_penalty * same + self.crossing_penalty * cross
+            cost[blocked] = -1
+            cost = cost.ravel()
+            cost[goal] = 1
+            move_costs.append(cost.tolist())
+        move_costs = (move_costs[0], move_costs[1], move_costs[0], move_costs[1])
+
+        # Heuristic per heading: Manhattan distance plus the bends still unavoidable
+        rows, cols = np.indices(blocked.shape)
+        dx, dy = (e[0] - x0) - cols, (e[1] - y0) - rows
+        distance = np.abs(dx) + np.abs(dy)
+        turns = MIN_TURNS[:, arrive_dir][:, np.sign(dx) + 1, np.sign(dy) + 1]
+        estimates = [(distance + bend * turns[heading]).ravel().tolist() for heading in range(4)]
+        steps = (1, w, -1, -w)
+
+        # A state is cell * 4 + heading; DONE marks reaching the goal
+        DONE = -1
+        best = {start * 4 + s_dir: 0}
+        parent = {start * 4 + s_dir: None}
+        heap = [(0, 0, start * 4 + s_dir)]
+        while heap:
+            _, cost, state = heapq.heappop(heap)
+            cost = -cost
+            if state == DONE:
+                break
+            if cost > best.get(state, math.inf):
+                continue
+            cell, heading = divmod(state, 4)
+            if cell == goal:
+                total = cost + (0 if heading == arrive_dir else bend)
+                if heading != (arrive_dir + 2) % 4 and total < best.get(DONE, math.inf):
+                    best[DONE] = total
+                    parent[DONE] = state
+                    heapq.heappush(heap, (total, -total, DONE))
+                continue
+
+            for new_heading in range(4):
+                if new_heading == (heading + 2) % 4:
+                    continue
+                nxt = cell + steps[new_heading]
+                step = move_costs[new_heading][nxt]
+                if step < 0:
+                    continue
+                new_cost = cost + step if new_heading == heading else cost + step + bend
+                new_state = nxt * 4 + new_heading
+                if new_cost < best.get(new_state, math.inf):
+                    best[new_state] = new_cost
+                    parent[new_state] = state
+                    # Ties go to the deeper state, which is nearer the goal
+                    heapq.heappush(heap, (new_cost + estimates[new_heading][nxt], -new_cost, new_state))
+
+        if DONE not in parent:
+            return None
+        cells = []
+        state = parent[DONE]
+        while state is not None:
+            row, col = divmod(state // 4, w)
+            cells.append((col + x0, row + y0))
+            state = parent[state]
+        cells.reverse()
+        return _simplify(cells)
+
+
+def _segment_cells(ax, ay, bx, by):
+    """Cells from (ax, ay) to (bx, by) inclusive along a straight segment"""
+    if ay == by:
+        step = 1 if bx >= ax else -1
+        return [(x, ay) for x in range(ax, bx + step, step)]
+    step = 1 if by >= ay else -1
+    return [(ax, y) for y in range(ay, by + step, step)]
+
+
+def _bounds(corners):
+    """Lattice box (x0, y0, x1, y1) holding every cell of a route"""
+    xs = [x for x, _ in corners]
+    ys = [y for _, y in corners]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _route_usage(corners):
+    """Distinct cells along a corner list, with 0/1 flags for each orientation using them.
+
+    Returns (xs, ys, horizontal, vertical) arrays; a lone corner counts as
+    both orientations. Routes are a few dozen cells, so lists built from
+    ranges beat NumPy's per-call overhead here.
+    """
+    (x, y), = corners[:1]
+    xs, ys, horizontal, vertical = [x], [y], [1], [1]
+    if len(corners) > 1:
+        horizontal[0] = vertical[0] = 0
+    for (ax, ay), (bx, by) in zip(corners, corners[1:]):
+        # A segment's first cell is the previous one's last, and takes both orientations
+        if ay == by:
+            horizontal[-1] = 1
+            step = 1 if bx >= ax else -1
+            run = range(ax + step, bx + step, step)
+            xs.extend(run)
+            ys.extend([ay] * len(run))
+            horizontal.extend([1] * len(run))
+            vertical.extend([0] * len(run))
+        else:
+            vertical[-1] = 1
+            step = 1 if by >= ay else -1
+            run = range(ay + step, by + step, step)
+            xs.extend([ax] * len(run))
+            ys.extend(run)
+            horizontal.extend([0] * len(run))
+            vertical.extend([1] * len(run))
+    cells = list(zip(xs, ys))
+    if len(set(cells)) < len(cells):
+        # The route runs over itself; each cell takes the orientations of every visit
+        usage = {}
+        for cell, h, v in zip(cells, horizontal, vertical):
+            old_h, old_v = usage.get(cell, (0, 0))
+            usage[cell] = (old_h | h, old_v | v)
+        xs = [x for x, _ in usage]
+        ys = [y for _, y in usage]
+        horizontal = [h for h, _ in usage.values()]
+        vertical = [v for _, v in usage.values()]
+    return (np.array(xs, dtype=np.int64), np.array(ys, dtype=np.int64),
+            np.array(horizontal, dtype=np.int16), np.array(vertical, dtype=np.int16))
+
+
+def _path_cells(corners):
+    """Every cell of a route in order, from its corner cells"""
+    cells = [corners[0]]
+    for (ax, ay), (bx, by) in zip(corners, corners[1:]):
+        cells.extend(_segment_cells(ax, ay, bx, by)[1:])
+    return cells
+
+
+def _heading(ax, ay, bx, by):
+    if by == ay:
+        return 0 if bx > ax else 2
+    return 1 if by > ay else 3
+
+
+def _simplify(points):
+    """Drop repeated points and points in the middle of straight runs"""
+    result = []
+    for point in points:
+        if result and point == result[-1]:
+            continue
+        if len(result) >= 2:
+            (ax, ay), (bx, by) = result[-2], result[-1]
+            if (ax == bx == point[0]) or (ay == by == point[1]):
+                result[-1] = point
+                continue
+        result.append(point)
+    return result
@@ -1,6 +1,9 @@
+from startup_profile import STARTUP
 import sys
 import math
+import os
 import numpy as np
+STARTUP.mark("import numpy")
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QToolBar, QLabel, QListWidget,
                              QGraphicsScene, QGraphicsView, QMenuBar, QMenu,
@@ -9,127 +12,354 @@ from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QGraphicsDropShadowEffect, QDialog, QFormLayout,
                              QLineEdit, QDoubleSpinBox, QComboBox, QPushButton,
                              QCheckBox, QGraphicsPathItem, QGraphicsProxyWidget,
-                             QTabWidget, QSlider, QTextEdit)  # Added QSlider and QTextEdit here
-from PySide6.QtCore import Qt, QPointF, QRectF, QMimeData, Signal, QPoint, QSize
+                             QTabWidget, QSlider, QTextEdit, QFileDialog,
+                             QGridLayout, QMessageBox, QInputDialog)  # Added QSlider and QTextEdit here
+from PySide6.QtCore import (Qt, QPointF, QRect, QRectF, QLineF, QMimeData, Signal, QPoint, QSize, QTimer,
+                            QByteArray, QDataStream, QObject, QEventLoop, QLockFile, QStandardPaths,
+                            QThread)
 from PySide6.QtGui import (QPainter, QPen, QColor, QAction, QDrag, QPainterPath, 
-                          QFont, QPixmap, QBrush, QLinearGradient)
-# Add matplotlib for visualization
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
-from matplotlib.figure import Figure
+                          QFont, QPixmap, QBrush, QLinearGradient, QPolygonF, QTransform)
+STARTUP.mark("import PySide6")
+# matplotlib is imported from matplotlib_canvas when a plot is first shown
 import time
 import threading
-from matplotlib.animation import FuncAnimation
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT
 import colorsys
+import gc
+import itertools
+import weakref
+from types import MappingProxyType
+from collections import ChainMap, deque
+from contextlib import contextmanager
+from spectral import analyze_spectrum, calculate_fft, sample_rate_of, WINDOW_TYPES
+from report_export import circuit_statistics_html, export_reports, report_job
+from routing import WireRouter
+from project_file import FILE_FILTER, EXTENSION, ProjectFormatError, read_project, write_project
+from autosave import AutosaveJournal, has_recovery, recover
+from perf_trace import ERROR, TRACE
+from nodal import SUBCIRCUIT, CircuitError, DCSystem, SubcircuitDefinition
+from component_types import CHOICE, FIXED, LIBRARY_TYPES, NUMBER, component_type
+from spice import (ELEMENT_LETTERS, ELEMENT_TYPES, NETLIST_EXTENSIONS, NETLIST_FILTER, VALUE_PROPERTIES,
+                   Card, NetlistError, NetlistReader, parse_value, write_netlist)
+import argparse
+import json
+import multiprocessing
+STARTUP.mark("import SmartLab modules")
 
 # Professional component symbols and colors
 class Component:
+    """A part's type, symbol, pin count and properties.
+
+    Only the property texts that differ from the type's defaults are
+    stored, in overrides; properties is a read-only view of them over the
+    defaults, as edited and saved. values holds the same parameters parsed
+    once (see component_types), which is what the simulator reads.
+    set_properties replaces both, so until a part is edited they are its
+    type's defaults, shared by every part of the type.
+
+    A frozen component is a shared prototype, such as a library entry:
+    items placed from it refer to it until their first edit.
+    """
+    __slots__ = ("name", "symbol", "pins", "component_type", "overrides", "values", "frozen")
+    _shared = {}  # (name, symbol, pins) -> frozen component with default properties
+
     def __init__(self, name, symbol, pins=2):
         self.name = name
         self.symbol = symbol
         self.pins = pins
-        self.properties = self._get_default_properties()
-        
-    def _get_default_properties(self):
-        """Set default properties based on component type"""
-        if self.name == "Resistor":
-            return {"Resistance (Ω)": "1000", "Power (W)": "0.25", "Tolerance (%)": "5"}
-        elif self.name == "Capacitor":
-            return {"Capacitance (F)": "0.000001", "Voltage Rating (V)": "25", "Type": "Ceramic"}
-        elif self.name == "Inductor":
-            return {"Inductance (H)": "0.001", "Current Rating (A)": "1.0"}
-        elif self.name == "Battery":
-            return {"Voltage (V)": "9.0", "Type": "DC"}
-        elif self.name == "LED":
-            return {"Forward Voltage (V)": "2.0", "Current (mA)": "20", "Color": "Red"}
-        elif self.name == "Transistor":
-            return {"Type": "NPN", "Gain (hFE)": "100", "Vce max (V)": "40"}
-        elif self.name == "Diode":
-            return {"Forward Voltage (V)": "0.7", "Current (mA)": "100"}
-        elif self.name == "Switch":
-            return {"Type": "SPST", "Current Rating (A)": "1.0"}
-        elif self.name == "Potentiometer":
-            return {"Resistance (Ω)": "10000", "Power (W)": "0.5"}
-        elif self.name == "IC":
-            return {"Type": "Op-Amp", "Supply Voltage (V)": "±15"}
-        else:
-            return {}
+        self.component_type = component_type(name)
+        self.overrides = {}  # Replaced, never changed in place, so copies can share it
+        self.values = self.component_type.default_values
+        self.frozen = False
+
+    @property
+    def properties(self):
+        """Read-only mapping of every property text: the overrides over the type's defaults"""
+        if not self.overrides:
+            return self.component_type.defaults
+        return MappingProxyType(ChainMap(self.overrides, self.component_type.defaults))
+
+    @classmethod
+    def shared(cls, name, symbol, pins=2):
+        """The frozen default component for a type, symbol and pin count"""
+        key = (name, symbol, pins)
+        component = cls._shared.get(key)
+        if component is None:
+            component = cls._shared[key] = cls(name, symbol, pins)
+            component.frozen = True
+        return component
+
+    def set_properties(self, changes):
+        """Set property texts; a key set to None goes back to its default, or is dropped if it has none.
+        
+        Texts equal to the type's defaults are not stored. Raises
+        ValueError, leaving the component unchanged, for text a parameter
+        cannot take.
+        """
+        if self.frozen:
+            raise TypeError(f"{self.name} is a shared component; edit a copy")
+        defaults = self.component_type.defaults
+        overrides = dict(self.overrides)
+        for key, text in changes.items():
+            if text is None or defaults.get(key) == text:
+                overrides.pop(key, None)
+            else:
+                overrides[key] = text
+        self.values = self.component_type.parse(overrides) if overrides else self.component_type.default_values
+        self.overrides = overrides
+
+    def copy(self):
+        """Unfrozen component with the same properties, which stay shared until it is edited"""
+        component = Component.__new__(Component)
+        component.name = self.name
+        component.symbol = self.symbol
+        component.pins = self.pins
+        component.component_type = self.component_type
+        component.overrides = self.overrides
+        component.values = self.values
+        component.frozen = False
+        return component
+
+def component_pin_points(pins):
+    """Local pin positions for a component with the given pin count"""
+    if pins == 2:  # Standard 2-pin components
+        return [QPointF(-25, 0), QPointF(25, 0)]
+    elif pins == 3:  # Transistors, etc.
+        return [QPointF(-25, 0), QPointF(25, -15), QPointF(25, 15)]
+    elif pins == 4:  # ICs, etc.
+        return [QPointF(-25, -15), QPointF(-25, 15), 
+                QPointF(25, -15), QPointF(25, 15)]
+    # Subcircuit blocks: ports down the left side, then down the right
+    left = (pins + 1) // 2
+    return [QPointF(x, (k - (count - 1) / 2) * 10)
+            for x, count in ((-25, left), (25, pins - left)) for k in range(count)]
+
+def subcircuit_component(definition):
+    """Placeable part for instances of a subcircuit; its pins are the block's ports"""
+    component = Component(SUBCIRCUIT, definition.name, len(definition.ports))
+    component.set_properties({"Subcircuit": definition.name})
+    component.frozen = True
+    return component
+
+def paint_component_symbol(painter, component, pin_points, state, pen_width=2,
+                           bg_color=QColor(240, 240, 240)):
+    """Draw a component body, symbol and pins in item coordinates.
+
+    state is "normal", "hover" or "selected".
+    """
+    # Draw component with professional appearance
+    painter.setRenderHint(QPainter.Antialiasing)
+    
+    # Background fill
+    if state == "selected":
+        background = QLinearGradient(0, -25, 0, 25)
+        background.setColorAt(0, QColor(200, 230, 250))
+        background.setColorAt(1, QColor(150, 200, 240))
+        painter.setBrush(QBrush(background))
+        pen = QPen(QColor(50, 100, 220), pen_width)
+    elif state == "hover":
+        painter.setBrush(QBrush(QColor(245, 245, 220)))
+        pen = QPen(QColor(100, 100, 100), pen_width)
+    else:
+        painter.setBrush(QBrush(bg_color))
+        pen = QPen(QColor(0, 0, 0), pen_width)
+    
+    painter.setPen(pen)
+    painter.drawRoundedRect(-25, -20, 50, 40, 5, 5)
+    
+    # Draw component symbol
+    font = QFont()
+    font.setBold(True)
+    painter.setFont(font)
+    painter.drawText(QRectF(-20, -15, 40, 30), Qt.AlignCenter, component.symbol)
+    
+    # Draw pin connection points
+    painter.setPen(QPen(QColor(200, 0, 0), 1.5))
+    for pin in pin_points:
+        painter.drawEllipse(pin, 3, 3)
+
+class SymbolCache:
+    """Pre-rendered component symbols shared by every ComponentItem.
+
+    There is one pixmap per (component type, state, zoom bucket). Buckets are
+    powers of two, rounded up, so a pixmap is only ever scaled down on screen.
+    Past MAX_ZOOM items paint vectors instead.
+    """
+    BOUNDS = QRectF(-30, -25, 60, 50)  # ComponentItem.boundingRect()
+    MIN_ZOOM = 0.25
+    MAX_ZOOM = 8.0
+    _pixmaps = {}
+
+    @classmethod
+    def zoom_bucket(cls, zoom):
+        bucket = 2.0 ** math.ceil(math.log2(max(zoom, cls.MIN_ZOOM)))
+        return min(bucket, cls.MAX_ZOOM)
+
+    @classmethod
+    def pixmap(cls, component, state="normal", zoom=1.0, device_ratio=1.0, pen_width=2,
+               bg_color=QColor(240, 240, 240)):
+        bucket = cls.zoom_bucket(zoom)
+        key = (component.name, component.symbol, component.pins, state, bucket,
+               device_ratio, pen_width, bg_color.rgba())
+        pixmap = cls._pixmaps.get(key)
+        if pixmap is None:
+            scale = bucket * device_ratio
+            pixmap = QPixmap(math.ceil(cls.BOUNDS.width() * scale),
+                             math.ceil(cls.BOUNDS.height() * scale))
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.scale(scale, scale)
+            painter.translate(-cls.BOUNDS.left(), -cls.BOUNDS.top())
+            paint_component_symbol(painter, component, component_pin_points(component.pins),
+                                   state, pen_width, bg_color)
+            painter.end()
+            pixmap.setDevicePixelRatio(device_ratio)
+            cls._pixmaps[key] = pixmap
+        return pixmap
+
+class ComponentItemState:
+    """Everything a ComponentItem keeps per instance, in one slotted record.
+
+    PySide items always have an instance dict; keeping their state here
+    leaves a single entry in it. Settings every item shares, such as the
+    pen width and background colour, are ComponentItem class attributes.
+    """
+    __slots__ = ("component", "layout", "scene_pins", "rotation_angle", "hovered")
 
 # Fix for the missing attributes in ComponentItem class
 class ComponentItem(QGraphicsItem):
-    def __init__(self, component, parent=None):
+    BODY_RECT = QRectF(-25, -20, 50, 40)
+    SIMPLE_LOD = 0.4  # Below this scale symbol text and pins are unreadable; draw a plain box
+    # Looking up Qt enums on the class is slow in PySide; itemChange runs for
+    # every change of every part, so resolve the ones it tests once
+    POSITION_CHANGE = QGraphicsItem.ItemPositionChange
+    SCENE_CHANGE = QGraphicsItem.ItemSceneChange
+    SCENE_HAS_CHANGED = QGraphicsItem.ItemSceneHasChanged
+    GEOMETRY_CHANGES = frozenset((QGraphicsItem.ItemPositionHasChanged, QGraphicsItem.ItemRotationHasChanged,
+                                  QGraphicsItem.ItemScaleHasChanged, QGraphicsItem.ItemTransformHasChanged,
+                                  QGraphicsItem.ItemSceneHasChanged))
+    # Set in one call: each flag change is a round trip through itemChange
+    ITEM_FLAGS = (QGraphicsItem.ItemIsMovable | QGraphicsItem.ItemIsSelectable |
+                  QGraphicsItem.ItemSendsGeometryChanges)  # Geometry changes drive grid snap and pin index updates
+    _pin_layouts = {}  # pin count -> (local QPointFs, local pin array), shared read-only by all items
+    pen_width = 2
+    bg_color = QColor(240, 240, 240)
+    
+    def __init__(self, component, parent=None, copy=True, pos=None):
         super().__init__(parent)
-        self.component = component
-        # Create a deep copy of the component for individual properties
-        if isinstance(component, Component):
-            # Create a new Component instance with the same attributes
-            self.component = Component(
-                component.name,
-                component.symbol,
-                component.pins
-            )
-            # Deep copy the properties dictionary to ensure independence
-            self.component.properties = component.properties.copy()
-        
-        # Fix: Add the missing attributes
-        self.hovered = False  # Add missing hovered attribute
-        self.pen_width = 2    # Add missing pen_width attribute
-        self.bg_color = QColor(240, 240, 240)  # Add background color
-        self.rotation_angle = 0  # Initialize rotation angle
-        
-        # Initialize pin points - this was missing
-        self.pin_points = []
-        self._generate_pin_points()  # Generate the pin points on initialization
-        
-        self.setFlag(QGraphicsItem.ItemIsMovable)
-        self.setFlag(QGraphicsItem.ItemIsSelectable)
+        # A frozen component is shared until this item is first edited, see
+        # own_component; any other is copied, unless it was built just for
+        # this item (e.g. when loading)
+        if copy and not component.frozen:
+            component = component.copy()
+        state = self._state = ComponentItemState()
+        state.component = component
+        state.layout = self._pin_layout(component.pins)
+        state.scene_pins = None  # Cached scene-space pin array, see scene_pins()
+        state.rotation_angle = 0
+        state.hovered = False
+        
+        if pos is not None:
+            self.setPos(pos)  # Before geometry changes are sent: the caller has already snapped it
+        self.setFlags(self.ITEM_FLAGS)
         self.setAcceptHoverEvents(True)  # Enable hover events
 
-    def _generate_pin_points(self):
-        # Generate pin connection points based on component type
-        self.pin_points = []
-        if self.component.pins == 2:  # Standard 2-pin components
-            self.pin_points = [QPointF(-25, 0), QPointF(25, 0)]
-        elif self.component.pins == 3:  # Transistors, etc.
-            self.pin_points = [QPointF(-25, 0), QPointF(25, -15), QPointF(25, 15)]
-        elif self.component.pins == 4:  # ICs, etc.
-            self.pin_points = [QPointF(-25, -15), QPointF(-25, 15), 
-                              QPointF(25, -15), QPointF(25, 15)]
+    @classmethod
+    def _pin_layout(cls, pins):
+        layout = cls._pin_layouts.get(pins)
+        if layout is None:
+            pin_points = component_pin_points(pins)
+            local_pins = np.array([(pin.x(), pin.y()) for pin in pin_points], dtype=float).reshape(-1, 2)
+            local_pins.setflags(write=False)
+            layout = cls._pin_layouts[pins] = (pin_points, local_pins)
+        return layout
+
+    @property
+    def component(self):
+        return self._state.component
+
+    def own_component(self):
+        """The item's component, first copied from a shared prototype; edit through this"""
+        state = self._state
+        if state.component.frozen:
+            state.component = state.component.copy()
+        return state.component
+
+    @property
+    def pin_points(self):
+        return self._state.layout[0]
+
+    @property
+    def rotation_angle(self):
+        return self._state.rotation_angle
+
+    @rotation_angle.setter
+    def rotation_angle(self, angle):
+        self._state.rotation_angle = angle
+
+    @property
+    def hovered(self):
+        return self._state.hovered
+
+    @hovered.setter
+    def hovered(self, hovered):
+        self._state.hovered = hovered
+
+    def scene_pins(self):
+        """(n, 2) array of pin positions in scene coordinates.
+
+        Includes position, rotation and any transform such as mirroring. The
+        array is computed once and reused until itemChange reports a move.
+        """
+        state = self._state
+        if state.scene_pins is None:
+            t = self.sceneTransform()
+            linear = np.array([[t.m11(), t.m12()], [t.m21(), t.m22()]])
+            state.scene_pins = state.layout[1] @ linear + (t.dx(), t.dy())
+        return state.scene_pins
+
+    def scene_pin(self, index):
+        """Scene position of one pin as a QPointF"""
+        x, y = self.scene_pins()[index]
+        return QPointF(x, y)
 
     def boundingRect(self):
         return QRectF(-30, -25, 60, 50)
 
     def paint(self, painter, option, widget):
-        # Draw component with professional appearance
-        painter.setRenderHint(QPainter.Antialiasing)
-        
-        # Background fill
         if self.isSelected():
-            background = QLinearGradient(0, -25, 0, 25)
-            background.setColorAt(0, QColor(200, 230, 250))
-            background.setColorAt(1, QColor(150, 200, 240))
-            painter.setBrush(QBrush(background))
-            pen = QPen(QColor(50, 100, 220), self.pen_width)
+            state = "selected"
         elif self.hovered:
-            painter.setBrush(QBrush(QColor(245, 245, 220)))
-            pen = QPen(QColor(100, 100, 100), self.pen_width)
+            state = "hover"
         else:
-            painter.setBrush(QBrush(self.bg_color))
-            pen = QPen(QColor(0, 0, 0), self.pen_width)
-        
-        painter.setPen(pen)
-        painter.drawRoundedRect(-25, -20, 50, 40, 5, 5)
-        
-        # Draw component symbol
-        font = QFont()
-        font.setBold(True)
-        painter.setFont(font)
-        painter.drawText(QRectF(-20, -15, 40, 30), Qt.AlignCenter, self.component.symbol)
+            state = "normal"
+        
+        zoom = option.levelOfDetailFromTransform(painter.worldTransform())
+        if zoom < self.SIMPLE_LOD:
+            painter.setRenderHint(QPainter.Antialiasing, False)
+            if state == "selected":
+                painter.setPen(QPen(QColor(50, 100, 220), 0))
+                painter.setBrush(QBrush(QColor(175, 215, 245)))
+            elif state == "hover":
+                painter.setPen(QPen(QColor(100, 100, 100), 0))
+                painter.setBrush(QBrush(QColor(245, 245, 220)))
+            else:
+                painter.setPen(QPen(QColor(0, 0, 0), 0))
+                painter.setBrush(QBrush(self.bg_color))
+            painter.drawRect(self.BODY_RECT)
+            return
+        if zoom > SymbolCache.MAX_ZOOM:
+            # Closer than the largest cached bucket: draw crisp vectors
+            paint_component_symbol(painter, self.component, self.pin_points, state,
+                                   self.pen_width, self.bg_color)
+            return
         
-        # Draw pin connection points
-        painter.setPen(QPen(QColor(200, 0, 0), 1.5))
-        for pin in self.pin_points:
-            painter.drawEllipse(pin, 3, 3)
+        # Blit the shared pre-rendered symbol for this type, state and zoom
+        device = painter.device()
+        ratio = device.devicePixelRatioF() if device is not None else 1.0
+        pixmap = SymbolCache.pixmap(self.component, state, zoom, ratio,
+                                    self.pen_width, self.bg_color)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        painter.drawPixmap(SymbolCache.BOUNDS, pixmap, QRectF(pixmap.rect()))
 
     def hoverEnterEvent(self, event):
         self.hovered = True
@@ -142,12 +372,51 @@ class ComponentItem(QGraphicsItem):
         super().hoverLeaveEvent(event)
 
     def itemChange(self, change, value):
-        if change == QGraphicsItem.ItemPositionChange:
+        if change == self.POSITION_CHANGE:
             # Snap to grid (grid size 10x10)
             grid_size = 10
             x = round(value.x() / grid_size) * grid_size
             y = round(value.y() / grid_size) * grid_size
             return QPointF(x, y)
+        if change in self.GEOMETRY_CHANGES:
+            self._state.scene_pins = None
+        elif change != self.SCENE_CHANGE:
+            return super().itemChange(change, value)
+        # Read the scene once: PySide6 6.12 drops a reference to None every
+        # time scene() returns None, and bulk loads crash once it runs out
+        scene = self.scene()
+        if scene is None:
+            return super().itemChange(change, value)
+        if change == self.SCENE_CHANGE:
+            # Leaving the current scene: drop our pins from its index
+            index = getattr(scene, 'pin_index', None)
+            if index is not None:
+                index.remove_item(self)
+            router = getattr(scene, 'wire_router', None)
+            if router is not None:
+                router.remove_obstacle(self)
+            erc = getattr(scene, 'erc', None)
+            if erc is not None:
+                erc.remove_component(self)
+        else:
+            index = getattr(scene, 'pin_index', None)
+            if index is not None:
+                index.update_item(self)
+            erc = getattr(scene, 'erc', None)
+            if erc is not None and change == self.SCENE_HAS_CHANGED:
+                erc.add_component(self)
+            # Block the body for routing; wires already running through it must go around
+            blocked = ()
+            router = getattr(scene, 'wire_router', None)
+            if router is not None:
+                body = self.mapRectToScene(self.BODY_RECT)
+                blocked = router.set_obstacle(self, body.left(), body.top(), body.right(), body.bottom())
+            # Drag attached wires along; only this part's own wires are visited
+            wires = getattr(scene, 'wire_adjacency', None)
+            if wires is not None:
+                wires.follow(self)
+                wires.reroute([wire for wire in blocked
+                               if wire.start_component is not self and wire.end_component is not self])
         return super().itemChange(change, value)
     
     def mousePressEvent(self, event):
@@ -159,8 +428,17 @@ class ComponentItem(QGraphicsItem):
     def showPropertyEditor(self):
         """Show the property editor dialog for this component"""
         dialog = PropertyEditorDialog(self.component)
-        if dialog.exec():
-            self.update()  # Redraw the component if properties changed
+        if not dialog.exec():
+            return
+        before = dict(self.component.properties)
+        changes = {key: text for key, text in dialog.changes.items() if before.get(key) != text}
+        if not changes:
+            return  # A part left as it was stays on its shared component
+        self.own_component().set_properties(changes)
+        history = getattr(self.scene(), 'history', None)
+        if history is not None:
+            history.record(PropertyCommand.from_edit(self, before))
+        self.update()  # Redraw the component with its new properties
 
     def setMovable(self, movable):
         """Enable or disable movement of the component"""
@@ -169,10 +447,640 @@ class ComponentItem(QGraphicsItem):
         else:
             self.setFlag(QGraphicsItem.ItemIsMovable, False)
 
+class PinIndex:
+    """Grid-bucketed index of scene-space component pins and centers.
+
+    Points are hashed into square cells of cell_size scene units, so a radius
+    query only visits the few cells that overlap the search circle no matter
+    how many components are on the schematic. ComponentItem keeps its own
+    entries current from itemChange.
+    """
+    CENTER = -1  # Pin index used for a component's center entry
+
+    def __init__(self, cell_size=50):
+        self.cell_size = cell_size
+        self.cells = {}   # (cx, cy) -> list of (x, y, item, pin index)
+        self.owners = {}  # item -> cells holding its entries
+        self.version = 0  # Bumped on every change so views can cache derived data
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def update_item(self, item):
+        """(Re)insert an item's pins and center at their current scene positions"""
+        self.remove_item(item)
+        center = item.scenePos()
+        points = [(center.x(), center.y(), self.CENTER)]
+        points.extend((x, y, idx) for idx, (x, y) in enumerate(item.scene_pins().tolist()))
+        owned = set()
+        for x, y, idx in points:
+            cell = self._cell(x, y)
+            self.cells.setdefault(cell, []).append((x, y, item, idx))
+            owned.add(cell)
+        self.owners[item] = tuple(owned)  # A tuple is a quarter of the size of a small set
+
+    def remove_item(self, item):
+        self.version += 1
+        for cell in self.owners.pop(item, ()):
+            entries = [entry for entry in self.cells[cell] if entry[2] is not item]
+            if entries:
+                self.cells[cell] = entries
+            else:
+                del self.cells[cell]
+
+    def _nearest(self, pos, radius, exclude, centers):
+        x, y = pos.x(), pos.y()
+        x0, y0 = self._cell(x - radius, y - radius)
+        x1, y1 = self._cell(x + radius, y + radius)
+        best = None
+        best_dist = radius * radius
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for entry in self.cells.get((cx, cy), ()):
+                    if (entry[3] == self.CENTER) != centers or entry[2] is exclude:
+                        continue
+                    dist = (entry[0] - x) ** 2 + (entry[1] - y) ** 2
+                    if dist < best_dist:
+                        best_dist = dist
+                        best = entry
+        return best
+
+    def nearest_pin(self, pos, radius, exclude=None):
+        """(component, pin index, scene QPointF) of the closest pin within radius, or None"""
+        entry = self._nearest(pos, radius, exclude, centers=False)
+        if entry is None:
+            return None
+        return entry[2], entry[3], QPointF(entry[0], entry[1])
+
+    def pins_near(self, pos, tolerance):
+        """(component, pin index) of every pin within tolerance of pos on both axes"""
+        x, y = pos.x(), pos.y()
+        x0, y0 = self._cell(x - tolerance, y - tolerance)
+        x1, y1 = self._cell(x + tolerance, y + tolerance)
+        return [(entry[2], entry[3])
+                for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)
+                for entry in self.cells.get((cx, cy), ())
+                if entry[3] != self.CENTER
+                and abs(entry[0] - x) < tolerance and abs(entry[1] - y) < tolerance]
+
+    def nearest_component(self, pos, radius):
+        """Component whose center is closest to pos within radius, or None"""
+        entry = self._nearest(pos, radius, None, centers=True)
+        return entry[2] if entry is not None else None
+
+class WireAdjacency:
+    """Component -> attached wire ends, so moving a part only touches its own wires"""
+
+    def __init__(self):
+        self.ends = {}  # component -> set of (wire, True for the wire's start end)
+        self.pending = None  # Wires to update when the current batch edit ends
+
+    def attach(self, wire):
+        self.ends.setdefault(wire.start_component, set()).add((wire, True))
+        self.ends.setdefault(wire.end_component, set()).add((wire, False))
+
+    def detach(self, wire):
+        for component, is_start in ((wire.start_component, True), (wire.end_component, False)):
+            ends = self.ends.get(component)
+            if ends is not None:
+                ends.discard((wire, is_start))
+                if not ends:
+                    del self.ends[component]
+
+    def wires_of(self, component):
+        """Wires with at least one end on component"""
+        return {wire for wire, _ in self.ends.get(component, ())}
+
+    def follow(self, component):
+        """Move the attached wire ends onto the component's current pin positions"""
+        if self.pending is not None:
+            self.pending.update(self.wires_of(component))
+            return
+        for wire, is_start in self.ends.get(component, ()):
+            if is_start:
+                pin = component.scene_pin(wire.start_pin_index)
+                wire.update_start_point(pin.x(), pin.y())
+            else:
+                pin = component.scene_pin(wire.end_pin_index)
+                wire.update_end_point(pin.x(), pin.y())
+
+    def reroute(self, wires):
+        """Recalculate wire paths now, or when the current batch edit ends"""
+        if self.pending is not None:
+            self.pending.update(wires)
+            return
+        for wire in wires:
+            wire.recalculate_path()
+
+    def begin_batch(self):
+        self.pending = set()
+
+    def end_batch(self):
+        """Update every wire touched during the batch once, from its parts' final pins"""
+        pending, self.pending = self.pending, None
+        for wire in pending:
+            if wire.scene() is None:
+                continue  # Deleted during the batch
+            wire.start_pos = wire.start_component.scene_pin(wire.start_pin_index)
+            wire.end_pos = wire.end_component.scene_pin(wire.end_pin_index)
+            wire.recalculate_path()
+
+class ElectricalRuleCheck:
+    """Live electrical rule check over the pin/wire connectivity graph.
+
+    A pin is (component, pin index) and a net is a set of pins joined by wires.
+    Every edit updates the nets and the error tallies it touches, so the error
+    list is always current without re-validating the whole circuit.
+    """
+    SOURCE_TYPES = ("Battery",)
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change  # Called after every edit that may change the errors
+        self.components = set()
+        self.open_pins = {}    # component -> indices of its pins without a wire, if any
+        self.wire_ends = {}    # wire -> (start pin, end pin)
+        self.floating = set()  # wires with an end not on a pin of a placed component
+        self.pin_wires = {}    # pin -> linked wires ending on it
+        self.net_of = {}       # pin -> net id, for pins with at least one wire
+        self.nets = {}         # net id -> pins
+        self.shorted = set()   # sources with both terminals on one net
+        self.source_count = 0
+        self._next_net = 0
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def _is_source(self, component):
+        return component.component.name in self.SOURCE_TYPES
+
+    # Edit events
+
+    def add_component(self, component):
+        if component in self.components:
+            return
+        self.components.add(component)
+        pins = component.component.pins
+        free = {i for i in range(pins) if (component, i) not in self.pin_wires}
+        if free:
+            self.open_pins[component] = free
+        if self._is_source(component):
+            self.source_count += 1
+        # Wires left dangling when this part was removed reconnect to it
+        for wire in [w for w in self.floating if component in (self.wire_ends[w][0][0], self.wire_ends[w][1][0])]:
+            if self._linkable(wire):
+                self.floating.discard(wire)
+                self._link(wire)
+        self._changed()
+
+    def remove_component(self, component):
+        if component not in self.components:
+            return
+        for index in range(component.component.pins):
+            for wire in list(self.pin_wires.get((component, index), ())):
+                self._unlink(wire)
+                self.floating.add(wire)
+        self.components.discard(component)
+        self.open_pins.pop(component, None)
+        self.shorted.discard(component)
+        if self._is_source(component):
+            self.source_count -= 1
+        self._changed()
+
+    def add_wire(self, wire):
+        if wire in self.wire_ends:
+            return
+        self.wire_ends[wire] = ((wire.start_component, wire.start_pin_index),
+                                (wire.end_component, wire.end_pin_index))
+        if self._linkable(wire):
+            self._link(wire)
+        else:
+            self.floating.add(wire)
+        self._changed()
+
+    def remove_wire(self, wire):
+        if wire not in self.wire_ends:
+            return
+        if wire in self.floating:
+            self.floating.discard(wire)
+        else:
+            self._unlink(wire)
+        del self.wire_ends[wire]
+        self._changed()
+
+    # Graph upkeep
+
+    def _linkable(self, wire):
+        return all(component in self.components and 0 <= index < component.component.pins
+                   for component, index in self.wire_ends[wire])
+
+    def _new_net(self, pins):
+        net = self._next_net
+        self._next_net += 1
+        self.nets[net] = pins
+        for pin in pins:
+            self.net_of[pin] = net
+        return net
+
+    def _link(self, wire):
+        """Join the nets at both ends of a wire"""
+        for component, index in self.wire_ends[wire]:
+            self.pin_wires.setdefault((component, index), set()).add(wire)
+            free = self.open_pins.get(component)
+            if free is not None:
+                free.discard(index)
+                if not free:
+                    del self.open_pins[component]
+            if (component, index) not in self.net_of:
+                self._new_net({(component, index)})
+
+        a, b = (self.net_of[pin] for pin in self.wire_ends[wire])
+        if a == b:
+            return
+        # Merge the smaller net into the larger; only moved pins can create a short
+        if len(self.nets[a]) < len(self.nets[b]):
+            a, b = b, a
+        moved = self.nets.pop(b)
+        self.nets[a].update(moved)
+        for pin in moved:
+            self.net_of[pin] = a
+        self._check_shorts(moved)
+
+    def _unlink(self, wire):
+        """Drop a wire and split its net again if that disconnects it"""
+        start, _ = self.wire_ends[wire]
+        pins = self.nets.pop(self.net_of[start])
+        for pin in self.wire_ends[wire]:
+            wires = self.pin_wires.get(pin)
+            if wires is not None:
+                wires.discard(wire)
+                if not wires:
+                    del self.pin_wires[pin]
+                    component, index = pin
+                    if component in self.components:
+                        self.open_pins.setdefault(component, set()).add(index)
+        for pin in pins:
+            del self.net_of[pin]
+
+        # Walk the remaining wires of the old net to find its pieces
+        for pin in pins:
+            if pin in self.net_of or pin not in self.pin_wires:
+                continue
+            piece = {pin}
+            stack = [pin]
+            while stack:
+                for other_wire in self.pin_wires[stack.pop()]:
+                    for other in self.wire_ends[other_wire]:
+                        if other not in piece:
+                            piece.add(other)
+                            stack.append(other)
+            self._new_net(piece)
+        self._check_shorts(pins)
+
+    def _check_shorts(self, pins):
+        for component, _ in pins:
+            if self._is_source(component):
+                net = self.net_of.get((component, 0))
+                if net is not None and net == self.net_of.get((component, 1)):
+                    self.shorted.add(component)
+                else:
+                    self.shorted.discard(component)
+
+    def errors(self):
+        """Current error messages"""
+        errors = [f"{component.component.name} has {len(free)} unconnected pins"
+                  for component, free in self.open_pins.items()]
+        errors.extend("Floating wire detected" for _ in self.floating)
+        errors.extend(f"{component.component.name} is shorted: both terminals are on one net"
+                      for component in self.shorted)
+        if self.components and not self.source_count:
+            errors.append("No voltage source to serve as the ground reference")
+        return errors
+
+class EditTransaction:
+    """Adds, deletes, moves and rotations applied as one edit; see CircuitCanvas.edit"""
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.added = 0
+        self.deleted = 0
+        self.moved = 0
+        self.rotated = 0
+        self.mirrored = 0
+
+    def add(self, component, position):
+        """Place a new component at a scene position, snapped to the grid"""
+        self.added += 1
+        item = self.canvas._add_component(component, position)
+        self.canvas.history.record(AddItemsCommand([item]))
+        return item
+
+    def delete(self, items):
+        """Delete components with their wires, and wires"""
+        for item in items:
+            self.canvas._delete_item(item)
+            self.deleted += 1
+
+    def move(self, items, dx, dy):
+        moves = {}
+        for item in items:
+            if isinstance(item, ComponentItem):
+                old = item.pos()
+                item.moveBy(dx, dy)
+                moves[item] = (old, item.pos())
+                self.moved += 1
+        if moves:
+            self.canvas.history.record(MoveCommand(moves))
+
+    def rotate(self, items, angle=90):
+        rotated = [item for item in items if isinstance(item, ComponentItem)]
+        for item in rotated:
+            item.rotation_angle += angle
+            item.setRotation(item.rotation_angle)
+        self.rotated += len(rotated)
+        if rotated:
+            self.canvas.history.record(RotateCommand(rotated, angle))
+
+    def mirror(self, items):
+        """Flip components horizontally; mirroring twice restores them"""
+        mirrored = [item for item in items if isinstance(item, ComponentItem)]
+        for item in mirrored:
+            # Combining with the current transform toggles the flip
+            item.setTransform(QTransform.fromScale(-1, 1), True)
+        self.mirrored += len(mirrored)
+        if mirrored:
+            self.canvas.history.record(MirrorCommand(mirrored))
+
+    def summary(self):
+        parts = [f"{verb} {count} item(s)" for verb, count in
+                 (("Added", self.added), ("Deleted", self.deleted),
+                  ("Moved", self.moved), ("Rotated", self.rotated),
+                  ("Mirrored", self.mirrored)) if count]
+        return ", ".join(parts)
+
+class EditCommand:
+    """Undo entry base: verb and count name the change, size estimates the bytes it holds"""
+    verb = "Edit"
+    count = 0
+    size = 0
+
+    @property
+    def text(self):
+        return f"{self.verb} {self.count} item(s)"
+
+    def touched(self):
+        """Items whose saved state the command changes"""
+        return ()
+
+class AddItemsCommand(EditCommand):
+    """Undo entry for components and wires placed on the canvas.
+
+    Entries hold the items themselves rather than a copy of the scene; undo
+    takes them out of the scene and redo puts the same objects back.
+    """
+    verb = "Add"
+    ITEM_BYTES = 2048  # Rough cost of keeping one removed item alive
+
+    def __init__(self, components=(), wires=()):
+        self.components = list(components)
+        self.wires = list(wires)
+        self.count = len(self.components) + len(self.wires)
+        self.size = self.ITEM_BYTES * self.count
+
+    def touched(self):
+        return self.components + self.wires
+
+    def undo(self, canvas):
+        for wire in self.wires:
+            canvas._remove_wire(wire)
+        for component in self.components:
+            canvas._delete_item(component)
+
+    def redo(self, canvas):
+        for component in self.components:
+            canvas.scene.addItem(component)
+        for wire in self.wires:
+            canvas._restore_wire(wire)
+
+class DeleteItemsCommand(AddItemsCommand):
+    """Undo entry for deleted components and the wires removed with them"""
+    verb = "Delete"
+
+    def undo(self, canvas):
+        AddItemsCommand.redo(self, canvas)
+
+    def redo(self, canvas):
+        AddItemsCommand.undo(self, canvas)
+
+class MoveCommand(EditCommand):
+    """Undo entry for moved components: item -> (old position, new position)"""
+    verb = "Move"
+    ENTRY_BYTES = 160
+
+    def __init__(self, moves):
+        self.moves = moves
+        self.count = len(moves)
+        self.size = self.ENTRY_BYTES * self.count
+
+    def touched(self):
+        return self.moves.keys()
+
+    def undo(self, canvas):
+        for item, (old, _) in self.moves.items():
+            item.setPos(old)
+
+    def redo(self, canvas):
+        for item, (_, new) in self.moves.items():
+            item.setPos(new)
+
+class RotateCommand(EditCommand):
+    """Undo entry for components rotated by the same angle"""
+    verb = "Rotate"
+    ENTRY_BYTES = 64
+
+    def __init__(self, items, angle):
+        self.items = list(items)
+        self.angle = angle
+        self.count = len(self.items)
+        self.size = self.ENTRY_BYTES * self.count
+
+    def touched(self):
+        return self.items
+
+    def _turn(self, angle):
+        for item in self.items:
+            item.rotation_angle += angle
+            item.setRotation(item.rotation_angle)
+
+    def undo(self, canvas):
+        self._turn(-self.angle)
+
+    def redo(self, canvas):
+        self._turn(self.angle)
+
+class MirrorCommand(EditCommand):
+    """Undo entry for mirrored components; the flip is its own inverse"""
+    verb = "Mirror"
+    ENTRY_BYTES = 64
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.count = len(self.items)
+        self.size = self.ENTRY_BYTES * self.count
+
+    def touched(self):
+        return self.items
+
+    def undo(self, canvas):
+        for item in self.items:
+            item.setTransform(QTransform.fromScale(-1, 1), True)
+
+    redo = undo
+
+class PropertyCommand(EditCommand):
+    """Undo entry for one component's edited properties: key -> (old, new)"""
+    verb = "Edit properties of"
+    count = 1
+    ENTRY_BYTES = 256
+
+    def __init__(self, item, changes):
+        self.item = item
+        self.changes = changes
+        self.size = self.ENTRY_BYTES * len(changes)
+
+    @classmethod
+    def from_edit(cls, item, before):
+        """Command for the properties that differ from before, or None"""
+        after = item.component.properties
+        changes = {key: (before.get(key), value) for key, value in after.items()
+                   if before.get(key) != value}
+        return cls(item, changes) if changes else None
+
+    def touched(self):
+        return (self.item,)
+
+    def _apply(self, index):
+        self.item.own_component().set_properties({key: values[index] for key, values in self.changes.items()})
+        self.item.update()
+
+    def undo(self, canvas):
+        self._apply(0)
+
+    def redo(self, canvas):
+        self._apply(1)
+
+class CompoundCommand(EditCommand):
+    """Undo entry for everything recorded in one edit transaction"""
+
+    def __init__(self, commands):
+        self.commands = commands
+        self.size = sum(command.size for command in commands)
+
+    @property
+    def text(self):
+        counts = {}
+        for command in self.commands:
+            counts[command.verb] = counts.get(command.verb, 0) + command.count
+        return ", ".join(f"{verb} {count} item(s)" for verb, count in counts.items())
+
+    def touched(self):
+        return [item for command in self.commands for item in command.touched()]
+
+    def undo(self, canvas):
+        for command in reversed(self.commands):
+            command.undo(canvas)
+
+    def redo(self, canvas):
+        for command in self.commands:
+            command.redo(canvas)
+
+class UndoHistory:
+    """Undo and redo stacks of edit commands, trimmed to a memory budget.
+
+    Commands are deltas holding only the items they touched, so undoing or
+    redoing costs time in proportion to the change. When the estimated size
+    of both stacks passes limit_bytes the oldest undo entries are dropped.
+    """
+
+    def __init__(self, limit_bytes=64 * 1024 * 1024, on_change=None):
+        self.limit_bytes = limit_bytes
+        self.on_change = on_change  # Called when the stacks change
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.size = 0
+        self.applying = False  # Set while undoing or redoing so nothing is recorded
+        self.on_edit = None  # Called with each command recorded, undone or redone
+        self._group = None
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def record(self, command):
+        """Add a command for an edit that has already been applied"""
+        if command is None or self.applying:
+            return
+        if self._group is not None:
+            self._group.append(command)
+            return
+        for dropped in self.redo_stack:
+            self.size -= dropped.size
+        self.redo_stack.clear()
+        self.undo_stack.append(command)
+        self.size += command.size
+        while self.size > self.limit_bytes and len(self.undo_stack) > 1:
+            self.size -= self.undo_stack.popleft().size
+        if self.on_edit is not None:
+            self.on_edit(command)
+        self._changed()
+
+    def clear(self):
+        """Forget every entry, e.g. when another project is opened"""
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.size = 0
+        self._changed()
+
+    def begin_group(self):
+        self._group = []
+
+    def end_group(self):
+        """Record the commands since begin_group as one entry"""
+        group, self._group = self._group, None
+        if len(group) == 1:
+            self.record(group[0])
+        elif group:
+            self.record(CompoundCommand(group))
+
+    def undo(self, canvas):
+        """Undo the latest entry; returns its text, or None if there was none"""
+        return self._apply(canvas, self.undo_stack, self.redo_stack, "undo")
+
+    def redo(self, canvas):
+        return self._apply(canvas, self.redo_stack, self.undo_stack, "redo")
+
+    def _apply(self, canvas, source, target, method):
+        if not source:
+            return None
+        command = source.pop()
+        self.applying = True
+        try:
+            with canvas.edit():
+                getattr(command, method)(canvas)
+        finally:
+            self.applying = False
+        target.append(command)
+        if self.on_edit is not None:
+            self.on_edit(command)
+        self._changed()
+        return command.text
+
 class PropertyEditorDialog(QDialog):
+    """Editor for a component's properties; the accepted texts are left in changes, not applied"""
     def __init__(self, component, parent=None):
         super().__init__(parent)
         self.component = component
+        self.changes = {}
         self.setWindowTitle(f"Edit {component.name} Properties")
         self.setMinimumWidth(300)
         
@@ -182,35 +1090,24 @@ class PropertyEditorDialog(QDialog):
         # Form layout for properties
         form_layout = QFormLayout()
         
-        # Create editors for each property
+        # Create editors for each property, as its parameter describes it
         self.editors = {}
+        parameters = component.component_type.parameters
         for key, value in component.properties.items():
-            if "Resistance" in key or "Voltage" in key or "Current" in key or "Power" in key:
-                editor = QDoubleSpinBox()
-                editor.setRange(0, 1000000)
-                editor.setValue(float(value))
-                editor.setDecimals(6)  # Allow for small values like capacitance
-                editor.setSuffix(f" {key.split('(')[1].split(')')[0]}")
-            elif "Type" in key or "Color" in key:
+            parameter = parameters.get(key)
+            kind = parameter.kind if parameter is not None else None
+            if kind == CHOICE:
                 editor = QComboBox()
-                if "Type" in key and "Transistor" in component.name:
-                    editor.addItems(["NPN", "PNP", "MOSFET-N", "MOSFET-P"])
-                elif "Type" in key and "Capacitor" in component.name:
-                    editor.addItems(["Ceramic", "Electrolytic", "Tantalum", "Film"])
-                elif "Type" in key and "Switch" in component.name:
-                    editor.addItems(["SPST", "SPDT", "DPST", "DPDT"])
-                elif "Color" in key:
-                    editor.addItems(["Red", "Green", "Blue", "Yellow", "White", "RGB"])
-                elif "Type" in key and "IC" in component.name:
-                    editor.addItems(["Op-Amp", "Microcontroller", "Logic Gate", "Timer"])
-                elif "Type" in key:
-                    editor.addItems(["DC", "AC"])
-                
-                current_index = editor.findText(value)
-                if current_index >= 0:
-                    editor.setCurrentIndex(current_index)
+                editor.addItems(parameter.choices)
+                if editor.findText(value) < 0:
+                    editor.addItem(value)  # Keep a value from a file or netlist
+                editor.setCurrentText(value)
+            elif kind == FIXED:
+                editor = QLabel(value)
             else:
                 editor = QLineEdit(value)
+                if kind == NUMBER:
+                    editor.setToolTip("A number; engineering notation such as 4.7k or 10u is accepted")
             
             form_layout.addRow(key, editor)
             self.editors[key] = editor
@@ -227,22 +1124,33 @@ class PropertyEditorDialog(QDialog):
         button_layout.addWidget(ok_button)
         button_layout.addWidget(cancel_button)
         layout.addLayout(button_layout)
-        
-        # Connect accept signal
-        self.accepted.connect(self.update_properties)
     
-    def update_properties(self):
-        """Update component properties from editors"""
+    def accept(self):
+        """Check the edited properties and keep them in changes; a value that does not parse keeps the dialog open"""
+        changes = {}
         for key, editor in self.editors.items():
-            if isinstance(editor, QDoubleSpinBox):
-                self.component.properties[key] = str(editor.value())
-            elif isinstance(editor, QComboBox):
-                self.component.properties[key] = editor.currentText()
-            else:
-                self.component.properties[key] = editor.text()
+            if isinstance(editor, QComboBox):
+                changes[key] = editor.currentText()
+            elif isinstance(editor, QLineEdit):
+                changes[key] = editor.text().strip()
+        try:
+            self.component.component_type.parse({**self.component.properties, **changes})
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid Value", str(e))
+            return
+        self.changes = changes
+        super().accept()
 
 class SmartWire(QGraphicsPathItem):
-    def __init__(self, x1, y1, x2, y2, parent=None):
+    SIMPLE_LOD = 0.5  # Below this scale draw a 1 px aliased line
+    revision = 0  # Bumped when any wire's path or pen changes, for the canvas overview
+    # Built once: a project load creates thousands of wires and Qt enum lookups are slow
+    PEN = QPen(QColor(0, 0, 0), 4.0, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+    HOVER_PEN = QPen(QColor(0, 100, 255), 4.0, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+    ITEM_FLAGS = QGraphicsItem.ItemIsSelectable | QGraphicsItem.ItemIsFocusable
+    
+    def __init__(self, x1, y1, x2, y2, parent=None, recalculate=True):
+        """recalculate=False leaves the path empty, for callers that set it once placed"""
         super().__init__(parent)
         self.start_pos = QPointF(x1, y1)
         self.end_pos = QPointF(x2, y2)
@@ -252,26 +1160,32 @@ class SmartWire(QGraphicsPathItem):
         self.end_pin_index = -1
         
         # Make wire more visible
-        self.setPen(QPen(QColor(0, 0, 0), 4.0, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
+        self.setPen(self.PEN)
         self.setZValue(-1)
-        self.setFlag(QGraphicsItem.ItemIsSelectable)
-        self.setFlag(QGraphicsItem.ItemIsFocusable)
+        self.setFlags(self.ITEM_FLAGS)
         self.setAcceptHoverEvents(True)
         
-        self.recalculate_path()
+        if recalculate:
+            self.recalculate_path()
 
     def hoverEnterEvent(self, event):
         # Highlight wire on hover
-        self.setPen(QPen(QColor(0, 100, 255), 4.0, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
+        self.setPen(self.HOVER_PEN)
         super().hoverEnterEvent(event)
 
     def hoverLeaveEvent(self, event):
         # Reset wire appearance
-        self.setPen(QPen(QColor(0, 0, 0), 4.0, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
+        self.setPen(self.PEN)
         super().hoverLeaveEvent(event)
 
     def recalculate_path(self):
         """Calculate the smart path for the wire with Manhattan routing"""
+        # Wires between two parts are routed around component bodies when the scene has a router
+        router = getattr(self.scene(), 'wire_router', None)
+        if router is not None and self.start_component is not None and self.end_component is not None:
+            if self._set_polyline(router.route(self, *self._route_ends())):
+                return
+        
         # Create a path with horizontal and vertical segments
         path = QPainterPath()
         path.moveTo(self.start_pos)
@@ -293,6 +1207,37 @@ class SmartWire(QGraphicsPathItem):
         
         path.lineTo(self.end_pos)
         self.setPath(path)
+        SmartWire.revision += 1
+    
+    def restore_route(self, corners):
+        """Take a route saved with the project instead of searching for a new one"""
+        router = getattr(self.scene(), 'wire_router', None)
+        if (router is None or self.start_component is None or self.end_component is None or
+                not self._set_polyline(router.restore(self, *self._route_ends(), corners))):
+            self.recalculate_path()
+
+    def _route_ends(self):
+        """Router arguments: each pin with the center of the part it belongs to"""
+        start_center = self.start_component.scenePos()
+        end_center = self.end_component.scenePos()
+        return ((self.start_pos.x(), self.start_pos.y()), (start_center.x(), start_center.y()),
+                (self.end_pos.x(), self.end_pos.y()), (end_center.x(), end_center.y()))
+
+    def _set_polyline(self, points):
+        """Use a routed polyline as the path; False if there was no route"""
+        if not points:
+            return False
+        path = QPainterPath()
+        path.moveTo(*points[0])
+        for point in points[1:]:
+            path.lineTo(*point)
+        self.setPath(path)
+        SmartWire.revision += 1
+        return True
+
+    def setPen(self, pen):
+        SmartWire.revision += 1
+        super().setPen(pen)
     
     def update_end_point(self, x, y):
         """Update the end point of the wire and recalculate the path"""
@@ -307,9 +1252,12 @@ class SmartWire(QGraphicsPathItem):
     def paint(self, painter, option, widget):
         if self.isSelected():
             pen = QPen(QColor(50, 100, 220), 2.5, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
-            painter.setPen(pen)
         else:
-            painter.setPen(self.pen())
+            pen = self.pen()
+        if option.levelOfDetailFromTransform(painter.worldTransform()) < self.SIMPLE_LOD:
+            pen = QPen(pen.color(), 0)
+            painter.setRenderHint(QPainter.Antialiasing, False)
+        painter.setPen(pen)
         painter.drawPath(self.path())
     
     def mousePressEvent(self, event):
@@ -326,9 +1274,15 @@ class CircuitSimulator:
         self.connections = []
         self.voltage_sources = []
         self.ground_nodes = []
+        self.dc_system = None  # Equations of the last operating point, reused while the wiring is unchanged
         
     def add_component(self, component_id, component_type, value, connections=None):
-        """Add a component to the simulation"""
+        """Add a component to the simulation.
+        
+        value is a number, or text such as '4.7k' that is parsed here once.
+        """
+        if isinstance(value, str):
+            value = parse_value(value.strip()) or 0.0
         self.components[component_id] = {
             'type': component_type,
             'value': value,
@@ -339,6 +1293,25 @@ class CircuitSimulator:
         if component_type == "Battery":
             self.voltage_sources.append(component_id)
     
+    def add_subcircuit(self, component_id, definition):
+        """Add an instance of a subcircuit block; its pins are the block's ports, in order"""
+        self.add_component(component_id, SUBCIRCUIT, definition)
+    
+    def operating_point(self):
+        """DC node voltages and part currents of the whole circuit, see nodal.DCSystem.
+        
+        Every instance of a block shares one reduced stamp, so only the
+        top-level nodes are solved for. The ordering and symbolic analysis
+        are kept between calls; after a change of values only the numbers
+        are refactored.
+        """
+        components = {component_id: (component['type'], component['value'])
+                      for component_id, component in self.components.items()}
+        connections = [(conn['from'], conn['to']) for conn in self.connections]
+        if self.dc_system is None or self.dc_system.connections != connections:
+            self.dc_system = DCSystem(components, connections)
+        return self.dc_system.solve(components)
+    
     def add_connection(self, from_component, from_pin, to_component, to_pin):
         """Add a connection between components"""
         self.connections.append({
@@ -346,6 +1319,39 @@ class CircuitSimulator:
             'to': (to_component, to_pin)
         })
     
+    @classmethod
+    def from_dict(cls, spec):
+        """Build a simulator from a circuit description dictionary.
+
+        Format: {"components": [{"id", "type", "value"}, ...],
+        "connections": [[from_id, from_pin, to_id, to_pin], ...]}
+        """
+        simulator = cls()
+        for component in spec.get('components', []):
+            simulator.add_component(str(component['id']), component['type'], component['value'])
+        for from_id, from_pin, to_id, to_pin in spec.get('connections', []):
+            simulator.add_connection(str(from_id), from_pin, str(to_id), to_pin)
+        return simulator
+    
+    @classmethod
+    def from_netlist(cls, source):
+        """Build a simulator straight from a SPICE netlist, without placing any parts.
+        
+        source is a path or an iterable of lines; cards are streamed and each
+        pin is connected to the previous pin on its node.
+        """
+        simulator = cls()
+        last_pin = {}  # node -> (component id, pin) seen most recently
+        for card in NetlistReader(source):
+            value = card.properties.get(VALUE_PROPERTIES.get(card.component), "0")
+            simulator.add_component(card.name, card.component, value)
+            for pin, node in enumerate(card.nodes):
+                previous = last_pin.get(node)
+                if previous is not None:
+                    simulator.add_connection(previous[0], previous[1], card.name, pin)
+                last_pin[node] = (card.name, pin)
+        return simulator
+    
     def simulate(self, duration=1.0, step=0.001):
         """Run a basic circuit simulation and return time and voltage/current data"""
         # For basic circuits, we'll use simplified simulation logic
@@ -354,32 +1360,43 @@ class CircuitSimulator:
         voltage_data = {}
         current_data = {}
         
+        # Blocks are solved together at their DC operating point
+        instances = [component_id for component_id, component in self.components.items()
+                     if component['type'] == SUBCIRCUIT]
+        
         # Check for common circuit patterns
-        if len(self.voltage_sources) == 0:
+        if len(self.voltage_sources) == 0 and not instances:
             # No voltage source, no simulation possible
             return time_points, {}, {}
         
+        operating_point = None
+        if instances:
+            try:
+                operating_point = self.operating_point()
+            except CircuitError as e:
+                TRACE.message(f"Subcircuit simulation error: {str(e)}", ERROR)
+        
         # Generate simulation data
         for component_id, component in self.components.items():
             # Generate voltage waveforms
             if component['type'] == "Resistor":
-                resistance = float(component['value'])
+                resistance = component['value']
                 # Voltage across resistor - account for simple voltage dividers
                 connected_sources = self._find_connected_sources(component_id)
                 voltage = 0
                 for src in connected_sources:
-                    voltage += float(self.components[src]['value'])
+                    voltage += self.components[src]['value']
                 voltage_data[component_id] = voltage * np.ones_like(time_points)
                 
                 # Current through resistor (V=IR)
                 current_data[component_id] = (voltage / resistance) * np.ones_like(time_points)
                 
             elif component['type'] == "Capacitor":
-                capacitance = float(component['value'])
+                capacitance = component['value']
                 connected_sources = self._find_connected_sources(component_id)
                 source_voltage = 0
                 for src in connected_sources:
-                    source_voltage += float(self.components[src]['value'])
+                    source_voltage += self.components[src]['value']
                 
                 # Capacitor charging curve: V(t) = V_source * (1 - e^(-t/RC))
                 # Find connected resistor(s)
@@ -388,18 +1405,18 @@ class CircuitSimulator:
                     if conn['from'][0] == component_id or conn['to'][0] == component_id:
                         other = conn['to'][0] if conn['from'][0] == component_id else conn['from'][0]
                         if self.components.get(other, {}).get('type') == "Resistor":
-                            total_resistance = float(self.components[other]['value'])
+                            total_resistance = self.components[other]['value']
                 
                 rc = total_resistance * capacitance
                 voltage_data[component_id] = source_voltage * (1 - np.exp(-time_points/rc))
                 current_data[component_id] = (source_voltage/total_resistance) * np.exp(-time_points/rc)
                 
             elif component['type'] == "Inductor":
-                inductance = float(component['value'])
+                inductance = component['value']
                 connected_sources = self._find_connected_sources(component_id)
                 source_voltage = 0
                 for src in connected_sources:
-                    source_voltage += float(self.components[src]['value'])
+                    source_voltage += self.components[src]['value']
                 
                 # Find connected resistor(s)
                 total_resistance = 1000  # Default
@@ -407,14 +1424,14 @@ class CircuitSimulator:
                     if conn['from'][0] == component_id or conn['to'][0] == component_id:
                         other = conn['to'][0] if conn['from'][0] == component_id else conn['from'][0]
                         if self.components.get(other, {}).get('type') == "Resistor":
-                            total_resistance = float(self.components[other]['value'])
+                            total_resistance = self.components[other]['value']
                 
                 # Inductor current: I(t) = (V/R) * (1 - e^(-Rt/L))
                 voltage_data[component_id] = source_voltage * np.exp(-total_resistance*time_points/inductance)
                 current_data[component_id] = (source_voltage/total_resistance) * (1 - np.exp(-total_resistance*time_points/inductance))
                 
             elif component['type'] == "Battery":
-                voltage = float(component['value'])
+                voltage = component['value']
                 voltage_data[component_id] = voltage * np.ones_like(time_points)
                 
                 # Current depends on the circuit
@@ -424,7 +1441,7 @@ class CircuitSimulator:
                     if conn['from'][0] == component_id or conn['to'][0] == component_id:
                         other = conn['to'][0] if conn['from'][0] == component_id else conn['from'][0]
                         if self.components.get(other, {}).get('type') == "Resistor":
-                            r = float(self.components[other]['value'])
+                            r = self.components[other]['value']
                             total_resistance = min(total_resistance, r)
                 
                 if total_resistance < float('inf'):
@@ -433,11 +1450,11 @@ class CircuitSimulator:
                     current_data[component_id] = np.zeros_like(time_points)
                 
             elif component['type'] == "LED":
-                forward_voltage = float(component['value'])
+                forward_voltage = component['value']
                 connected_sources = self._find_connected_sources(component_id)
                 source_voltage = 0
                 for src in connected_sources:
-                    source_voltage += float(self.components[src]['value'])
+                    source_voltage += self.components[src]['value']
                 
                 # LED has voltage drop when conducting
                 if source_voltage > forward_voltage:
@@ -449,12 +1466,19 @@ class CircuitSimulator:
                         if conn['from'][0] == component_id or conn['to'][0] == component_id:
                             other = conn['to'][0] if conn['from'][0] == component_id else conn['from'][0]
                             if self.components.get(other, {}).get('type') == "Resistor":
-                                total_resistance = float(self.components[other]['value'])
+                                total_resistance = self.components[other]['value']
                     
                     current_data[component_id] = ((source_voltage - forward_voltage) / total_resistance) * np.ones_like(time_points)
                 else:
                     voltage_data[component_id] = source_voltage * np.ones_like(time_points)
                     current_data[component_id] = np.zeros_like(time_points)
+            elif component['type'] == SUBCIRCUIT and operating_point is not None:
+                # Voltage from the first port to the last, current into the first
+                ports = len(component['value'].ports)
+                voltage = (operating_point.voltage((component_id, 0)) -
+                           operating_point.voltage((component_id, ports - 1)))
+                voltage_data[component_id] = voltage * np.ones_like(time_points)
+                current_data[component_id] = operating_point.currents[component_id][0] * np.ones_like(time_points)
             else:
                 # Default behavior for other components
                 voltage_data[component_id] = np.zeros_like(time_points)
@@ -474,15 +1498,33 @@ class CircuitSimulator:
                     connected_sources.append(conn['from'][0])
         return connected_sources
 
-class MatplotlibCanvas(FigureCanvasQTAgg):
-    """Canvas for displaying matplotlib plots in Qt"""
-    def __init__(self, parent=None, width=5, height=4, dpi=100):
-        self.fig = Figure(figsize=(width, height), dpi=dpi)
-        self.axes = self.fig.add_subplot(111)
-        super().__init__(self.fig)
-        self.setParent(parent)
-
 class CircuitCanvas(QGraphicsView):
+    # Half-width of the scene; large enough to never run out of room while
+    # keeping scroll bar ranges within int limits at any practical zoom
+    SCENE_EXTENT = 100000
+    # Below this zoom wires and components stop painting themselves and the
+    # view draws them all from one cached pixmap; it matches the scale where
+    # components drop to plain boxes anyway
+    OVERVIEW_LOD = 0.4
+    OVERVIEW_MAX_PIXELS = 4096  # Largest overview pixmap side before drawing directly
+    
+    errorsChanged = Signal(list)  # Live validation errors, at most once per event loop pass
+    NETLIST_SPACING = (100, 80)  # Column and row pitch of parts laid out from a netlist
+    AUTOSAVE_DELAY_MS = 2000  # Edits are gathered this long before going to the autosave journal
+    MAX_SUBCIRCUIT_PORTS = 10  # Ports that fit on the sides of a block symbol
+    UNDO_LIMIT_BYTES = 64 * 1024 * 1024  # Estimated memory the undo history may hold
+    # Performance HUD: rows of (label, span name) and how often it refreshes
+    PERF_HUD_ROWS = (("Frame", "paint scene"), ("Sim steps", "simulation step"),
+                     ("Callbacks", "simulation callback"), ("Wire anim", "updateWireAnimations"),
+                     ("Plot update", "plot update"), ("Plot paint", "paint plot"),
+                     ("Matplotlib", "matplotlib draw"), ("Probe paint", "paint probe"),
+                     ("Validation", "validation"))
+    PERF_HUD_INTERVAL_MS = 500
+    PERF_HUD_RECT = QRect(8, 8, 276, 16 * (len(PERF_HUD_ROWS) + 1) + 8)
+    # Timer refreshing the HUD while it is shown, see set_perf_hud; a class
+    # default, as Qt still sends paint events while a view is torn down
+    perf_hud = None
+    
     def __init__(self, main_window=None):
         super().__init__()
         # Store reference to main window
@@ -491,10 +1533,36 @@ class CircuitCanvas(QGraphicsView):
         # Create scene
         self.scene = QGraphicsScene()
         self.setScene(self.scene)
+        # Spatial index of component pins for hit-testing, kept current by ComponentItem
+        self.pin_index = PinIndex()
+        self.scene.pin_index = self.pin_index
+        # Wires attached to each component, kept in step with self.connections
+        self.wire_adjacency = WireAdjacency()
+        self.scene.wire_adjacency = self.wire_adjacency
+        # Live electrical rule check, updated by every edit
+        self.erc = ElectricalRuleCheck(on_change=self._schedule_error_update)
+        self.scene.erc = self.erc
+        self._error_update_pending = False
+        # Undo/redo of edits; transactions and drags each record one entry
+        self.history = UndoHistory(self.UNDO_LIMIT_BYTES)
+        self.scene.history = self.history
+        # Probes are not undoable; they report their own changes to the journal
+        self.scene.journal = self._journal_items
+        self._drag_origin = None  # Selection positions when a drag started
+        # Crash recovery journal, see attach_autosave
+        self.autosave = None
+        self._journal_ids = {}      # item -> id of its autosave record
+        self._journal_next_id = itertools.count()
+        self._journal_dirty = set()  # Items edited since the journal was last written
+        # Subcircuit definitions by name, in the order they were made; a
+        # block may only contain instances of blocks made before it
+        self.subcircuits = {}
         
         # View settings
         self.setRenderHint(QPainter.Antialiasing)
-        self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        # Repaint only what changed; items report accurate bounding rects
+        self.setViewportUpdateMode(QGraphicsView.MinimalViewportUpdate)
+        self.setCacheMode(QGraphicsView.CacheBackground)  # Grid is redrawn only on zoom or expose
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.setDragMode(QGraphicsView.RubberBandDrag)
@@ -505,13 +1573,21 @@ class CircuitCanvas(QGraphicsView):
         self.wire_start = None
         self.wire_mode = False
         
-        # Grid settings
+        # Grid settings; the grid is painted in drawBackground, not stored in the scene
         self.grid_size = 10
         self.grid_visible = True
+        # Grid router for wires; ComponentItem keeps its obstacles current
+        self.wire_router = WireRouter(self.grid_size)
+        self.scene.wire_router = self.wire_router
+        
+        # Zoomed-out overview state, see drawForeground
+        self.overview_mode = False
+        self._overview_cache = None  # (scene bounds, pixmap) at the current zoom
+        self._overview_key = None
         
         # Setup scene
-        self.scene.setSceneRect(-2000, -2000, 4000, 4000)
-        self.setupGrid()
+        extent = self.SCENE_EXTENT
+        self.scene.setSceneRect(-extent, -extent, 2 * extent, 2 * extent)
         
         # Styling
         self.setFrameShape(QFrame.StyledPanel)
@@ -529,7 +1605,8 @@ class CircuitCanvas(QGraphicsView):
 
         self.components_movable = True
         self.wire_start_pin_index = None  # Add this new line to track which pin is being connected
-        self.connections = []  # Add this to track all wire connections
+        self.connections = {}  # Wires on the canvas; a dict keeps their order with O(1) removal
+        self._edit_depth = 0  # Nesting of edit() transactions
         self.simulator = EnhancedCircuitSimulator()
         self.simulation_results = None
         self.target_pin_index = -1  # Initialize missing attribute
@@ -543,38 +1620,177 @@ class CircuitCanvas(QGraphicsView):
         if self.main_window and hasattr(self.main_window, 'statusBar'):
             self.main_window.statusBar.showMessage(message)
 
-    def setupGrid(self):
-        # Create grid
-        self.grid_lines = []
-        for x in range(-2000, 2001, self.grid_size):
-            line = self.scene.addLine(x, -2000, x, 2000, 
-                                    QPen(QColor(230, 230, 230), 0.5))
-            line.setZValue(-10)
-            self.grid_lines.append(line)
-        
-        for y in range(-2000, 2001, self.grid_size):
-            line = self.scene.addLine(-2000, y, 2000, y, 
-                                    QPen(QColor(230, 230, 230), 0.5))
-            line.setZValue(-10)
-            self.grid_lines.append(line)
-        
-        # Add major grid lines
-        for x in range(-2000, 2001, self.grid_size * 5):
-            line = self.scene.addLine(x, -2000, x, 2000, 
-                                    QPen(QColor(200, 200, 220), 0.8))
-            line.setZValue(-9)
-            self.grid_lines.append(line)
-        
-        for y in range(-2000, 2001, self.grid_size * 5):
-            line = self.scene.addLine(-2000, y, 2000, y, 
-                                    QPen(QColor(200, 200, 220), 0.8))
-            line.setZValue(-9)
-            self.grid_lines.append(line)
+    def drawBackground(self, painter, rect):
+        """Draw the grid over the exposed rect only, dropping lines that would crowd together"""
+        super().drawBackground(painter, rect)
+        
+        # On-screen spacing of one scene unit at the current zoom
+        zoom = abs(self.transform().m11()) or 1.0
+        if (zoom < self.OVERVIEW_LOD) != self.overview_mode:
+            # Flip item flags outside of painting
+            QTimer.singleShot(0, self._update_overview_mode)
+        
+        if not self.grid_visible:
+            return
+        min_spacing = 4  # Pixels between lines below which they turn into a grey wash
+        
+        minor_step = self.grid_size
+        major_step = self.grid_size * 5
+        # Far out, keep thinning the major grid by fives so it stays readable
+        while major_step * zoom < min_spacing:
+            major_step *= 5
+        
+        left, right, top, bottom = rect.left(), rect.right(), rect.top(), rect.bottom()
+        
+        def grid_lines(step):
+            first_x = math.floor(left / step) * step
+            first_y = math.floor(top / step) * step
+            xs = np.arange(first_x, right + step, step)
+            ys = np.arange(first_y, bottom + step, step)
+            return ([QLineF(x, top, x, bottom) for x in xs.tolist()] +
+                    [QLineF(left, y, right, y) for y in ys.tolist()])
+        
+        painter.save()
+        if minor_step * zoom >= min_spacing:
+            painter.setPen(QPen(QColor(230, 230, 230), 0.5))
+            painter.drawLines(grid_lines(minor_step))
+        painter.setPen(QPen(QColor(200, 200, 220), 0.8))
+        painter.drawLines(grid_lines(major_step))
+        painter.restore()
+
+    def drawForeground(self, painter, rect):
+        """In overview mode blit all wires and component bodies from one cached pixmap"""
+        super().drawForeground(painter, rect)
+        if not self.overview_mode:
+            return
+        
+        zoom = abs(self.transform().m11())
+        ratio = self.devicePixelRatioF()
+        key = (SmartWire.revision, len(self.connections), self.pin_index.version, zoom, ratio)
+        if self._overview_key != key:
+            self._overview_key = key
+            self._overview_cache = None
+            bounds = self.scene.itemsBoundingRect()
+            scale = zoom * ratio
+            if not bounds.isEmpty() and max(bounds.width(), bounds.height()) * scale <= self.OVERVIEW_MAX_PIXELS:
+                pixmap = QPixmap(math.ceil(bounds.width() * scale) + 1,
+                                 math.ceil(bounds.height() * scale) + 1)
+                pixmap.fill(Qt.transparent)
+                pixmap_painter = QPainter(pixmap)
+                pixmap_painter.scale(scale, scale)
+                pixmap_painter.translate(-bounds.left(), -bounds.top())
+                self._paint_overview(pixmap_painter)
+                pixmap_painter.end()
+                pixmap.setDevicePixelRatio(ratio)
+                self._overview_cache = (bounds, pixmap)
+        
+        painter.save()
+        if self._overview_cache is not None:
+            bounds, pixmap = self._overview_cache
+            target = QRectF(bounds.topLeft(), pixmap.deviceIndependentSize() / zoom)
+            painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+        else:
+            # Board too large to cache at this zoom; draw it directly
+            self._paint_overview(painter)
+        
+        # Selection changes too often to bake into the cache
+        selected_pen = QPen(QColor(50, 100, 220), 0)
+        selected_rects = []
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        for item in self.scene.selectedItems():
+            if isinstance(item, ComponentItem):
+                selected_rects.append(item.mapRectToScene(ComponentItem.BODY_RECT))
+            elif isinstance(item, SmartWire):
+                painter.setPen(selected_pen)
+                painter.setBrush(Qt.NoBrush)
+                painter.drawPath(item.path())
+        if selected_rects:
+            painter.setPen(selected_pen)
+            painter.setBrush(QBrush(QColor(175, 215, 245)))
+            painter.drawRects(selected_rects)
+        painter.restore()
+
+    def _paint_overview(self, painter):
+        """Draw every wire, as one path per color, and every component body as a plain box"""
+        wire_paths = {}
+        for wire in self.connections:
+            rgba = wire.pen().color().rgba()
+            wire_paths.setdefault(rgba, QPainterPath()).addPath(wire.path())
+        
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        painter.setBrush(Qt.NoBrush)
+        for rgba, path in wire_paths.items():
+            painter.setPen(QPen(QColor.fromRgba(rgba), 0))
+            painter.drawPath(path)
+        painter.setPen(QPen(QColor(0, 0, 0), 0))
+        painter.setBrush(QBrush(QColor(240, 240, 240)))
+        painter.drawRects([item.mapRectToScene(ComponentItem.BODY_RECT)
+                           for item in self.pin_index.owners])
+
+    def _update_overview_mode(self):
+        """Enter or leave overview drawing to match the current zoom"""
+        overview = abs(self.transform().m11()) < self.OVERVIEW_LOD
+        if overview == self.overview_mode:
+            return
+        self.overview_mode = overview
+        # Items without contents skip their Python paint() but stay selectable
+        for item in self.pin_index.owners:
+            item.setFlag(QGraphicsItem.ItemHasNoContents, overview)
+        for wire in self.connections:
+            wire.setFlag(QGraphicsItem.ItemHasNoContents, overview)
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        with TRACE.span("paint scene", "paint"):
+            super().paintEvent(event)
+        if self.perf_hud is not None:
+            painter = QPainter(self.viewport())
+            self._paint_perf_hud(painter)
+            painter.end()
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        if self.perf_hud is not None:
+            # Scrolling moved the HUD's pixels along with the scene; repaint both places
+            self.viewport().update(self.PERF_HUD_RECT)
+            self.viewport().update(self.PERF_HUD_RECT.translated(dx, dy))
+
+    def set_perf_hud(self, shown):
+        """Show or hide the overlay of frame time, simulation rate and other recent spans"""
+        if shown and self.perf_hud is None:
+            self.perf_hud = QTimer(self)
+            self.perf_hud.timeout.connect(lambda: self.viewport().update(self.PERF_HUD_RECT))
+            self.perf_hud.start(self.PERF_HUD_INTERVAL_MS)
+        elif not shown and self.perf_hud is not None:
+            self.perf_hud.stop()
+            self.perf_hud.deleteLater()
+            self.perf_hud = None
+        self.viewport().update(self.PERF_HUD_RECT)
+
+    def _paint_perf_hud(self, painter):
+        """Calls per second, mean and longest time of each HUD span over the last second"""
+        summary = TRACE.summary(1.0)
+        lines = [f"{'':<12}{'/s':>5}{'mean ms':>9}{'max ms':>9}"]
+        for label, name in self.PERF_HUD_ROWS:
+            count, total, longest = summary.get(name, (0, 0.0, 0.0))
+            mean = total / count if count else 0.0
+            lines.append(f"{label:<12}{count:>5}{mean * 1000:>9.2f}{longest * 1000:>9.2f}")
+        
+        font = QFont("Monospace", 9)
+        font.setStyleHint(QFont.TypeWriter)
+        painter.setFont(font)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(20, 20, 20, 190))
+        painter.drawRoundedRect(self.PERF_HUD_RECT, 4, 4)
+        painter.setPen(QColor(230, 255, 230))
+        rect = self.PERF_HUD_RECT
+        for row, line in enumerate(lines):
+            painter.drawText(rect.left() + 8, rect.top() + 18 + 16 * row, line)
 
     def toggleGrid(self):
         self.grid_visible = not self.grid_visible
-        for line in self.grid_lines:
-            line.setVisible(self.grid_visible)
+        self.resetCachedContent()
+        self.viewport().update()
 
     def setComponentsMovable(self, movable):
         """Set all components movable or not movable"""
@@ -591,23 +1807,15 @@ class CircuitCanvas(QGraphicsView):
             if isinstance(item, ComponentItem):
                 self.setComponentsMovable(False)
                 self.wire_start = item
-                min_dist = float('inf')
                 closest_pin = None
                 pin_index = -1
                 
-                for idx, pin in enumerate(item.pin_points):
-                    angle_rad = item.rotation() * math.pi / 180
-                    rotated_pin = QPointF()
-                    rotated_pin.setX(pin.x() * math.cos(angle_rad) - pin.y() * math.sin(angle_rad))
-                    rotated_pin.setY(pin.x() * math.sin(angle_rad) + pin.y() * math.cos(angle_rad))
-                    pin_pos = item.pos() + rotated_pin
-                    
-                    dist = ((pin_pos.x() - scene_pos.x())**2 + 
-                           (pin_pos.y() - scene_pos.y())**2)**0.5
-                    
-                    if dist < min_dist and dist < 25:
-                        min_dist = dist
-                        closest_pin = pin_pos
+                pins = item.scene_pins()
+                if len(pins):
+                    dists = np.hypot(pins[:, 0] - scene_pos.x(), pins[:, 1] - scene_pos.y())
+                    idx = int(dists.argmin())
+                    if dists[idx] < 25:
+                        closest_pin = item.scene_pin(idx)
                         pin_index = idx
                 
                 if closest_pin:
@@ -634,6 +1842,10 @@ class CircuitCanvas(QGraphicsView):
                     self.showStatusMessage("Click closer to a component pin")
             
         super().mousePressEvent(event)
+        # Remember where the selection started so a whole drag undoes as one move
+        if not self.wire_mode and event.button() == Qt.LeftButton:
+            self._drag_origin = {item: item.pos() for item in self.scene.selectedItems()
+                                 if isinstance(item, ComponentItem)}
 
     def mouseMoveEvent(self, event):
         if self.drawing_wire and self.temp_wire:
@@ -649,28 +1861,12 @@ class CircuitCanvas(QGraphicsView):
             y = round(scene_pos.y() / self.grid_size) * self.grid_size
             scene_pos = QPointF(x, y)
             
-            # Search all components for potential pin targets
-            for item in self.scene.items():
-                if isinstance(item, ComponentItem) and item != self.wire_start:
-                    for pin in item.pin_points:
-                        # Get the rotation-adjusted pin position
-                        angle_rad = item.rotation() * math.pi / 180
-                        rotated_pin = QPointF()
-                        rotated_pin.setX(pin.x() * math.cos(angle_rad) - pin.y() * math.sin(angle_rad))
-                        rotated_pin.setY(pin.x() * math.sin(angle_rad) + pin.y() * math.cos(angle_rad))
-                        
-                        pin_pos = item.pos() + rotated_pin
-                        dist = ((pin_pos.x() - scene_pos.x())**2 + 
-                                (pin_pos.y() - scene_pos.y())**2)**0.5
-                        
-                        if dist < 25:  # Increased snap range
-                            scene_pos = pin_pos
-                            found_target = True
-                            target_pin = pin_pos
-                            target_component = item
-                            break
-                    if found_target:
-                        break
+            # Nearest pin of another component within snap range
+            hit = self.pin_index.nearest_pin(scene_pos, 25, exclude=self.wire_start)
+            if hit:
+                target_component, _, target_pin = hit
+                scene_pos = target_pin
+                found_target = True
             
             # Update or create target highlight
             if hasattr(self, 'target_highlight') and self.target_highlight:
@@ -704,26 +1900,10 @@ class CircuitCanvas(QGraphicsView):
             self.target_pin_index = -1  # Initialize as class member so it's available to _create_wire_connection
             
             # Find target component and pin
-            for item in self.scene.items():
-                if isinstance(item, ComponentItem) and item != self.wire_start:
-                    for idx, pin in enumerate(item.pin_points):
-                        angle_rad = item.rotation() * math.pi / 180
-                        rotated_pin = QPointF()
-                        rotated_pin.setX(pin.x() * math.cos(angle_rad) - pin.y() * math.sin(angle_rad))
-                        rotated_pin.setY(pin.x() * math.sin(angle_rad) + pin.y() * math.cos(angle_rad))
-                        pin_pos = item.pos() + rotated_pin
-                        
-                        dist = ((pin_pos.x() - scene_pos.x())**2 + 
-                               (pin_pos.y() - scene_pos.y())**2)**0.5
-                        
-                        if dist < 35:  # Increased detection radius
-                            end_pos = pin_pos
-                            valid_connection = True
-                            target_component = item
-                            self.target_pin_index = idx  # Store as class member, not local variable
-                            break
-                    if valid_connection:
-                        break
+            hit = self.pin_index.nearest_pin(scene_pos, 35, exclude=self.wire_start)  # Increased detection radius
+            if hit:
+                target_component, self.target_pin_index, end_pos = hit  # Pin index stored as class member
+                valid_connection = True
             
             if target_component == self.wire_start:
                 valid_connection = False
@@ -745,6 +1925,12 @@ class CircuitCanvas(QGraphicsView):
             self._cleanup_wire_state()
             
         super().mouseReleaseEvent(event)
+        if self._drag_origin:
+            moves = {item: (old, item.pos()) for item, old in self._drag_origin.items()
+                     if item.scene() is self.scene and item.pos() != old}
+            if moves:
+                self.history.record(MoveCommand(moves))
+        self._drag_origin = None
     
     def _cleanup_highlights(self):
         """Clean up highlight indicators"""
@@ -757,7 +1943,7 @@ class CircuitCanvas(QGraphicsView):
     
     def _check_existing_connection(self, start_comp, start_idx, end_comp, end_idx):
         """Check if a connection already exists between specific pins"""
-        for wire in self.connections:
+        for wire in self.wire_adjacency.wires_of(start_comp):
             if ((wire.start_component == start_comp and wire.end_component == end_comp and
                  wire.start_pin_index == start_idx and wire.end_pin_index == end_idx) or
                 (wire.start_component == end_comp and wire.end_component == start_comp and
@@ -768,9 +1954,8 @@ class CircuitCanvas(QGraphicsView):
     def _create_wire_connection(self, end_pos, target_component):
         """Create a new wire connection"""
         try:
-            # Print debugging info
-            print(f"Creating wire from {self.wire_start_pos} to {end_pos}")
-            print(f"Pin indices: {self.wire_start_pin_index} to {self.target_pin_index}")
+            TRACE.message(f"Creating wire from {self.wire_start_pos} to {end_pos}, "
+                          f"pins {self.wire_start_pin_index} to {self.target_pin_index}", "wire")
             
             # Create permanent wire with thick line
             wire = SmartWire(
@@ -789,7 +1974,9 @@ class CircuitCanvas(QGraphicsView):
             
             # Add wire to scene and tracking list
             self.scene.addItem(wire)
-            self.connections.append(wire)
+            self._register_wire(wire)
+            wire.recalculate_path()  # Route around parts now that the wire is in the scene
+            self.history.record(AddItemsCommand(wires=[wire]))
             
             # Force visual update
             wire.update()
@@ -806,7 +1993,7 @@ class CircuitCanvas(QGraphicsView):
                 self.main_window.updateToolbarState()
                 
         except Exception as e:
-            print(f"Wire creation error: {str(e)}")
+            TRACE.message(f"Wire creation error: {str(e)}", ERROR)
             self.showStatusMessage(f"Error creating wire: {str(e)}")
     
     def _cleanup_wire_state(self):
@@ -836,14 +2023,7 @@ class CircuitCanvas(QGraphicsView):
     def dropEvent(self, event):
         if isinstance(event.mimeData(), ComponentMimeData):
             scene_pos = self.mapToScene(event.position().toPoint())
-            
-            # Snap to grid
-            x = round(scene_pos.x() / self.grid_size) * self.grid_size
-            y = round(scene_pos.y() / self.grid_size) * self.grid_size
-            
-            component_item = ComponentItem(event.mimeData().component)
-            component_item.setPos(x, y)
-            self.scene.addItem(component_item)
+            self.addComponentAt(event.mimeData().component, scene_pos)
             event.accept()
         else:
             event.ignore()
@@ -885,66 +2065,22 @@ class CircuitCanvas(QGraphicsView):
             self.viewport().update()
             
         except Exception as e:
-            print(f"Error in simulation preview: {str(e)}")
+            TRACE.message(f"Error in simulation preview: {str(e)}", ERROR)
     
     # Update validation to use SmartWire class
     def validateCircuit(self):
-        items = self.scene.items()
-        components = [item for item in items if isinstance(item, ComponentItem)]
-        wires = [item for item in items if isinstance(item, SmartWire)]
-        
-        errors = []
-        
-        # Check for unconnected components
-        for component in components:
-            connected_pins = 0
-            for wire in wires:
-                start_pos = wire.start_pos
-                end_pos = wire.end_pos
-                
-                # Check if wire connects to any pin of this component
-                for pin in component.pin_points:
-                    # Get rotation-adjusted pin position
-                    angle_rad = component.rotation() * math.pi / 180
-                    rotated_pin = QPointF()
-                    rotated_pin.setX(pin.x() * math.cos(angle_rad) - pin.y() * math.sin(angle_rad))
-                    rotated_pin.setY(pin.x() * math.sin(angle_rad) + pin.y() * math.cos(angle_rad))
-                    pin_pos = component.pos() + rotated_pin
-                    
-                    if ((abs(pin_pos.x() - start_pos.x()) < 5 and 
-                         abs(pin_pos.y() - start_pos.y()) < 5) or
-                        (abs(pin_pos.x() - end_pos.x()) < 5 and 
-                         abs(pin_pos.y() - end_pos.y()) < 5)):
-                        connected_pins += 1
-            
-            if connected_pins < component.component.pins:
-                errors.append(f"{component.component.name} has {component.component.pins - connected_pins} unconnected pins")
-        
-        # Check for floating wires
-        for wire in wires:
-            connected_ends = 0
-            start_pos = wire.start_pos
-            end_pos = wire.end_pos
-            
-            for component in components:
-                for pin in component.pin_points:
-                    # Get rotation-adjusted pin position
-                    angle_rad = component.rotation() * math.pi / 180
-                    rotated_pin = QPointF()
-                    rotated_pin.setX(pin.x() * math.cos(angle_rad) - pin.y() * math.sin(angle_rad))
-                    rotated_pin.setY(pin.x() * math.sin(angle_rad) + pin.y() * math.cos(angle_rad))
-                    pin_pos = component.pos() + rotated_pin
-                    
-                    if ((abs(pin_pos.x() - start_pos.x()) < 5 and 
-                         abs(pin_pos.y() - start_pos.y()) < 5) or
-                        (abs(pin_pos.x() - end_pos.x()) < 5 and 
-                         abs(pin_pos.y() - end_pos.y()) < 5)):
-                        connected_ends += 1
-            
-            if connected_ends < 2:
-                errors.append("Floating wire detected")
-        
-        return errors
+        """Current circuit errors, kept up to date by the live rule check"""
+        return self.erc.errors()
+    
+    def _schedule_error_update(self):
+        if not self._error_update_pending:
+            self._error_update_pending = True
+            QTimer.singleShot(0, self._publish_errors)
+    
+    @TRACE.traced("validation", "validation")
+    def _publish_errors(self):
+        self._error_update_pending = False
+        self.errorsChanged.emit(self.erc.errors())
 
     def showContextMenu(self, position):
         scene_pos = self.mapToScene(position)
@@ -981,93 +2117,552 @@ class CircuitCanvas(QGraphicsView):
         menu.exec(self.viewport().mapToGlobal(position))
     
     def addComponentAt(self, component, position):
+        item = self._add_component(component, position)
+        self.history.record(AddItemsCommand([item]))
+        self.showStatusMessage(f"Added {component.name} to circuit")
+    
+    def create_subcircuit(self, items, name):
+        """Replace parts with one instance of a new block made from them.
+        
+        Wires between the parts go inside the block. Each pin wired to a part
+        outside becomes a port, and those wires are redrawn to the instance.
+        The replacement is one undoable edit; returns the instance, or None
+        with a status message when the parts cannot form a block.
+        """
+        parts = [item for item in items if isinstance(item, ComponentItem)]
+        if not name or name in self.subcircuits:
+            self.showStatusMessage("A subcircuit needs a new name")
+            return None
+        index = {item: k for k, item in enumerate(parts)}
+        components = []
+        for item in parts:
+            if item.component.name == SUBCIRCUIT:
+                components.append((SUBCIRCUIT, self.subcircuits[item.component.properties["Subcircuit"]]))
+            else:
+                components.append((item.component.name, item.component.values.value))
+        connections, outside = [], []
+        seen = set()
+        for item in parts:
+            for wire in self.wire_adjacency.wires_of(item):
+                if wire in seen:
+                    continue
+                seen.add(wire)
+                start = (wire.start_component, wire.start_pin_index)
+                end = (wire.end_component, wire.end_pin_index)
+                if wire.start_component in index and wire.end_component in index:
+                    connections.append(((index[start[0]], start[1]), (index[end[0]], end[1])))
+                    continue
+                inner, other = (start, end) if wire.start_component in index else (end, start)
+                outside.append(((index[inner[0]], inner[1]), other))
+        # Ports in part order, so the same selection always makes the same block
+        ports = {pin: port for port, pin in enumerate(sorted({inner for inner, _ in outside}))}
+        if not ports:
+            self.showStatusMessage("Selected parts have no wires to the rest of the circuit")
+            return None
+        if len(ports) > self.MAX_SUBCIRCUIT_PORTS:
+            self.showStatusMessage(f"A subcircuit can have at most {self.MAX_SUBCIRCUIT_PORTS} ports, "
+                                   f"these parts need {len(ports)}")
+            return None
+        
+        definition = SubcircuitDefinition(name, components, connections, list(ports))
+        self.define_subcircuit(definition)
+        center = sum((item.pos() for item in parts), QPointF()) / len(parts)
+        with self.edit() as edit:
+            edit.delete(parts)
+            instance = edit.add(subcircuit_component(definition), center)
+            wires = [self._connect_pins(instance, ports[inner], other, other_pin)
+                     for inner, (other, other_pin) in outside]
+            self.history.record(AddItemsCommand(wires=wires))
+        return instance
+    
+    def define_subcircuit(self, definition):
+        """Make a block available for placing, saving and simulation"""
+        self.subcircuits[definition.name] = definition
+        if self.autosave is not None:
+            self.autosave.put([self._subcircuit_record(definition)])
+        self._subcircuits_changed()
+    
+    def _subcircuits_changed(self):
+        if self.main_window is not None and hasattr(self.main_window, 'component_library'):
+            self.main_window.component_library.show_subcircuits(self.subcircuits.values())
+    
+    def _add_component(self, component, position):
         # Snap to grid
         x = round(position.x() / self.grid_size) * self.grid_size
         y = round(position.y() / self.grid_size) * self.grid_size
         
         # Create new component
-        component_item = ComponentItem(component)
-        component_item.setPos(x, y)
+        component_item = ComponentItem(component, pos=QPointF(x, y))
         self.scene.addItem(component_item)
-        self.showStatusMessage(f"Added {component.name} to circuit")
+        return component_item
+    
+    @contextmanager
+    def edit(self):
+        """Apply a batch of edits as one transaction.
+        
+        Wires are updated once per wire and the view repainted once, when the
+        outermost transaction ends:
+        
+            with canvas.edit() as edit:
+                edit.delete(canvas.scene.selectedItems())
+        """
+        transaction = EditTransaction(self)
+        self._edit_depth += 1
+        if self._edit_depth == 1:
+            self.wire_adjacency.begin_batch()
+            self.history.begin_group()
+            self.viewport().setUpdatesEnabled(False)
+        try:
+            yield transaction
+        finally:
+            self._edit_depth -= 1
+            if not self._edit_depth:
+                self.wire_adjacency.end_batch()
+                summary = transaction.summary()
+                self.history.end_group()
+                self.viewport().setUpdatesEnabled(True)
+                self.scene.update()
+                self.viewport().update()
+                if summary:
+                    self.showStatusMessage(summary)
     
     def rotateItem(self, item):
         if isinstance(item, ComponentItem):
             item.rotation_angle += 90
             item.setRotation(item.rotation_angle)
+            self.history.record(RotateCommand([item], 90))
             self.showStatusMessage(f"Rotated {item.component.name}")
     
     def deleteItem(self, item):
         """Enhanced delete item method with proper checks to avoid segmentation faults"""
         try:
-            if isinstance(item, ComponentItem):
-                # Remove all connected wires first
-                wires_to_remove = []
-                
-                # Make a copy of the connections list to avoid modification during iteration
-                for wire in list(self.connections):
-                    if wire.start_component == item or wire.end_component == item:
-                        if wire in self.scene.items():  # Check if wire is still in the scene
-                            wires_to_remove.append(wire)
-                
-                for wire in wires_to_remove:
-                    if wire in self.scene.items():  # Double-check before removal
-                        self.scene.removeItem(wire)
-                        if wire in self.connections:
-                            self.connections.remove(wire)
-                
-                if item in self.scene.items():  # Check if item is still in the scene
-                    self.scene.removeItem(item)
-                    msg = f"Deleted {item.component.name} and its connections"
-                else:
-                    msg = f"Component already removed"
+            msg = self._delete_item(item)
             
-            elif isinstance(item, SmartWire):
-                if item in self.scene.items():  # Check if item is still in the scene
-                    self.scene.removeItem(item)
-                    if item in self.connections:
-                        self.connections.remove(item)
-                    msg = "Deleted wire connection"
-                else:
-                    msg = "Wire already removed"
-            else:
-                msg = "Unknown item type"
-            
-            # Force visual update
-            self.scene.update()
-            self.viewport().update()
+            # Force visual update, unless a transaction will do it once at the end
+            if not self._edit_depth:
+                self.scene.update()
+                self.viewport().update()
             self.showStatusMessage(msg)
             
         except Exception as e:
-            print(f"Error during item deletion: {str(e)}")
+            TRACE.message(f"Error during item deletion: {str(e)}", ERROR)
             self.showStatusMessage(f"Error deleting item: {str(e)}")
+    
+    def _delete_item(self, item):
+        """Remove a component with its wires, or a wire; returns a status message"""
+        if isinstance(item, ComponentItem):
+            # Remove all connected wires first
+            wires = self.wire_adjacency.wires_of(item)
+            for wire in wires:
+                self._remove_wire(wire)
+            
+            if item.scene() is self.scene:  # Check if item is still in the scene
+                self.scene.removeItem(item)
+                self.history.record(DeleteItemsCommand([item], wires))
+                return f"Deleted {item.component.name} and its connections"
+            return "Component already removed"
+        
+        if isinstance(item, SmartWire):
+            if item.scene() is self.scene:  # Check if item is still in the scene
+                self._remove_wire(item)
+                self.history.record(DeleteItemsCommand(wires=[item]))
+                return "Deleted wire connection"
+            return "Wire already removed"
+        return "Unknown item type"
+    
+    def _remove_wire(self, wire):
+        """Drop a wire from the scene and every wire registry; safe to repeat"""
+        self.wire_adjacency.detach(wire)
+        self.wire_router.remove_route(wire)
+        self.erc.remove_wire(wire)
+        if wire.scene() is self.scene:
+            self.scene.removeItem(wire)
+        self.connections.pop(wire, None)
+    
+    def _register_wire(self, wire):
+        """Add a wire that is in the scene to every wire registry"""
+        self.connections[wire] = None
+        self.wire_adjacency.attach(wire)
+        self.erc.add_wire(wire)
+    
+    def _restore_wire(self, wire):
+        """Put a removed wire back, on its parts' current pins"""
+        self.scene.addItem(wire)
+        self._register_wire(wire)
+        wire.start_pos = wire.start_component.scene_pin(wire.start_pin_index)
+        wire.end_pos = wire.end_component.scene_pin(wire.end_pin_index)
+        self.wire_adjacency.reroute([wire])
+    
+    def project_records(self, ids=None):
+        """Components, wires and probes as project file records, in one pass.
+        
+        ids, if given, is filled with the record id of each component, wire and probe.
+        """
+        ids = {} if ids is None else ids
+        for definition in self.subcircuits.values():
+            yield self._subcircuit_record(definition)
+        for item in self.scene.items(Qt.AscendingOrder):
+            if isinstance(item, ComponentItem):
+                ids[item] = len(ids)
+                yield self._component_record(item, ids[item])
+        for wire in self.connections:
+            if wire.start_component in ids and wire.end_component in ids:
+                ids[wire] = len(ids)
+                yield self._wire_record(wire, ids)
+        for probe in self.simulation_probes:
+            if probe.scene() is self.scene:
+                ids[probe] = len(ids)
+                yield self._probe_record(probe, ids[probe])
+    
+    def _subcircuit_record(self, definition):
+        components = [[kind, value.name if kind == SUBCIRCUIT else value]
+                      for kind, value in definition.components]
+        return {
+            'type': 'subcircuit', 'id': definition.name, 'components': components,
+            'connections': [[list(a), list(b)] for a, b in definition.connections],
+            'ports': [list(port) for port in definition.ports],
+        }
+    
+    def _component_record(self, item, item_id):
+        component = item.component
+        return {
+            'type': 'component', 'id': item_id, 'name': component.name,
+            'symbol': component.symbol, 'pins': component.pins,
+            'properties': dict(component.properties),
+            'x': item.x(), 'y': item.y(), 'rotation': item.rotation_angle,
+            'mirrored': item.transform().m11() < 0,
+        }
+    
+    @staticmethod
+    def _probe_record(probe, probe_id):
+        return {'type': 'probe', 'id': probe_id, 'x': probe.x(), 'y': probe.y(),
+                'measurement': probe.measurement_type}
+    
+    def _wire_record(self, wire, ids):
+        corners = self.wire_router.corners_of(wire)
+        return {
+            'type': 'wire', 'id': ids[wire],
+            'from': [ids[wire.start_component], wire.start_pin_index],
+            'to': [ids[wire.end_component], wire.end_pin_index],
+            'route': [list(corner) for corner in corners] if corners else None,
+        }
+    
+    def save_project(self, path):
+        write_project(path, self.project_records())
+    
+    def attach_autosave(self, journal):
+        """Send every edit to an autosave journal, starting from the current circuit"""
+        self.autosave = journal
+        self.history.on_edit = self._journal_edit
+        self._journal_reset()
+    
+    def _journal_reset(self):
+        """Give the journal the whole circuit, after it was replaced other than by edits"""
+        if self.autosave is None:
+            return
+        self._journal_dirty.clear()
+        ids = {}
+        self.autosave.reset(list(self.project_records(ids)))
+        self._journal_ids = ids
+        self._journal_next_id = itertools.count(len(ids))
+    
+    def _journal_edit(self, command):
+        self._journal_items(command.touched())
+    
+    def _journal_items(self, items):
+        """Have the journal write the current state of items on its next flush"""
+        if self.autosave is None:
+            return
+        if not self._journal_dirty:
+            QTimer.singleShot(self.AUTOSAVE_DELAY_MS, self._flush_journal)
+        self._journal_dirty.update(items)
+    
+    def _flush_journal(self):
+        """Journal the current state of every item edited since the last flush.
+        
+        Runs on a timer, so a drag or a burst of edits becomes one write of
+        the items involved, whatever the size of the circuit.
+        """
+        dirty, self._journal_dirty = self._journal_dirty, set()
+        if self.autosave is None:
+            return
+        if self.autosave.error is not None:
+            self.showStatusMessage(f"Autosave failed: {self.autosave.error}")
+        ids = self._journal_ids
+        put, drop = [], []
+        # Parts before wires, so a new wire's parts already have ids
+        for item in sorted(dirty, key=lambda item: isinstance(item, SmartWire)):
+            kind = ("wire" if isinstance(item, SmartWire) else
+                    "probe" if isinstance(item, Probe) else "component")
+            if item.scene() is not self.scene:
+                if item in ids:
+                    drop.append((kind, ids.pop(item)))
+                continue
+            if kind == "wire" and (item.start_component not in ids or item.end_component not in ids):
+                continue
+            if item not in ids:
+                ids[item] = next(self._journal_next_id)
+            if kind == "component":
+                put.append(self._component_record(item, ids[item]))
+            elif kind == "probe":
+                put.append(self._probe_record(item, ids[item]))
+            else:
+                put.append(self._wire_record(item, ids))
+        self.autosave.drop(drop)
+        self.autosave.put(put)
+    
+    def clear_circuit(self):
+        """Remove every component, wire and probe; not undoable"""
+        self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+        self.viewport().setUpdatesEnabled(False)
+        try:
+            for wire in list(self.connections):
+                self._remove_wire(wire)
+            for probe in self.simulation_probes:
+                for item in (probe.connection_line, probe):
+                    if item is not None and item.scene() is self.scene:
+                        self.scene.removeItem(item)
+            self.simulation_probes = []
+            for item in self.scene.items():
+                if isinstance(item, ComponentItem):
+                    self.scene.removeItem(item)
+        finally:
+            self.scene.setItemIndexMethod(QGraphicsScene.BspTreeIndex)
+            self.viewport().setUpdatesEnabled(True)
+        self.subcircuits = {}
+        self._subcircuits_changed()
+        self.simulation_results = None
+        self.history.clear()
+        self._journal_reset()
+        self.viewport().update()
+    
+    def load_project(self, path, batch_size=1000):
+        """Replace the circuit with a saved project; returns (components, wires, probes)"""
+        records = read_project(path)  # Checks the header before the canvas is touched
+        return self.load_records(records, os.path.basename(path), batch_size)
+    
+    def load_records(self, records, name, batch_size=1000):
+        """Replace the circuit with project records; returns (components, wires, probes).
+        
+        Records are consumed as they come and added a batch at a time with
+        the scene's spatial index off, so nothing is re-indexed or repainted
+        per item. Saved wire routes are reused rather than searched again.
+        """
+        self.clear_circuit()
+        items = {}
+        wire_count = 0
+        probes = []
+        batch = []
+        
+        def flush():
+            self._add_batch(batch, f"Loading {name}: {len(items)} components, {wire_count} wires")
+        
+        try:
+            with self.bulk_insert():
+                for record in records:
+                    kind = record.get('type')
+                    if kind == 'subcircuit':
+                        components = [(SUBCIRCUIT, self.subcircuits[value]) if component_type == SUBCIRCUIT
+                                      else (component_type, value)
+                                      for component_type, value in record['components']]
+                        self.define_subcircuit(SubcircuitDefinition(
+                            record['id'], components, record['connections'], record['ports']))
+                    elif kind == 'component':
+                        # Parts left at their defaults share one component until edited
+                        component = Component.shared(record['name'], record['symbol'], record['pins'])
+                        properties = record.get('properties', {})
+                        if properties != component.properties:
+                            component = component.copy()
+                            component.set_properties(properties)
+                        item = ComponentItem(component, copy=False, pos=QPointF(
+                            round(record['x'] / self.grid_size) * self.grid_size,
+                            round(record['y'] / self.grid_size) * self.grid_size))
+                        if record.get('rotation'):
+                            item.rotation_angle = record['rotation']
+                            item.setRotation(item.rotation_angle)
+                        if record.get('mirrored'):
+                            item.setTransform(QTransform.fromScale(-1, 1))
+                        items[record['id']] = item
+                        batch.append(item)
+                    elif kind == 'wire':
+                        if batch:
+                            flush()  # Wires need their parts in the scene
+                        (start_id, start_pin), (end_id, end_pin) = record['from'], record['to']
+                        start, end = items.get(start_id), items.get(end_id)
+                        if start is None or end is None:
+                            raise ProjectFormatError("Wire refers to a missing component")
+                        self._connect_pins(start, start_pin, end, end_pin, record.get('route'))
+                        wire_count += 1
+                        if wire_count % batch_size == 0:
+                            flush()
+                    elif kind == 'probe':
+                        probe = Probe()
+                        probe.setPos(record['x'], record['y'])
+                        probe.measurement_type = record.get('measurement', "voltage")
+                        probes.append(probe)
+                        batch.append(probe)
+                    if len(batch) >= batch_size:
+                        flush()
+                if batch:
+                    flush()
+                for probe in probes:
+                    probe.findNearbyComponent()
+                self.simulation_probes.extend(probes)
+        except ProjectFormatError:
+            raise
+        except (KeyError, TypeError, ValueError) as e:
+            raise ProjectFormatError(f"Incomplete record in project: {e}") from None
+        finally:
+            self._journal_reset()
+        return len(items), wire_count, len(probes)
+    
+    @contextmanager
+    def bulk_insert(self):
+        """Add many items at once without per-item upkeep.
+        
+        The scene's spatial index, repaints and live validation are suspended
+        until the block ends, and so is cyclic garbage collection: nothing
+        being loaded is garbage, and collecting mid-load only rescans it.
+        """
+        on_erc_change, self.erc.on_change = self.erc.on_change, None
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+        self.viewport().setUpdatesEnabled(False)
+        try:
+            yield
+        finally:
+            self.scene.setItemIndexMethod(QGraphicsScene.BspTreeIndex)
+            self.viewport().setUpdatesEnabled(True)
+            if gc_was_enabled:
+                gc.enable()
+            self.erc.on_change = on_erc_change
+            self._schedule_error_update()
+            self.viewport().update()
+    
+    def _add_batch(self, items, message):
+        """Put a batch of new items in the scene, report progress and empty the batch"""
+        for item in items:
+            self.scene.addItem(item)
+        items.clear()
+        self.showStatusMessage(message)
+        QApplication.processEvents(QEventLoop.ExcludeUserInputEvents)
+    
+    def _connect_pins(self, start, start_pin, end, end_pin, route=None):
+        """Wire two placed pins without recording an edit; a saved route is reused"""
+        start_pos, end_pos = start.scene_pin(start_pin), end.scene_pin(end_pin)
+        wire = SmartWire(start_pos.x(), start_pos.y(), end_pos.x(), end_pos.y(), recalculate=False)
+        wire.start_component, wire.start_pin_index = start, start_pin
+        wire.end_component, wire.end_pin_index = end, end_pin
+        self.scene.addItem(wire)
+        self._register_wire(wire)
+        if route:
+            wire.restore_route(route)
+        else:
+            wire.recalculate_path()
+        return wire
+    
+    def import_netlist(self, source, columns=40, batch_size=1000):
+        """Replace the circuit with the parts and nets of a SPICE netlist.
+        
+        source is a path or an iterable of lines. Parts are laid out in rows
+        of columns in card order, and each pin is wired to the previous pin on
+        its node. Cards are streamed, so memory beyond the items themselves is
+        one entry per node. Returns (components, wires, skipped cards).
+        """
+        reader = NetlistReader(source)
+        cards = iter(reader)
+        first = next(cards, None)  # Parse errors in the first card leave the canvas alone
+        self.clear_circuit()
+        last_pin = {}  # node -> (item, pin index) wired most recently
+        pending = []   # (item, pin index, node) waiting for their item to reach the scene
+        batch = []
+        count = wire_count = 0
+        
+        def flush():
+            nonlocal wire_count
+            self._add_batch(batch, f"Importing netlist: {count} components, {wire_count} wires")
+            for item, pin, node in pending:
+                previous = last_pin.get(node)
+                if previous is not None:
+                    self._connect_pins(previous[0], previous[1], item, pin)
+                    wire_count += 1
+                last_pin[node] = (item, pin)
+            pending.clear()
+        
+        with self.bulk_insert():
+            if first is not None:
+                for card in itertools.chain((first,), cards):
+                    component = Component(*ELEMENT_TYPES[ELEMENT_LETTERS[card.component]])
+                    component.set_properties(card.properties)
+                    item = ComponentItem(component, copy=False, pos=QPointF(
+                        (count % columns) * self.NETLIST_SPACING[0],
+                        (count // columns) * self.NETLIST_SPACING[1]))
+                    batch.append(item)
+                    pending.extend((item, pin, node) for pin, node in enumerate(card.nodes))
+                    count += 1
+                    if len(batch) >= batch_size:
+                        flush()
+            flush()
+        self._journal_reset()
+        return count, wire_count, sum(reader.skipped.values())
+    
+    def netlist_cards(self):
+        """Components as SPICE cards, with nodes named from the wired nets.
+        
+        The net on the negative terminal of the first battery is ground, node
+        0; other nets are N1, N2, ... and unwired pins get a node of their own.
+        """
+        items = [item for item in self.scene.items(Qt.AscendingOrder) if isinstance(item, ComponentItem)]
+        net_of = self.erc.net_of
+        nodes = {}
+        for item in items:
+            if item.component.name in ElectricalRuleCheck.SOURCE_TYPES and (item, 1) in net_of:
+                nodes[net_of[(item, 1)]] = "0"
+                break
+        counts = {}
+        next_node = unconnected = 0
+        for item in items:
+            component = item.component
+            letter = ELEMENT_LETTERS.get(component.name, component.symbol)
+            counts[letter] = counts.get(letter, 0) + 1
+            pin_nodes = []
+            for pin in range(component.pins):
+                net = net_of.get((item, pin))
+                if net is None:
+                    unconnected += 1
+                    pin_nodes.append(f"NC{unconnected}")
+                    continue
+                if net not in nodes:
+                    next_node += 1
+                    nodes[net] = f"N{next_node}"
+                pin_nodes.append(nodes[net])
+            yield Card(f"{letter}{counts[letter]}", component.name, tuple(pin_nodes), component.properties)
+    
+    def export_netlist(self, path, title="SmartLab circuit"):
+        """Write the circuit as a SPICE netlist; returns (written, skipped) cards"""
+        return write_netlist(path, title, self.netlist_cards())
 
-    def prepareSimulation(self):
-        """Prepare the simulation by analyzing the circuit"""
-        # Reset the simulator
-        self.simulator = EnhancedCircuitSimulator()
+    def build_simulator(self):
+        """A new simulator holding the circuit, or None when there are no components.
+        
+        The canvas's own simulator, its results and any running simulation
+        are left alone.
+        """
+        simulator = EnhancedCircuitSimulator()
         
         # Collect all components and connections
         components = {}
         for item in self.scene.items():
             if isinstance(item, ComponentItem):
                 comp_id = str(id(item))
-                value = "0"
-                
-                # Get appropriate value based on component type
-                if item.component.name == "Resistor":
-                    value = item.component.properties.get("Resistance (Ω)", "1000")
-                elif item.component.name == "Capacitor":
-                    value = item.component.properties.get("Capacitance (F)", "0.000001")
-                elif item.component.name == "Inductor":
-                    value = item.component.properties.get("Inductance (H)", "0.001")
-                elif item.component.name == "Battery":
-                    value = item.component.properties.get("Voltage (V)", "9.0")
-                elif item.component.name == "LED":
-                    value = item.component.properties.get("Forward Voltage (V)", "2.0")
+                definition = self.subcircuits.get(item.component.properties.get("Subcircuit"))
                 
                 # Add to simulator
-                self.simulator.add_component(comp_id, item.component.name, value)
+                if item.component.name == SUBCIRCUIT and definition is not None:
+                    simulator.add_subcircuit(comp_id, definition)
+                else:
+                    simulator.add_component(comp_id, item.component.name, item.component.values.value)
                 components[item] = comp_id
         
         # Process connections
@@ -1076,12 +2671,19 @@ class CircuitCanvas(QGraphicsView):
                 from_id = components.get(wire.start_component)
                 to_id = components.get(wire.end_component)
                 if from_id and to_id:
-                    self.simulator.add_connection(
+                    simulator.add_connection(
                         from_id, wire.start_pin_index,
                         to_id, wire.end_pin_index
                     )
         
-        return len(components) > 0
+        return simulator if components else None
+    
+    def prepareSimulation(self):
+        """Prepare the simulation by analyzing the circuit"""
+        # Reset the simulator
+        simulator = self.build_simulator()
+        self.simulator = simulator or EnhancedCircuitSimulator()
+        return simulator is not None
     
     def runSimulation(self):
         """Run the circuit simulation and store results"""
@@ -1112,6 +2714,8 @@ class CircuitCanvas(QGraphicsView):
         tabs = QTabWidget()
         layout.addWidget(tabs)
         
+        from matplotlib_canvas import MatplotlibCanvas
+
         # Voltage waveform
         voltage_canvas = MatplotlibCanvas(dialog, width=5, height=4, dpi=100)
         voltage_tab = QWidget()
@@ -1243,6 +2847,7 @@ class CircuitCanvas(QGraphicsView):
             probe.measurement_type = probe_type
             self.scene.addItem(probe)
             self.simulation_probes.append(probe)
+            self._journal_items([probe])
             
             # Try to find nearby component immediately
             probe.findNearbyComponent()
@@ -1297,6 +2902,7 @@ class CircuitCanvas(QGraphicsView):
             self.updateWireAnimations()
             self.animation_frame += 1
     
+    @TRACE.traced("updateWireAnimations", "animation")
     def updateWireAnimations(self):
         """Update wire animations to show current flow"""
         if not self.connections:
@@ -1384,21 +2990,10 @@ class CircuitCanvas(QGraphicsView):
                             probe.update()
                 else:
                     # Not directly connected - use nearest component approach as fallback
-                    nearest_component = None
-                    min_dist = float('inf')
-                    
-                    scene_pos = probe.pos()
-                    for item in self.scene.items():
-                        if isinstance(item, ComponentItem):
-                            comp_pos = item.pos()
-                            dist = ((comp_pos.x() - scene_pos.x())**2 + 
-                                    (comp_pos.y() - scene_pos.y())**2)**0.5
-                            if dist < min_dist:
-                                min_dist = dist
-                                nearest_component = item
+                    nearest_component = self.pin_index.nearest_component(probe.pos(), 50)
                     
                     # If probe is close to a component, show its values
-                    if nearest_component and min_dist < 50:
+                    if nearest_component:
                         comp_id = str(id(nearest_component))
                         
                         if probe.measurement_type == "voltage" and comp_id in voltage_data:
@@ -1459,9 +3054,10 @@ class CircuitCanvas(QGraphicsView):
         layout.addWidget(tabs, stretch=1)
         
         # Add waveform plots
+        native = self._use_native_plots()
         voltage_tab = QWidget()
         voltage_layout = QVBoxLayout(voltage_tab)
-        voltage_canvas = AnimatedMatplotlibCanvas(dialog, width=5, height=4, dpi=100)
+        voltage_canvas = create_live_canvas(dialog, native, width=5, height=4, dpi=100)
         voltage_canvas.setup_plot("Voltage vs. Time", "Time (s)", "Voltage (V)")
         voltage_layout.addWidget(voltage_canvas.toolbar)
         voltage_layout.addWidget(voltage_canvas)
@@ -1469,7 +3065,7 @@ class CircuitCanvas(QGraphicsView):
         
         current_tab = QWidget()
         current_layout = QVBoxLayout(current_tab)
-        current_canvas = AnimatedMatplotlibCanvas(dialog, width=5, height=4, dpi=100)
+        current_canvas = create_live_canvas(dialog, native, width=5, height=4, dpi=100)
         current_canvas.setup_plot("Current vs. Time", "Time (s)", "Current (A)")
         current_layout.addWidget(current_canvas.toolbar)
         current_layout.addWidget(current_canvas)
@@ -1478,7 +3074,7 @@ class CircuitCanvas(QGraphicsView):
         # Add power analysis tab
         power_tab = QWidget()
         power_layout = QVBoxLayout(power_tab)
-        power_canvas = AnimatedMatplotlibCanvas(dialog, width=5, height=4, dpi=100)
+        power_canvas = create_live_canvas(dialog, native, width=5, height=4, dpi=100)
         power_canvas.setup_plot("Power Consumption", "Time (s)", "Power (W)")
         power_layout.addWidget(power_canvas.toolbar)
         power_layout.addWidget(power_canvas)
@@ -1493,142 +3089,37 @@ class CircuitCanvas(QGraphicsView):
         tabs.addTab(stats_tab, "Circuit Statistics")
         
         # Fill stats with component information
-        stats_html = "<h2>Circuit Components</h2><table border='1' cellspacing='0' cellpadding='5'>"
-        stats_html += "<tr><th>Component</th><th>Type</th><th>Value</th><th>Connections</th></tr>"
-        
-        # Add component stats
-        for component_id, component in self.simulator.components.items():
-            comp_type = component['type']
-            value = component['value']
-            connections = len([c for c in self.simulator.connections 
-                            if c['from'][0] == component_id or c['to'][0] == component_id])
-            
-            stats_html += f"<tr><td>{component_id[-6:]}</td><td>{comp_type}</td><td>{value}</td><td>{connections}</td></tr>"
-        
-        stats_html += "</table>"
-        
-        # Add simulation summary
-        voltage_sources = len(self.simulator.voltage_sources)
-        ground_nodes = len(self.simulator.ground_nodes)
-        components = len(self.simulator.components)
-        connections = len(self.simulator.connections)
-        
-        stats_html += f"""
-        <h2>Simulation Summary</h2>
-        <ul>
-            <li>Total components: {components}</li>
-            <li>Voltage sources: {voltage_sources}</li>
-            <li>Ground nodes: {ground_nodes}</li>
-            <li>Connections: {connections}</li>
-            <li>Simulation time: {getattr(self.simulator, 'max_time', 1.0):.3f}s</li>
-            <li>Time step: {getattr(self.simulator, 'time_step', 0.001):.6f}s</li>
-        </ul>
-        """
+        stats_html = circuit_statistics_html(self.simulator)
         
         stats_text.setHtml(stats_html)
         
         # Add animation update functions
         def update_voltage_plot(frame):
-            time = getattr(self.simulator, 'current_time', 0)
-            voltage_canvas.axes.clear()
-            voltage_canvas.setup_plot("Voltage vs. Time", "Time (s)", "Voltage (V)")
-            
-            # Get simulation results up to current time
-            if hasattr(self.simulator, 'time_points'):
-                time_idx = min(int(time / self.simulator.time_step) + 1, 
-                              len(self.simulator.time_points))
-                
-                plot_times = self.simulator.time_points[:time_idx]
-                
-                if hasattr(self.simulator, 'voltage_data'):
-                    # Plot each component's voltage
-                    for component_id, voltage in self.simulator.voltage_data.items():
-                        comp_type = self.simulator.components[component_id]['type']
-                        if time_idx > 0:
-                            voltage_canvas.axes.plot(
-                                plot_times, 
-                                voltage[:time_idx], 
-                                label=f"{comp_type} {component_id[-4:]}"
-                            )
-            
-            voltage_canvas.axes.legend(loc='upper right')
-            handles, labels = voltage_canvas.axes.get_legend_handles_labels()
-            if not handles:  # Only add text if no data
-                voltage_canvas.axes.text(
-                    0.5, 0.5, 
-                    "No data available",
-                    ha='center', va='center',
-                    transform=voltage_canvas.axes.transAxes,
-                    fontsize=12, color='gray'
-                )
-            
-            return voltage_canvas.axes
+            voltage_canvas.draw_traces(self._live_traces('voltage'), message="No data available")
         
         def update_current_plot(frame):
-            time = getattr(self.simulator, 'current_time', 0)
-            current_canvas.axes.clear()
-            current_canvas.setup_plot("Current vs. Time", "Time (s)", "Current (A)")
-            
-            # Get simulation results up to current time
-            if hasattr(self.simulator, 'time_points'):
-                time_idx = min(int(time / self.simulator.time_step) + 1, 
-                              len(self.simulator.time_points))
-                
-                plot_times = self.simulator.time_points[:time_idx]
-                
-                if hasattr(self.simulator, 'current_data'):
-                    # Plot each component's current
-                    for component_id, current in self.simulator.current_data.items():
-                        comp_type = self.simulator.components[component_id]['type']
-                        if time_idx > 0:
-                            current_canvas.axes.plot(
-                                plot_times, 
-                                current[:time_idx], 
-                                label=f"{comp_type} {component_id[-4:]}"
-                            )
-            
-            current_canvas.axes.legend(loc='upper right')
-            return current_canvas.axes
+            current_canvas.draw_traces(self._live_traces('current'))
         
         def update_power_plot(frame):
-            time = getattr(self.simulator, 'current_time', 0)
-            power_canvas.axes.clear()
-            power_canvas.setup_plot("Power Consumption", "Time (s)", "Power (W)")
-            
-            # Get simulation results up to current time
-            if hasattr(self.simulator, 'time_points'):
-                time_idx = min(int(time / self.simulator.time_step) + 1, 
-                              len(self.simulator.time_points))
-                
-                plot_times = self.simulator.time_points[:time_idx]
-                
-                if hasattr(self.simulator, 'voltage_data') and hasattr(self.simulator, 'current_data'):
-                    # Calculate power for each component
-                    for component_id in self.simulator.components:
-                        if (component_id in self.simulator.voltage_data and 
-                            component_id in self.simulator.current_data):
-                            
-                            voltage = self.simulator.voltage_data[component_id][:time_idx]
-                            current = self.simulator.current_data[component_id][:time_idx]
-                            
-                            if len(voltage) > 0 and len(current) > 0:
-                                # Calculate power (P = V * I)
-                                power = [v * i for v, i in zip(voltage, current)]
-                                
-                                comp_type = self.simulator.components[component_id]['type']
-                                power_canvas.axes.plot(
-                                    plot_times, 
-                                    power, 
-                                    label=f"{comp_type} {component_id[-4:]}"
-                                )
-            
-            power_canvas.axes.legend(loc='upper right')
-            return power_canvas.axes
-        
-        # Start animations
-        voltage_anim = voltage_canvas.start_animation(update_voltage_plot, interval=100)
-        current_anim = current_canvas.start_animation(update_current_plot, interval=100)
-        power_anim = power_canvas.start_animation(update_power_plot, interval=100)
+            power_canvas.draw_traces(self._live_traces('power'))
+        
+        # One shared clock drives whichever plot tab is currently visible
+        clock = AnimationClock(
+            lambda: getattr(self.simulator, 'current_time', 0),
+            lambda: getattr(self.simulator, 'is_running', False),
+            interval=100, parent=dialog
+        )
+        clock.add_view(voltage_canvas, update_voltage_plot)
+        clock.add_view(current_canvas, update_current_plot)
+        clock.add_view(power_canvas, update_power_plot)
+        
+        # Hidden tabs catch up when shown; the clock follows the playback controls
+        tabs.currentChanged.connect(lambda index: clock.catch_up())
+        control_panel.simulationStarted.connect(clock.start)
+        control_panel.simulationStopped.connect(clock.pause)
+        control_panel.simulationReset.connect(clock.invalidate)
+        dialog.finished.connect(clock.pause)
+        QTimer.singleShot(0, clock.start)
         
         # Add new tab for probe measurements
         probes_tab = QWidget()
@@ -1645,13 +3136,49 @@ class CircuitCanvas(QGraphicsView):
         # Show dialog
         dialog.exec()
     
+    def _use_native_plots(self):
+        """Whether live views should use the QPainter WaveformView"""
+        return getattr(self.main_window, 'native_live_plots', True)
+    
+    def _live_traces(self, quantity):
+        """Build (label, time, values, color) traces up to the current simulation time"""
+        simulator = self.simulator
+        if not hasattr(simulator, 'time_points'):
+            return []
+        time = getattr(simulator, 'current_time', 0)
+        time_idx = min(int(time / simulator.time_step) + 1, len(simulator.time_points))
+        if time_idx <= 0:
+            return []
+        
+        plot_times = simulator.time_points[:time_idx]
+        voltage_data = getattr(simulator, 'voltage_data', {})
+        current_data = getattr(simulator, 'current_data', {})
+        traces = []
+        for component_id, component in simulator.components.items():
+            if quantity == 'voltage' and component_id in voltage_data:
+                values = voltage_data[component_id][:time_idx]
+            elif quantity == 'current' and component_id in current_data:
+                values = current_data[component_id][:time_idx]
+            elif (quantity == 'power' and component_id in voltage_data
+                  and component_id in current_data):
+                # Calculate power (P = V * I)
+                values = voltage_data[component_id][:time_idx] * current_data[component_id][:time_idx]
+            else:
+                continue
+            traces.append((f"{component['type']} {component_id[-4:]}", plot_times, values, None))
+        return traces
+    
     def _cleanup_simulation_dialog(self, dialog):
         """Clean up resources when closing simulation dialog"""
         # Stop any running simulations
         self.stopSimulationAnimation()
         
         # Find and stop all animations
-        for child in dialog.findChildren(AnimatedMatplotlibCanvas):
+        for clock in dialog.findChildren(AnimationClock):
+            clock.pause()
+        # Native and matplotlib live views alike; checking for the matplotlib
+        # class by name would import matplotlib just to close the dialog
+        for child in dialog.findChildren(QWidget):
             if hasattr(child, 'clear_animations'):
                 child.clear_animations()
             
@@ -1660,18 +3187,8 @@ class CircuitCanvas(QGraphicsView):
 class ComponentLibrary(QListWidget):
     def __init__(self):
         super().__init__()
-        self.components = [
-            Component("Resistor", "R", 2),
-            Component("Capacitor", "C", 2),
-            Component("Inductor", "L", 2),
-            Component("Battery", "V", 2),
-            Component("LED", "LED", 2),
-            Component("Transistor", "T", 3),
-            Component("Diode", "D", 2),
-            Component("Switch", "SW", 2),
-            Component("Potentiometer", "POT", 3),
-            Component("IC", "IC", 4)
-        ]
+        self.components = [Component.shared(kind.name, kind.symbol, kind.pins) for kind in LIBRARY_TYPES]
+        self.builtin_count = len(self.components)  # Subcircuit blocks are listed after these
         
         for component in self.components:
             self.addItem(f"{component.name}")
@@ -1696,6 +3213,15 @@ class ComponentLibrary(QListWidget):
             }
         """)
 
+    def show_subcircuits(self, definitions):
+        """List one placeable block per subcircuit definition, after the built-in parts"""
+        del self.components[self.builtin_count:]
+        while self.count() > self.builtin_count:
+            self.takeItem(self.count() - 1)
+        for definition in definitions:
+            self.components.append(subcircuit_component(definition))
+            self.addItem(f"{definition.name} (subcircuit)")
+    
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
             item = self.itemAt(event.position().toPoint())
@@ -1708,23 +3234,41 @@ class ComponentLibrary(QListWidget):
                 mime_data.component = component
                 drag.setMimeData(mime_data)
                 
-                # Create a pixmap for drag visual feedback
-                pixmap = QPixmap(60, 40)
-                pixmap.fill(Qt.transparent)
-                painter = QPainter(pixmap)
-                painter.setPen(QPen(Qt.black, 2))
-                painter.setBrush(QBrush(QColor(240, 240, 240)))
-                painter.drawRoundedRect(5, 5, 50, 30, 5, 5)
-                painter.drawText(pixmap.rect(), Qt.AlignCenter, component.symbol)
-                painter.end()
-                
+                # Drag visual feedback uses the same symbol the canvas draws
+                pixmap = SymbolCache.pixmap(component, device_ratio=self.devicePixelRatioF())
                 drag.setPixmap(pixmap)
-                drag.setHotSpot(QPoint(30, 20))
+                drag.setHotSpot(QPoint(30, 25))
                 
                 drag.exec()
         super().mousePressEvent(event)
 
+class ReportExportThread(QThread):
+    """Simulates a circuit and exports its report off the GUI thread.
+
+    export_reports starts a spawned process pool whose workers re-import
+    PySide6 and matplotlib, which would freeze the window for seconds.
+    """
+    exported = Signal(str)  # Path of the report's index page
+    failed = Signal(str)
+    
+    def __init__(self, simulator, out_dir, formats=("png", "svg"), parent=None):
+        super().__init__(parent)
+        self.simulator = simulator
+        self.out_dir = out_dir
+        self.formats = formats
+    
+    def run(self):
+        try:
+            time_points, voltage_data, current_data = self.simulator.simulate(0.1, 0.001)
+            self.simulator.max_time = 0.1
+            job = report_job("circuit", self.simulator, time_points, voltage_data, current_data)
+            self.exported.emit(export_reports([job], self.out_dir, self.formats))
+        except Exception as e:
+            self.failed.emit(str(e))
+
 class SmartLab(QMainWindow):
+    MAX_LISTED_ERRORS = 50  # Validation panel lines before the list is summarised
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("SmartLab - Professional Circuit Designer")
@@ -1837,15 +3381,24 @@ class SmartLab(QMainWindow):
         # Create circuit canvas with reference to main window
         self.canvas = CircuitCanvas(self)
         self.canvas.setAcceptDrops(True)
+        self.canvas.errorsChanged.connect(self.show_validation_errors)
         
         # Add widgets to main layout
         layout.addWidget(left_panel)
         layout.addWidget(self.canvas, stretch=4)
         
+        # Live instrument plots use the native QPainter view unless disabled
+        self.native_live_plots = True
+        self.project_path = None  # File the circuit was opened from or last saved to
+        self.autosave_lock = None  # Held while this window owns the autosave files
+        self.report_thread = None  # Report export running in the background
+        
         # Setup menu and toolbar
+        STARTUP.mark("build main window widgets")
         self.create_menu_bar()
         self.create_toolbar()
         self.create_status_bar()
+        QTimer.singleShot(0, self.start_autosave)  # Once the window is up, as it may ask about recovery
         
         # Application state
         self.current_tool = "select"
@@ -1921,10 +3474,23 @@ class SmartLab(QMainWindow):
         file_menu = menubar.addMenu("File")
         new_action = file_menu.addAction("New")
         new_action.setShortcut("Ctrl+N")
+        new_action.triggered.connect(self.new_project)
         open_action = file_menu.addAction("Open")
         open_action.setShortcut("Ctrl+O")
+        open_action.triggered.connect(self.open_project)
         save_action = file_menu.addAction("Save")
         save_action.setShortcut("Ctrl+S")
+        save_action.triggered.connect(self.save_project)
+        save_as_action = file_menu.addAction("Save As...")
+        save_as_action.setShortcut("Ctrl+Shift+S")
+        save_as_action.triggered.connect(self.save_project_as)
+        file_menu.addSeparator()
+        import_netlist_action = file_menu.addAction("Import SPICE Netlist...")
+        import_netlist_action.triggered.connect(self.import_netlist)
+        export_netlist_action = file_menu.addAction("Export SPICE Netlist...")
+        export_netlist_action.triggered.connect(self.export_netlist)
+        export_report_action = file_menu.addAction("Export Report...")
+        export_report_action.triggered.connect(self.export_report)
         file_menu.addSeparator()
         exit_action = file_menu.addAction("Exit")
         exit_action.setShortcut("Alt+F4")
@@ -1932,13 +3498,20 @@ class SmartLab(QMainWindow):
         
         # Edit menu
         edit_menu = menubar.addMenu("Edit")
-        undo_action = edit_menu.addAction("Undo")
+        self.undo_action = undo_action = edit_menu.addAction("Undo")
         undo_action.setShortcut("Ctrl+Z")
-        redo_action = edit_menu.addAction("Redo")
+        undo_action.triggered.connect(self.undo)
+        self.redo_action = redo_action = edit_menu.addAction("Redo")
         redo_action.setShortcut("Ctrl+Y")
+        redo_action.triggered.connect(self.redo)
+        self.canvas.history.on_change = self.update_undo_actions
+        self.update_undo_actions()
         edit_menu.addSeparator()
         select_all_action = edit_menu.addAction("Select All")
         select_all_action.setShortcut("Ctrl+A")
+        subcircuit_action = edit_menu.addAction("Create Subcircuit...")
+        subcircuit_action.setShortcut("Ctrl+Shift+G")
+        subcircuit_action.triggered.connect(self.create_subcircuit)
         
         # View menu
         view_menu = menubar.addMenu("View")
@@ -1955,6 +3528,14 @@ class SmartLab(QMainWindow):
         toggle_grid_action = view_menu.addAction("Toggle Grid")
         toggle_grid_action.setShortcut("Ctrl+G")
         toggle_grid_action.triggered.connect(self.canvas.toggleGrid)
+        native_plots_action = view_menu.addAction("Native Live Plots")
+        native_plots_action.setCheckable(True)
+        native_plots_action.setChecked(self.native_live_plots)
+        native_plots_action.toggled.connect(self.set_native_live_plots)
+        perf_hud_action = view_menu.addAction("Performance HUD")
+        perf_hud_action.setShortcut("F12")
+        perf_hud_action.setCheckable(True)
+        perf_hud_action.toggled.connect(self.canvas.set_perf_hud)
         
         # Tools menu
         tools_menu = menubar.addMenu("Tools")
@@ -1962,6 +3543,9 @@ class SmartLab(QMainWindow):
         simulate_action.setShortcut("F5")
         pcb_action = tools_menu.addAction("Generate PCB")
         pcb_action.setShortcut("F6")
+        tools_menu.addSeparator()
+        trace_action = tools_menu.addAction("Export Performance Trace...")
+        trace_action.triggered.connect(self.export_perf_trace)
         
         # Help menu
         help_menu = menubar.addMenu("Help")
@@ -2047,26 +3631,21 @@ class SmartLab(QMainWindow):
         
         elif tool == "rotate":
             selected_items = self.canvas.scene.selectedItems()
-            for item in selected_items:
-                if isinstance(item, ComponentItem):
-                    item.rotation_angle += 90
-                    item.setRotation(item.rotation_angle)
-                    # Regenerate pins after rotation if needed
+            with self.canvas.edit() as edit:
+                edit.rotate(selected_items)
             self.statusBar.showMessage(f"Rotated {len(selected_items)} component(s)")
         elif tool == "delete":
             selected_items = self.canvas.scene.selectedItems()
             if selected_items:
-                for item in selected_items:
-                    # Use the enhanced delete method
-                    self.canvas.deleteItem(item)
+                with self.canvas.edit() as edit:
+                    edit.delete(selected_items)
                 self.statusBar.showMessage(f"Deleted {len(selected_items)} item(s)")
             else:
                 self.statusBar.showMessage("Select items to delete")
         elif tool == "mirror":
             selected_items = self.canvas.scene.selectedItems()
-            for item in selected_items:
-                if isinstance(item, ComponentItem):
-                    item.setScale(-1 if item.scale() == 1 else 1, 1)
+            with self.canvas.edit() as edit:
+                edit.mirror(selected_items)
             self.statusBar.showMessage(f"Mirrored {len(selected_items)} component(s)")
         elif tool == "zoom in":
             self.zoom_in()
@@ -2074,26 +3653,10 @@ class SmartLab(QMainWindow):
             self.zoom_out()
         elif tool == "validate":
             errors = self.canvas.validateCircuit()
+            self.show_validation_errors(errors)
             if errors:
-                error_text = "\n".join(errors)
-                self.error_panel.setText(error_text)
-                self.error_panel.setStyleSheet("""
-                    background-color: #FFF0F0;
-                    color: #CC0000;
-                    padding: 8px;
-                    border-radius: 4px;
-                    min-height: 80px;
-                """)
                 self.statusBar.showMessage(f"Circuit validation found {len(errors)} issues")
             else:
-                self.error_panel.setText("No errors detected")
-                self.error_panel.setStyleSheet("""
-                    background-color: #F0FFF0;
-                    color: #00AA00;
-                    padding: 8px;
-                    border-radius: 4px;
-                    min-height: 80px;
-                """)
                 self.statusBar.showMessage("Circuit validation passed")
         elif tool == "simulate":
             # Run simulation with proper error handling
@@ -2156,7 +3719,7 @@ class SmartLab(QMainWindow):
                         """)
                         self.statusBar.showMessage("Simulation failed")
             except Exception as e:
-                print(f"Simulation error: {str(e)}")
+                TRACE.message(f"Simulation error: {str(e)}", ERROR)
                 self.sim_results.setText(f"Simulation error: {str(e)}")
                 self.sim_results.setStyleSheet("""
                     background-color: #FFF0F0;
@@ -2171,6 +3734,239 @@ class SmartLab(QMainWindow):
                 self.canvas.showSimulationPreview(False)
                 QApplication.processEvents()
     
+    def undo(self):
+        text = self.canvas.history.undo(self.canvas)
+        self.statusBar.showMessage(f"Undo: {text}" if text else "Nothing to undo")
+    
+    def redo(self):
+        text = self.canvas.history.redo(self.canvas)
+        self.statusBar.showMessage(f"Redo: {text}" if text else "Nothing to redo")
+    
+    def update_undo_actions(self):
+        """Name the next undo/redo step in the Edit menu and disable empty ones"""
+        history = self.canvas.history
+        self.undo_action.setEnabled(bool(history.undo_stack))
+        self.undo_action.setText(f"Undo {history.undo_stack[-1].text}" if history.undo_stack else "Undo")
+        self.redo_action.setEnabled(bool(history.redo_stack))
+        self.redo_action.setText(f"Redo {history.redo_stack[-1].text}" if history.redo_stack else "Redo")
+    
+    def show_validation_errors(self, errors):
+        """Show an error list in the validation panel; long lists are cut short"""
+        if errors:
+            shown = errors[:self.MAX_LISTED_ERRORS]
+            if len(errors) > len(shown):
+                shown.append(f"... and {len(errors) - len(shown)} more")
+            self.error_panel.setText("\n".join(shown))
+            self.error_panel.setStyleSheet("""
+                background-color: #FFF0F0;
+                color: #CC0000;
+                padding: 8px;
+                border-radius: 4px;
+                min-height: 80px;
+            """)
+        else:
+            self.error_panel.setText("No errors detected")
+            self.error_panel.setStyleSheet("""
+                background-color: #F0FFF0;
+                color: #00AA00;
+                padding: 8px;
+                border-radius: 4px;
+                min-height: 80px;
+            """)
+    
+    @staticmethod
+    def autosave_directory():
+        base = QStandardPaths.writableLocation(QStandardPaths.AppLocalDataLocation)
+        return os.path.join(base or os.path.expanduser("~/.smartlab"), "autosave")
+    
+    def start_autosave(self):
+        """Offer to recover work from a session that did not close, then journal edits"""
+        directory = self.autosave_directory()
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            self.statusBar.showMessage(f"Autosave is off: {str(e)}")
+            return
+        lock = QLockFile(os.path.join(directory, "autosave.lock"))
+        if not lock.tryLock(0):
+            self.statusBar.showMessage("Autosave is off: another SmartLab window is using it")
+            return
+        self.autosave_lock = lock
+        
+        if has_recovery(directory):
+            answer = QMessageBox.question(
+                self, "Recover Work",
+                "SmartLab did not close normally last time. Recover the unsaved circuit?")
+            if answer == QMessageBox.Yes:
+                try:
+                    components, wires, _ = self.canvas.load_records(recover(directory), "recovered work")
+                    self.reset_view()
+                    self.statusBar.showMessage(f"Recovered {components} components and {wires} wires")
+                except (OSError, ProjectFormatError) as e:
+                    TRACE.message(f"Recovery error: {str(e)}", ERROR)
+                    self.statusBar.showMessage(f"Could not recover the unsaved circuit: {str(e)}")
+        
+        journal = AutosaveJournal(directory)
+        journal.start()
+        self.canvas.attach_autosave(journal)  # Replaces any old files with the current circuit
+    
+    def closeEvent(self, event):
+        # A clean exit leaves nothing to recover
+        if self.canvas.autosave is not None:
+            self.canvas.autosave.close()
+            self.canvas.autosave = None
+        if self.autosave_lock is not None:
+            self.autosave_lock.unlock()
+            self.autosave_lock = None
+        if self.report_thread is not None:
+            self.report_thread.wait()  # Let a report being written finish
+        super().closeEvent(event)
+    
+    def create_subcircuit(self):
+        items = self.canvas.scene.selectedItems()
+        if not any(isinstance(item, ComponentItem) for item in items):
+            self.statusBar.showMessage("Select the parts to group into a subcircuit")
+            return
+        name, ok = QInputDialog.getText(self, "Create Subcircuit", "Block name:",
+                                        text=f"Block{len(self.canvas.subcircuits) + 1}")
+        if not ok:
+            return
+        instance = self.canvas.create_subcircuit(items, name.strip())
+        if instance is not None:
+            self.statusBar.showMessage(
+                f"Created subcircuit {instance.component.symbol} with {instance.component.pins} ports")
+    
+    def new_project(self):
+        self.canvas.clear_circuit()
+        self.project_path = None
+        self.statusBar.showMessage("New circuit")
+    
+    def open_project(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Open Project", "", FILE_FILTER)
+        if not path:
+            return
+        start = time.perf_counter()
+        try:
+            components, wires, probes = self.canvas.load_project(path)
+        except (OSError, ProjectFormatError) as e:
+            TRACE.message(f"Project open error: {str(e)}", ERROR)
+            self.statusBar.showMessage(f"Could not open {os.path.basename(path)}: {str(e)}")
+            return
+        self.project_path = path
+        self.reset_view()
+        self.statusBar.showMessage(
+            f"Opened {os.path.basename(path)}: {components} components, {wires} wires, "
+            f"{probes} probes in {time.perf_counter() - start:.2f}s")
+    
+    def save_project(self):
+        if self.project_path is None:
+            self.save_project_as()
+            return
+        try:
+            self.canvas.save_project(self.project_path)
+            self.statusBar.showMessage(f"Saved {os.path.basename(self.project_path)}")
+        except OSError as e:
+            TRACE.message(f"Project save error: {str(e)}", ERROR)
+            self.statusBar.showMessage(f"Could not save {os.path.basename(self.project_path)}: {str(e)}")
+    
+    def save_project_as(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Project", "", FILE_FILTER)
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            path += EXTENSION
+        self.project_path = path
+        self.save_project()
+    
+    def import_netlist(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import SPICE Netlist", "", NETLIST_FILTER)
+        if not path:
+            return
+        start = time.perf_counter()
+        try:
+            components, wires, skipped = self.canvas.import_netlist(path)
+        except (OSError, NetlistError) as e:
+            TRACE.message(f"Netlist import error: {str(e)}", ERROR)
+            self.statusBar.showMessage(f"Could not import {os.path.basename(path)}: {str(e)}")
+            return
+        self.project_path = None
+        self.reset_view()
+        message = (f"Imported {os.path.basename(path)}: {components} components, {wires} wires "
+                   f"in {time.perf_counter() - start:.2f}s")
+        if skipped:
+            message += f" ({skipped} unsupported cards skipped)"
+        self.statusBar.showMessage(message)
+    
+    def export_netlist(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export SPICE Netlist", "", NETLIST_FILTER)
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            path += NETLIST_EXTENSIONS[0]
+        title = os.path.splitext(os.path.basename(self.project_path or path))[0]
+        try:
+            written, skipped = self.canvas.export_netlist(path, title)
+        except OSError as e:
+            TRACE.message(f"Netlist export error: {str(e)}", ERROR)
+            self.statusBar.showMessage(f"Could not export {os.path.basename(path)}: {str(e)}")
+            return
+        message = f"Exported {written} components to {os.path.basename(path)}"
+        if skipped:
+            message += f" ({skipped} with no SPICE equivalent left as comments)"
+        self.statusBar.showMessage(message)
+    
+    def export_report(self):
+        """Simulate the current circuit and export its plots and summary headlessly"""
+        if self.report_thread is not None:
+            self.statusBar.showMessage("A report is still being exported")
+            return
+        out_dir = QFileDialog.getExistingDirectory(self, "Export Report To")
+        if not out_dir:
+            return
+        # A simulator of its own, so the live simulation and its results are left alone
+        simulator = self.canvas.build_simulator()
+        if simulator is None:
+            self.statusBar.showMessage("Nothing to export - add components first")
+            return
+        
+        self.report_thread = ReportExportThread(simulator, out_dir, parent=self)
+        self.report_thread.exported.connect(self._report_exported)
+        self.report_thread.failed.connect(self._report_failed)
+        self.report_thread.finished.connect(self._report_thread_finished)
+        self.statusBar.showMessage("Exporting report...")
+        self.report_thread.start()
+    
+    def _report_exported(self, index_path):
+        self.statusBar.showMessage(f"Report exported to {index_path}")
+    
+    def _report_failed(self, error):
+        TRACE.message(f"Report export error: {error}", ERROR)
+        self.statusBar.showMessage(f"Report export failed: {error}")
+    
+    def _report_thread_finished(self):
+        self.report_thread.deleteLater()
+        self.report_thread = None
+    
+    def export_perf_trace(self):
+        """Save the recent timing spans as Chrome trace-event JSON"""
+        path, _ = QFileDialog.getSaveFileName(self, "Export Performance Trace", "smartlab-trace.json",
+                                              "Chrome Trace (*.json);;All Files (*)")
+        if not path:
+            return
+        try:
+            count = TRACE.write_chrome_trace(path)
+        except OSError as e:
+            self.statusBar.showMessage(f"Could not export {os.path.basename(path)}: {str(e)}")
+            return
+        self.statusBar.showMessage(f"Exported {count} trace events to {os.path.basename(path)}; "
+                                   "open it in chrome://tracing or ui.perfetto.dev")
+    
+    def set_native_live_plots(self, enabled):
+        """Choose between QPainter and matplotlib views for live plots"""
+        self.native_live_plots = enabled
+        backend = "native" if enabled else "matplotlib"
+        self.statusBar.showMessage(f"Live plots will use the {backend} renderer")
+    
     def zoom_in(self):
         self.canvas.scale(1.2, 1.2)
     
@@ -2179,7 +3975,16 @@ class SmartLab(QMainWindow):
     
     def reset_view(self):
         self.canvas.resetTransform()
-        self.canvas.fitInView(self.canvas.scene.sceneRect(), Qt.KeepAspectRatio)
+        # The scene is effectively unbounded, so frame the circuit itself
+        bounds = self.canvas.scene.itemsBoundingRect()
+        if bounds.isEmpty():
+            self.canvas.centerOn(0, 0)
+        else:
+            self.canvas.fitInView(bounds.adjusted(-50, -50, 50, 50), Qt.KeepAspectRatio)
+            if self.canvas.transform().m11() > 1:
+                # Don't blow a small circuit up past 1:1
+                self.canvas.resetTransform()
+                self.canvas.centerOn(bounds.center())
 
     def create_simulation_toolbar(self):
         """Create a toolbar for simulation tools"""
@@ -2274,7 +4079,7 @@ class SmartLab(QMainWindow):
                 self.statusBar.showMessage("Simulation failed")
                 
         except Exception as e:
-            print(f"Advanced simulation error: {str(e)}")
+            TRACE.message(f"Advanced simulation error: {str(e)}", ERROR)
             self.sim_results.setText(f"Simulation error: {str(e)}")
             self.sim_results.setStyleSheet("""
                 background-color: #FFF0F0;
@@ -2310,7 +4115,7 @@ class SmartLab(QMainWindow):
         # Create oscilloscope dialog with real-time updates
         dialog = QDialog(self)
         dialog.setWindowTitle("SmartLab Oscilloscope")
-        dialog.setMinimumSize(800, 600)
+        dialog.setMinimumSize(900, 650)
         
         # Add plot canvas for oscilloscope display
         layout = QVBoxLayout(dialog)
@@ -2327,7 +4132,56 @@ class SmartLab(QMainWindow):
         """)
         layout.addWidget(title_label)
         
-        # Create more professional control panel
+        # Per-channel controls: enable, source, quantity, gain and offset
+        channel_panel = QWidget()
+        channel_panel.setStyleSheet("""
+            background-color: #F0F0F0;
+            border-radius: 4px;
+            padding: 2px;
+        """)
+        channel_grid = QGridLayout(channel_panel)
+        channel_grid.setContentsMargins(10, 5, 10, 5)
+        for column, heading in enumerate(["Channel", "Signal Source", "Quantity", "Gain", "Offset"]):
+            channel_grid.addWidget(QLabel(heading), 0, column)
+        
+        channel_colors = ['#1E5128', '#D62828', '#1f77b4', '#9467bd']
+        channels = []
+        for index, color in enumerate(channel_colors):
+            enable_box = QCheckBox(f"CH{index + 1}")
+            enable_box.setChecked(index == 0)
+            enable_box.setStyleSheet(f"color: {color}; font-weight: bold;")
+            
+            source_combo = QComboBox()
+            source_combo.setMinimumWidth(150)
+            # Populate with available components
+            for comp_id, comp in self.canvas.simulator.components.items():
+                source_combo.addItem(f"{comp['type']} - {comp_id[-6:]}", comp_id)
+            source_combo.setCurrentIndex(min(index, source_combo.count() - 1))
+            
+            quantity_combo = QComboBox()
+            quantity_combo.addItems(["Voltage", "Current"])
+            quantity_combo.setStyleSheet("background-color: white;")
+            
+            gain_spin = QDoubleSpinBox()
+            gain_spin.setRange(-1000, 1000)
+            gain_spin.setDecimals(3)
+            gain_spin.setValue(1.0)
+            
+            offset_spin = QDoubleSpinBox()
+            offset_spin.setRange(-1000, 1000)
+            offset_spin.setDecimals(3)
+            offset_spin.setValue(0.0)
+            
+            for column, widget in enumerate([enable_box, source_combo, quantity_combo, gain_spin, offset_spin]):
+                channel_grid.addWidget(widget, index + 1, column)
+            channels.append({
+                'enable': enable_box, 'source': source_combo, 'quantity': quantity_combo,
+                'gain': gain_spin, 'offset': offset_spin, 'color': color
+            })
+        
+        layout.addWidget(channel_panel)
+        
+        # Create more professional control panel for the shared time base
         control_panel = QWidget()
         control_panel.setStyleSheet("""
             background-color: #F0F0F0;
@@ -2337,32 +4191,6 @@ class SmartLab(QMainWindow):
         control_layout = QHBoxLayout(control_panel)
         control_layout.setContentsMargins(10, 5, 10, 5)
         
-        # Signal selection with better labeling
-        signal_group = QWidget()
-        signal_layout = QVBoxLayout(signal_group)
-        signal_layout.setContentsMargins(0, 0, 0, 0)
-        signal_label = QLabel("Signal Source:")
-        signal_combo = QComboBox()
-        signal_combo.setMinimumWidth(150)
-        
-        # Populate with available components
-        for comp_id, comp in self.canvas.simulator.components.items():
-            signal_combo.addItem(f"{comp['type']} - {comp_id[-6:]}", comp_id)
-        
-        signal_layout.addWidget(signal_label)
-        signal_layout.addWidget(signal_combo)
-        
-        # Channel selection with better UI
-        channel_group = QWidget()
-        channel_layout = QVBoxLayout(channel_group)
-        channel_layout.setContentsMargins(0, 0, 0, 0)
-        channel_label = QLabel("Channel:")
-        channel_combo = QComboBox()
-        channel_combo.addItems(["Voltage", "Current"])
-        channel_combo.setStyleSheet("background-color: white;")
-        channel_layout.addWidget(channel_label)
-        channel_layout.addWidget(channel_combo)
-        
         # Add professional time scale controls
         timescale_group = QWidget()
         timescale_layout = QVBoxLayout(timescale_group)
@@ -2381,6 +4209,7 @@ class SmartLab(QMainWindow):
         trigger_layout = QVBoxLayout(trigger_group)
         trigger_layout.setContentsMargins(0, 0, 0, 0)
         trigger_label = QLabel("Trigger:")
+        trigger_row = QHBoxLayout()
         trigger_button = QPushButton("Edge Trigger")
         trigger_button.setCheckable(True)
         trigger_button.setStyleSheet("""
@@ -2395,8 +4224,31 @@ class SmartLab(QMainWindow):
                 background-color: #D62828;
             }
         """)
+        trigger_source_combo = QComboBox()
+        trigger_source_combo.addItems([f"CH{i + 1}" for i in range(len(channels))])
+        trigger_row.addWidget(trigger_button)
+        trigger_row.addWidget(trigger_source_combo)
         trigger_layout.addWidget(trigger_label)
-        trigger_layout.addWidget(trigger_button)
+        trigger_layout.addLayout(trigger_row)
+        
+        # Display mode: amplitude over time or one channel against another
+        mode_group = QWidget()
+        mode_layout = QVBoxLayout(mode_group)
+        mode_layout.setContentsMargins(0, 0, 0, 0)
+        mode_label = QLabel("Mode:")
+        mode_row = QHBoxLayout()
+        mode_combo = QComboBox()
+        mode_combo.addItems(["Y-T", "X-Y"])
+        x_channel_combo = QComboBox()
+        x_channel_combo.addItems([f"X: CH{i + 1}" for i in range(len(channels))])
+        y_channel_combo = QComboBox()
+        y_channel_combo.addItems([f"Y: CH{i + 1}" for i in range(len(channels))])
+        y_channel_combo.setCurrentIndex(1)
+        mode_row.addWidget(mode_combo)
+        mode_row.addWidget(x_channel_combo)
+        mode_row.addWidget(y_channel_combo)
+        mode_layout.addWidget(mode_label)
+        mode_layout.addLayout(mode_row)
         
         # Add run/stop button for professional look
         run_button = QPushButton("Run/Stop")
@@ -2431,10 +4283,9 @@ class SmartLab(QMainWindow):
         """)
         
         # Add all controls to layout
-        control_layout.addWidget(signal_group)
-        control_layout.addWidget(channel_group)
         control_layout.addWidget(timescale_group)
         control_layout.addWidget(trigger_group)
+        control_layout.addWidget(mode_group)
         control_layout.addStretch(1)
         control_layout.addWidget(measurement_label)
         control_layout.addWidget(run_button)
@@ -2442,9 +4293,10 @@ class SmartLab(QMainWindow):
         layout.addWidget(control_panel)
         
         # Create plot canvas with professional styling
-        canvas = AnimatedMatplotlibCanvas(dialog, width=6, height=4, dpi=100)
-        canvas.fig.patch.set_facecolor('#F6F6F6')
-        canvas.axes.set_facecolor('#FFFFFF')
+        canvas = create_live_canvas(dialog, self.native_live_plots, width=6, height=4, dpi=100)
+        if not isinstance(canvas, WaveformView):
+            canvas.fig.patch.set_facecolor('#F6F6F6')
+            canvas.axes.set_facecolor('#FFFFFF')
         canvas.setup_plot("Oscilloscope", "Time (s)", "Amplitude")
         
         # Add canvas toolbar with professional styling
@@ -2456,147 +4308,146 @@ class SmartLab(QMainWindow):
         # Add the canvas as the main element
         layout.addWidget(canvas, stretch=1)
         
+        # Raw channel data stacked into one (channels, samples) array, rebuilt
+        # only when a channel's source or quantity changes
+        acquisition = {'stack': None, 'rows': [], 'units': []}
+        
+        def acquire_channels():
+            rows, units, samples = [], [], []
+            for index, channel in enumerate(channels):
+                comp_id = channel['source'].currentData()
+                quantity = channel['quantity'].currentText().lower()
+                data = voltage_data if quantity == "voltage" else current_data
+                if channel['enable'].isChecked() and comp_id in data:
+                    rows.append(index)
+                    units.append("V" if quantity == "voltage" else "A")
+                    samples.append(np.asarray(data[comp_id], dtype=float))
+            acquisition['rows'] = rows
+            acquisition['units'] = units
+            acquisition['stack'] = np.vstack(samples) if samples else None
+        
+        def channel_label(index):
+            channel = channels[index]
+            comp_id = channel['source'].currentData()
+            comp_type = self.canvas.simulator.components[comp_id]['type']
+            return f"CH{index + 1} {channel['quantity'].currentText()} - {comp_type}"
+        
         # Setup animation function to update plot with improved visuals
         def update_oscilloscope(frame):
             # Only update if running
             if not run_button.isChecked():
-                return canvas.axes
-                
-            canvas.axes.clear()
-            canvas.axes.set_facecolor('#FFFFFF')
-            canvas.axes.grid(True, linestyle='--', alpha=0.7, color='#CCCCCC')
+                return
             
-            # Get selected signal
-            if signal_combo.count() > 0:
-                comp_id = signal_combo.currentData()
-                signal_type = channel_combo.currentText().lower()
-                
-                # Get data based on signal type
-                if signal_type == "voltage" and comp_id in voltage_data:
-                    signal_data = voltage_data[comp_id]
-                    label = f"Voltage - {self.canvas.simulator.components[comp_id]['type']}"
-                    color = '#1E5128'  # Green color theme
-                    unit = "V"
-                elif signal_type == "current" and comp_id in current_data:
-                    signal_data = current_data[comp_id]
-                    label = f"Current - {self.canvas.simulator.components[comp_id]['type']}"
-                    color = '#D62828'  # Red color theme
-                    unit = "A"
-                else:
-                    # No data, show empty plot with grid
-                    canvas.axes.text(0.5, 0.5, "No data available for selected channel", 
-                                    ha='center', va='center', 
-                                    transform=canvas.axes.transAxes,
-                                    fontsize=12, color='gray')
-                    canvas.axes.set_xlabel("Time (s)")
-                    canvas.axes.set_ylabel("Amplitude")
-                    return canvas.axes
-                
-                # Apply time scaling for professional visualization
-                scale_factor = timescale_slider.value() / 50.0  # 1.0 at middle
-                time_slice = min(len(time_points), max(10, int(len(time_points) / scale_factor)))
-                
-                # Plot the data with better styling
-                canvas.axes.plot(
-                    time_points[:time_slice], 
-                    signal_data[:time_slice], 
-                    color=color, 
-                    label=label,
-                    linewidth=1.5
+            stack = acquisition['stack']
+            rows = acquisition['rows']
+            if stack is None:
+                # No data, show empty plot with grid
+                canvas.setup_plot("Oscilloscope", "Time (s)", "Amplitude")
+                canvas.draw_traces([], message="No data available for selected channels")
+                return
+            
+            # Shared time base: one slice for every channel
+            scale_factor = timescale_slider.value() / 50.0  # 1.0 at middle
+            time_slice = min(len(time_points), max(10, int(len(time_points) / scale_factor)))
+            
+            # Per-channel gain and offset as one broadcast transform
+            gains = np.array([channels[i]['gain'].value() for i in rows])
+            offsets = np.array([channels[i]['offset'].value() for i in rows])
+            window = stack[:, :time_slice] * gains[:, None] + offsets[:, None]
+            plot_times = time_points[:time_slice]
+            
+            # Per-channel peaks in one pass
+            peak_idx = np.argmax(np.abs(window), axis=1)
+            peaks = window[np.arange(len(rows)), peak_idx]
+            readings = [f"CH{i + 1} {abs(p):.3f} V" if u == "V" else f"CH{i + 1} {abs(p) * 1000:.1f} mA"
+                        for i, p, u in zip(rows, peaks, acquisition['units'])]
+            measurement_label.setText("\n".join(
+                "  ".join(readings[i:i + 2]) for i in range(0, len(readings), 2)
+            ))
+            
+            if mode_combo.currentText() == "X-Y":
+                x_row = x_channel_combo.currentIndex()
+                y_row = y_channel_combo.currentIndex()
+                if x_row not in rows or y_row not in rows:
+                    canvas.setup_plot("Oscilloscope X-Y", "X", "Y")
+                    canvas.draw_traces([], message="Enable both X and Y channels")
+                    return
+                xs = window[rows.index(x_row)]
+                ys = window[rows.index(y_row)]
+                # Lissajous figures need no time decimation, just bounded point counts
+                stride = max(1, len(xs) // 4000)
+                canvas.setup_plot("Oscilloscope X-Y", channel_label(x_row), channel_label(y_row))
+                canvas.draw_traces(
+                    [(f"CH{y_row + 1} vs CH{x_row + 1}", xs[::stride], ys[::stride], channels[y_row]['color'])],
+                    xy=True
                 )
-                
-                # Add trigger line if triggered with professional look
-                if trigger_button.isChecked():
-                    # Find trigger point (where signal crosses mean)
-                    mean_value = np.mean(signal_data[:time_slice])
-                    trigger_points = []
-                    for i in range(1, time_slice):
-                        if (signal_data[i-1] < mean_value and signal_data[i] >= mean_value):
-                            trigger_points.append(i)
-                    
-                    if trigger_points:
-                        # Use first trigger point and show with better styling
-                        trigger_idx = trigger_points[0]
-                        canvas.axes.axvline(
-                            x=time_points[trigger_idx], 
-                            color='#D62828', 
-                            linestyle='--', 
-                            alpha=0.8,
-                            linewidth=1.5
-                        )
-                        # Add trigger marker text
-                        canvas.axes.text(
-                            time_points[trigger_idx], 
-                            canvas.axes.get_ylim()[1] * 0.95,
-                            "T",
-                            color='#D62828',
-                            fontweight='bold',
-                            ha='center'
-                        )
-                
-                # Improve axis labels and title for professional look
-                if signal_type == "voltage":
-                    canvas.axes.set_ylabel(f"Voltage ({unit})", fontweight='bold', color='#333333')
-                else:
-                    canvas.axes.set_ylabel(f"Current ({unit})", fontweight='bold', color='#333333')
-                
-                canvas.axes.set_xlabel("Time (s)", fontweight='bold', color='#333333')
-                
-                # Add measurement markers for professional oscilloscope feel
-                # Find peak value
-                if len(signal_data[:time_slice]) > 0:
-                    peak_value = np.max(np.abs(signal_data[:time_slice]))
-                    peak_idx = np.argmax(np.abs(signal_data[:time_slice]))
-                    
-                    # Mark peak
-                    canvas.axes.plot(
-                        time_points[peak_idx], 
-                        signal_data[peak_idx], 
-                        'o', 
-                        color='#D62828', 
-                        markersize=6
-                    )
-                    
-                    # Update measurement label
-                    if signal_type == "voltage":
-                        measurement_label.setText(f"{peak_value:.3f} V")
-                    else:
-                        measurement_label.setText(f"{peak_value*1000:.1f} mA")
-                    
-                    # Add measurement text on graph
-                    canvas.axes.text(
-                        time_points[peak_idx], 
-                        signal_data[peak_idx],
-                        f"  {signal_data[peak_idx]:.3f} {unit}",
-                        va='center',
-                        color='#D62828'
-                    )
-                
-                # Add professional markers for Y-axis scale
-                max_val = np.max(signal_data[:time_slice])
-                min_val = np.min(signal_data[:time_slice])
-                
-                # Add grid and legend with better styling
-                canvas.axes.legend(loc='upper right', framealpha=0.7)
-                
-                # Fix axes limits for stable display
-                if len(time_points) > 0:
-                    canvas.axes.set_xlim(time_points[0], time_points[time_slice-1])
-                    canvas.axes.set_ylim(min_val * 1.1 if min_val < 0 else min_val * 0.9, max_val * 1.1)
+                return
             
-            return canvas.axes
+            markers = []
+            
+            # One trigger search on the selected trigger channel
+            trigger_row = trigger_source_combo.currentIndex()
+            if trigger_button.isChecked() and trigger_row in rows:
+                signal = window[rows.index(trigger_row)]
+                # Find trigger point (where signal crosses mean)
+                mean_value = signal.mean()
+                crossings = np.flatnonzero((signal[:-1] < mean_value) & (signal[1:] >= mean_value))
+                if len(crossings):
+                    markers.append((plot_times[crossings[0] + 1], None, "T", '#D62828'))
+            
+            # Add measurement markers for professional oscilloscope feel
+            for row, (index, idx) in enumerate(zip(rows, peak_idx)):
+                unit = acquisition['units'][row]
+                markers.append((plot_times[idx], window[row, idx],
+                                f"{window[row, idx]:.3f} {unit}", channels[index]['color']))
+            
+            # One decimation pass for all channels
+            buckets = max(canvas.width(), 100)
+            dec_times, dec_window = decimate_minmax_stack(plot_times, window, buckets)
+            traces = [(channel_label(index), dec_times, dec_window[row], channels[index]['color'])
+                      for row, index in enumerate(rows)]
+            
+            # Fix axes limits for stable display
+            max_val = window.max()
+            min_val = window.min()
+            ylim = (min_val * 1.1 if min_val < 0 else min_val * 0.9, max_val * 1.1)
+            if ylim[1] <= ylim[0]:
+                ylim = None
+            
+            units = set(acquisition['units'])
+            if units == {"V"}:
+                ylabel = "Voltage (V)"
+            elif units == {"A"}:
+                ylabel = "Current (A)"
+            else:
+                ylabel = "Amplitude"
+            canvas.setup_plot("Oscilloscope", "Time (s)", ylabel)
+            canvas.draw_traces(traces, markers,
+                               xlim=(plot_times[0], plot_times[-1]), ylim=ylim)
         
         # Connect control changes to update the plot
         def update_view():
             # Force animation update
-            if hasattr(canvas, 'animations') and canvas.animations:
-                canvas.animations[0].event_source.start()
-        
-        signal_combo.currentIndexChanged.connect(update_view)
-        channel_combo.currentIndexChanged.connect(update_view)
+            canvas.refresh()
+        
+        def update_channels():
+            acquire_channels()
+            update_view()
+        
+        for channel in channels:
+            channel['enable'].toggled.connect(update_channels)
+            channel['source'].currentIndexChanged.connect(update_channels)
+            channel['quantity'].currentIndexChanged.connect(update_channels)
+            channel['gain'].valueChanged.connect(update_view)
+            channel['offset'].valueChanged.connect(update_view)
         timescale_slider.valueChanged.connect(update_view)
         trigger_button.toggled.connect(update_view)
+        trigger_source_combo.currentIndexChanged.connect(update_view)
+        mode_combo.currentIndexChanged.connect(update_view)
+        x_channel_combo.currentIndexChanged.connect(update_view)
+        y_channel_combo.currentIndexChanged.connect(update_view)
         run_button.toggled.connect(update_view)
+        acquire_channels()
         
         # Add professional close button
         close_button = QPushButton("Close")
@@ -2621,6 +4472,7 @@ class SmartLab(QMainWindow):
         
         # Show dialog
         dialog.exec()
+        canvas.clear_animations()
 
     def show_spectrum_analyzer(self):
         """Show spectrum analyzer for frequency domain analysis"""
@@ -2700,7 +4552,7 @@ class SmartLab(QMainWindow):
         window_layout.setContentsMargins(0, 0, 0, 0)
         window_label = QLabel("Window Function:")
         window_combo = QComboBox()
-        window_combo.addItems(["Rectangular", "Hamming", "Hann", "Blackman", "Flat Top"])
+        window_combo.addItems(WINDOW_TYPES)
         window_layout.addWidget(window_label)
         window_layout.addWidget(window_combo)
         
@@ -2741,6 +4593,7 @@ class SmartLab(QMainWindow):
         layout.addWidget(control_panel)
         
         # Create professional canvas
+        from matplotlib_canvas import AnimatedMatplotlibCanvas
         canvas = AnimatedMatplotlibCanvas(dialog, width=6, height=4, dpi=100)
         canvas.fig.patch.set_facecolor('#F6F6F6')
         canvas.axes.set_facecolor('#FFFFFF')
@@ -2750,52 +4603,52 @@ class SmartLab(QMainWindow):
         toolbar_layout = QHBoxLayout()
         toolbar_layout.addWidget(canvas.toolbar)
         toolbar_layout.addStretch(1)
+        
+        # THD / SNR / SINAD readout next to the toolbar
+        distortion_label = QLabel("THD --  SNR --  SINAD --")
+        distortion_label.setStyleSheet("""
+            font-family: 'Courier New';
+            font-size: 13px;
+            font-weight: bold;
+            color: #333333;
+            padding: 4px;
+        """)
+        toolbar_layout.addWidget(distortion_label)
         layout.addLayout(toolbar_layout)
         
         # Add the canvas as the main element
         layout.addWidget(canvas, stretch=1)
         
-        # Setup professional FFT calculation and plotting function
-        def calculate_fft(signal, sample_rate, window_type):
-            n = len(signal)
-            
-            # Apply window function with professional options
-            if window_type == "Hamming":
-                window = np.hamming(n)
-            elif window_type == "Hann":
-                window = np.hanning(n)
-            elif window_type == "Blackman":
-                window = np.blackman(n)
-            elif window_type == "Flat Top":
-                # Better for amplitude accuracy
-                window = np.array([0.21557895, 0.41663158, 0.277263158, 0.083578947, 0.006947368])
-                window = np.resize(window, n)  # Extend to full signal length
-            else:  # Rectangular
-                window = np.ones(n)
-                
-            # Apply window and calculate FFT with zero padding for better frequency resolution
-            windowed_signal = signal * window
-            fft_result = np.fft.rfft(windowed_signal, n=n*2)  # 2x zero padding
-            
-            # Calculate magnitude in dB with improved scaling
-            magnitude = 20 * np.log10(np.abs(fft_result) + 1e-10)  # Add small value to avoid log(0)
-            
-            # Calculate frequency bins with proper scaling
-            freq_bins = np.fft.rfftfreq(n*2, d=1/sample_rate)
-            
-            return freq_bins, magnitude
+        # FFT and measurements are cached per (component, signal type, window);
+        # the simulation data does not change while the dialog is open
+        spectrum_cache = {}
+        drawn_view = [None]
+        
+        def spectrum_for(comp_id, signal_type, window_type, signal_data):
+            key = (comp_id, signal_type, window_type)
+            if key not in spectrum_cache:
+                sample_rate = sample_rate_of(time_points)
+                freq, magnitude = calculate_fft(signal_data, sample_rate, window_type)
+                spectrum_cache[key] = (freq, magnitude, sample_rate,
+                                       analyze_spectrum(freq, magnitude, window_type))
+            return spectrum_cache[key]
         
         # Animation update function with professional spectrum display
         def update_spectrum(frame):
+            view = (signal_combo.currentData(), type_combo.currentText().lower(),
+                    window_combo.currentText(), freq_slider.value())
+            if view == drawn_view[0]:
+                # Nothing changed since the last frame; keep the drawn axes
+                return canvas.axes
+            drawn_view[0] = view
+            
             canvas.axes.clear()
             canvas.axes.set_facecolor('#FFFFFF')
             canvas.axes.grid(True, linestyle='--', alpha=0.7, color='#CCCCCC')
             
             # Get selected signal
             if signal_combo.count() > 0:
-                comp_id = signal_combo.currentData()
-                signal_type = type_combo.currentText().lower()
-                window_type = window_combo.currentText()
+                comp_id, signal_type, window_type, _ = view
                 
                 # Get data based on signal type
                 if signal_type == "voltage" and comp_id in voltage_data:
@@ -2816,14 +4669,8 @@ class SmartLab(QMainWindow):
                     canvas.axes.set_ylabel("Magnitude (dB)")
                     return canvas.axes
                 
-                # Calculate sample rate from time points
-                if len(time_points) > 1:
-                    sample_rate = 1 / (time_points[1] - time_points[0])
-                else:
-                    sample_rate = 1000  # Default if we can't determine
-                    
-                # Calculate FFT
-                freq, magnitude = calculate_fft(signal_data, sample_rate, window_type)
+                freq, magnitude, sample_rate, analysis = spectrum_for(
+                    comp_id, signal_type, window_type, signal_data)
                 
                 # Apply frequency range adjustment based on slider
                 max_freq = min(sample_rate/2, 1000)  # Nyquist limit or 1kHz max
@@ -2854,76 +4701,54 @@ class SmartLab(QMainWindow):
                 # Add grid and legend with professional styling
                 canvas.axes.legend(loc='upper right', framealpha=0.7)
                 
-                # Add professional annotation with dominant frequencies
-                if len(plot_freq) > 1:
-                    # Find peaks in the spectrum using a more professional algorithm
-                    if len(plot_magnitude) > 10:  # Need enough points for peak detection
-                        # Use higher percentile for cleaner peak detection
-                        threshold = np.percentile(plot_magnitude, 95)
-                        peak_indices = np.where(plot_magnitude > threshold)[0]
-                        
-                        # Filter peaks to avoid duplicates (at least 5 indices apart)
-                        filtered_peaks = []
-                        for idx in peak_indices:
-                            if not filtered_peaks or all(abs(idx - p) > 5 for p in filtered_peaks):
-                                filtered_peaks.append(idx)
-                        
-                        if filtered_peaks:
-                            # Sort by magnitude
-                            filtered_peaks.sort(key=lambda i: plot_magnitude[i], reverse=True)
-                            
-                            # Take top 3 peaks max for clarity
-                            display_peaks = filtered_peaks[:min(3, len(filtered_peaks))]
-                            
-                            # Show peak markers and annotations
-                            for i, peak_idx in enumerate(display_peaks):
-                                peak_freq = plot_freq[peak_idx]
-                                peak_mag = plot_magnitude[peak_idx]
-                                
-                                # Plot peak marker
-                                canvas.axes.plot(
-                                    peak_freq, 
-                                    peak_mag, 
-                                    'o', 
-                                    color='#D62828' if i == 0 else '#4E9F3D', 
-                                    markersize=6
-                                )
-                                
-                                # Add measurement text
-                                canvas.axes.axvline(
-                                    x=peak_freq, 
-                                    color='#D62828' if i == 0 else '#4E9F3D', 
-                                    linestyle='--', 
-                                    alpha=0.6,
-                                    linewidth=1
-                                )
-                                
-                                # Add frequency label
-                                canvas.axes.text(
-                                    peak_freq, 
-                                    peak_mag + 2,
-                                    f"{peak_freq:.1f} Hz",
-                                    ha='center',
-                                    va='bottom',
-                                    rotation=90,
-                                    color='#D62828' if i == 0 else '#4E9F3D',
-                                    fontsize=8
-                                )
-                            
-                            # Update frequency label for dominant (first) peak
-                            if len(display_peaks) > 0:
-                                dominant_freq = plot_freq[display_peaks[0]]
-                                freq_value_label.setText(f"{dominant_freq:.2f} Hz")
-                            else:
-                                freq_value_label.setText("N/A")
+                # Annotate the three strongest peaks inside the visible range
+                in_range = analysis['peak_freq'] <= plot_max_freq
+                display_freq = analysis['peak_freq'][in_range][:3]
+                display_mag = analysis['peak_mag'][in_range][:3]
+                for i, (peak_freq, peak_mag) in enumerate(zip(display_freq, display_mag)):
+                    peak_color = '#D62828' if i == 0 else '#4E9F3D'
+                    canvas.axes.plot(peak_freq, peak_mag, 'o', color=peak_color, markersize=6)
+                    canvas.axes.axvline(
+                        x=peak_freq, 
+                        color=peak_color, 
+                        linestyle='--', 
+                        alpha=0.6,
+                        linewidth=1
+                    )
+                    canvas.axes.text(
+                        peak_freq, 
+                        peak_mag + 2,
+                        f"{peak_freq:.1f} Hz",
+                        ha='center',
+                        va='bottom',
+                        rotation=90,
+                        color=peak_color,
+                        fontsize=8
+                    )
+                
+                # Dominant frequency readout: the fundamental, or DC for a signal without one
+                if analysis['fundamental'] is not None:
+                    freq_value_label.setText(f"{analysis['fundamental'][0]:.2f} Hz")
+                elif len(display_freq) > 0:
+                    freq_value_label.setText(f"{display_freq[0]:.2f} Hz")
+                else:
+                    freq_value_label.setText("N/A")
+                
+                # Distortion and noise figures relative to the fundamental
+                if analysis['fundamental'] is None:
+                    distortion_label.setText("THD --  SNR --  SINAD --")
+                else:
+                    thd = "--" if analysis['thd'] is None else f"{analysis['thd'] * 100:.2f}%"
+                    distortion_label.setText(
+                        f"THD {thd}  SNR {analysis['snr']:.1f} dB  SINAD {analysis['sinad']:.1f} dB"
+                    )
                             
             return canvas.axes
         
         # Connect control changes to update the plot
         def update_view():
             # Force animation update
-            if hasattr(canvas, 'animations') and canvas.animations:
-                canvas.animations[0].event_source.start()
+            canvas.refresh()
         
         signal_combo.currentIndexChanged.connect(update_view)
         type_combo.currentIndexChanged.connect(update_view)
@@ -2962,6 +4787,9 @@ class ComponentMimeData(QMimeData):
 
 class Probe(QGraphicsItem):
     """Measurement probe for circuit simulation"""
+    SIMPLE_LOD = 0.4  # Below this scale draw the body only, without any text
+    HINT_LOD = 0.75   # The 6 pt hint becomes unreadable below this scale
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFlag(QGraphicsItem.ItemIsMovable)
@@ -2981,10 +4809,18 @@ class Probe(QGraphicsItem):
         self.connection_line = None  # Line showing connection
         
     def boundingRect(self):
-        return QRectF(-15, -15, 30, 30)  # Slightly larger bounding box
+        # Covers the hint above and the value and component labels below the body
+        return QRectF(-26, -21, 52, 54)
+    
+    def shape(self):
+        path = QPainterPath()
+        path.addRect(QRectF(-15, -15, 30, 30))  # Slightly larger bounding box
+        return path
     
+    @TRACE.traced("paint probe", "paint")
     def paint(self, painter, option, widget):
-        painter.setRenderHint(QPainter.Antialiasing)
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        painter.setRenderHint(QPainter.Antialiasing, lod >= self.SIMPLE_LOD)
         
         # Draw probe body
         if self.isSelected():
@@ -3007,19 +4843,22 @@ class Probe(QGraphicsItem):
         # Draw different shapes for voltage vs current probes with improved visibility
         if self.measurement_type == "voltage":
             painter.drawEllipse(QRectF(-8, -8, 16, 16))
-            painter.setPen(QPen(QColor(0, 0, 0), 1.5))
-            painter.drawText(QRectF(-5, -5, 10, 10), Qt.AlignCenter, "V")
         else:
             painter.drawRect(QRectF(-8, -8, 16, 16))
-            painter.setPen(QPen(QColor(0, 0, 0), 1.5))
-            painter.drawText(QRectF(-5, -5, 10, 10), Qt.AlignCenter, "I")
+        if lod < self.SIMPLE_LOD:
+            # The body alone is all that is legible this far out
+            return
+        painter.setPen(QPen(QColor(0, 0, 0), 1.5))
+        painter.drawText(QRectF(-5, -5, 10, 10), Qt.AlignCenter,
+                         "V" if self.measurement_type == "voltage" else "I")
             
         # Add small hint text
-        hint_font = painter.font()
-        hint_font.setPointSize(6)
-        painter.setFont(hint_font)
-        painter.setPen(QPen(QColor(80, 80, 80)))
-        painter.drawText(QRectF(-15, -20, 30, 10), Qt.AlignCenter, "Right-click to switch")
+        if lod >= self.HINT_LOD:
+            hint_font = painter.font()
+            hint_font.setPointSize(6)
+            painter.setFont(hint_font)
+            painter.setPen(QPen(QColor(80, 80, 80)))
+            painter.drawText(QRectF(-15, -20, 30, 10), Qt.AlignCenter, "Right-click to switch")
             
         # Show measurement value with enhanced visibility
         if hasattr(self, 'value') and self.value is not None:
@@ -3068,55 +4907,47 @@ class Probe(QGraphicsItem):
         """Toggle between voltage and current measurement"""
         self.measurement_type = "current" if self.measurement_type == "voltage" else "voltage"
         self.update()
+        self._journal(self.scene())
+    
+    def _journal(self, scene):
+        """Tell the canvas's autosave journal this probe changed"""
+        journal = getattr(scene, 'journal', None)
+        if journal is not None:
+            journal([self])
     
     def itemChange(self, change, value):
         if change == QGraphicsItem.ItemPositionChange:
             # When moving, update the connection line if we have one
-            if self.connection_line and self.scene():
+            scene = self.scene() if self.connection_line else None
+            if scene is not None:
                 # Moving probe: get the new position and update connection line
-                scene = self.scene()
                 if self.connection_line in scene.items():
                     scene.removeItem(self.connection_line)
                 self.connection_line = None
                 
         elif change == QGraphicsItem.ItemPositionHasChanged:
             # After moving, check for nearby components to connect to
-            if self.scene():
+            scene = self.scene()
+            if scene is not None:
                 self.findNearbyComponent()
+                self._journal(scene)
                 
         return super().itemChange(change, value)
         
     def findNearbyComponent(self):
         """Find nearby component to connect to"""
-        if not self.scene():
+        scene = self.scene()
+        if scene is None:
             return
             
-        scene = self.scene()
         nearest_component = None
-        min_dist = float('inf')
         connection_point = None
         
-        # Check components first
-        for item in scene.items():
-            if isinstance(item, ComponentItem):
-                # Check each pin on the component
-                for pin_idx, pin in enumerate(item.pin_points):
-                    # Get rotation-adjusted pin position
-                    angle_rad = item.rotation() * math.pi / 180
-                    rotated_pin = QPointF(
-                        pin.x() * math.cos(angle_rad) - pin.y() * math.sin(angle_rad),
-                        pin.x() * math.sin(angle_rad) + pin.y() * math.cos(angle_rad)
-                    )
-                    pin_pos = item.pos() + rotated_pin
-                    
-                    # Calculate distance to this pin
-                    dist = ((pin_pos.x() - self.pos().x())**2 + 
-                            (pin_pos.y() - self.pos().y())**2)**0.5
-                    
-                    if dist < min_dist and dist < 30:  # Snap distance
-                        min_dist = dist
-                        nearest_component = item
-                        connection_point = pin_pos
+        # Closest component pin within snap distance
+        index = getattr(scene, 'pin_index', None)
+        hit = index.nearest_pin(self.pos(), 30) if index is not None else None
+        if hit:
+            nearest_component, _, connection_point = hit
                         
         # If we found a component to connect to
         if nearest_component and connection_point:
@@ -3304,6 +5135,7 @@ class EnhancedCircuitSimulator(CircuitSimulator):
         """Set the simulation speed multiplier"""
         self.simulation_speed = speed
         
+    @TRACE.traced("simulate", "simulation")
     def simulate(self, duration=1.0, step=0.001):
         """Run simulation and store the results for later use"""
         # Run the parent class simulation
@@ -3329,27 +5161,29 @@ class EnhancedCircuitSimulator(CircuitSimulator):
                 if time_idx >= len(self.time_points):
                     break
                 
-                # Update probe values
-                for probe in self.probes:
-                    component_id = probe['location']
-                    if probe['type'] == 'voltage' and component_id in self.voltage_data:
-                        value = self.voltage_data[component_id][time_idx]
-                        probe['values'].append((self.current_time, value))
-                    elif probe['type'] == 'current' and component_id in self.current_data:
-                        value = self.current_data[component_id][time_idx]
-                        probe['values'].append((self.current_time, value))
+                with TRACE.span("simulation step", "simulation"):
+                    # Update probe values
+                    for probe in self.probes:
+                        component_id = probe['location']
+                        if probe['type'] == 'voltage' and component_id in self.voltage_data:
+                            value = self.voltage_data[component_id][time_idx]
+                            probe['values'].append((self.current_time, value))
+                        elif probe['type'] == 'current' and component_id in self.current_data:
+                            value = self.current_data[component_id][time_idx]
+                            probe['values'].append((self.current_time, value))
+                            
+                    # Notify callbacks of update
+                    for callback in self.callbacks:
+                        with TRACE.span("simulation callback", "simulation"):
+                            callback(
+                                time=self.current_time,
+                                time_points=self.time_points[:time_idx+1],
+                                voltage_data={k: v[:time_idx+1] for k, v in self.voltage_data.items()},
+                                current_data={k: v[:time_idx+1] for k, v in self.current_data.items()}
+                            )
                         
-                # Notify callbacks of update
-                for callback in self.callbacks:
-                    callback(
-                        time=self.current_time,
-                        time_points=self.time_points[:time_idx+1],
-                        voltage_data={k: v[:time_idx+1] for k, v in self.voltage_data.items()},
-                        current_data={k: v[:time_idx+1] for k, v in self.current_data.items()}
-                    )
-                    
-                # Increment time based on speed
-                self.current_time += self.time_step * self.simulation_speed
+                    # Increment time based on speed
+                    self.current_time += self.time_step * self.simulation_speed
                 
                 # Sleep to control update rate
                 time.sleep(0.02)  # ~50 fps max update rate
@@ -3367,52 +5201,640 @@ class EnhancedCircuitSimulator(CircuitSimulator):
             self.is_running = False
             
         except Exception as e:
-            print(f"Simulation error: {str(e)}")
+            TRACE.message(f"Simulation error: {str(e)}", ERROR)
             self.is_running = False
 
-# Fix the animation warning by adding save_count parameter in AnimatedMatplotlibCanvas class
-class AnimatedMatplotlibCanvas(MatplotlibCanvas):
-    """Enhanced matplotlib canvas with animation support"""
-    def __init__(self, parent=None, width=5, height=4, dpi=100):
-        super().__init__(parent, width, height, dpi)
+# Default trace colors shared by the native and matplotlib live views
+TRACE_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+                '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+class DecimationPyramid:
+    """Min/max pyramid over a sample array so any index range decimates in O(buckets)"""
+    BASE_BLOCK = 16
+
+    def __init__(self, samples):
+        self.levels = []  # (block size, block minima, block maxima)
+        samples = np.asarray(samples, dtype=float)
+        block = self.BASE_BLOCK
+        count = len(samples) // block
+        if count == 0:
+            return
+        blocks = samples[:count * block].reshape(count, block)
+        mins, maxs = blocks.min(axis=1), blocks.max(axis=1)
+        self.levels.append((block, mins, maxs))
+        while len(mins) >= 4:
+            even = len(mins) // 2 * 2
+            mins = np.minimum(mins[:even:2], mins[1:even:2])
+            maxs = np.maximum(maxs[:even:2], maxs[1:even:2])
+            block *= 2
+            self.levels.append((block, mins, maxs))
+
+    def level_for(self, block_size):
+        """Return the coarsest level whose blocks are not larger than block_size"""
+        chosen = None
+        for level in self.levels:
+            if level[0] > block_size:
+                break
+            chosen = level
+        return chosen
+
+def decimate_minmax(x, y, i0, i1, buckets, pyramid=None):
+    """Reduce y[i0:i1] to at most ~2 min/max points per bucket for polyline drawing"""
+    count = i1 - i0
+    if count <= 2 * buckets:
+        return x[i0:i1], y[i0:i1]
+
+    block = count // buckets
+    level = pyramid.level_for(block) if pyramid is not None else None
+    if level is None:
+        # Small ranges: one vectorized reduceat pass over the raw samples
+        starts = np.arange(i0, i1, block)
+        segment = y[i0:i1]
+        mins = np.minimum.reduceat(segment, starts - i0)
+        maxs = np.maximum.reduceat(segment, starts - i0)
+    else:
+        size, level_mins, level_maxs = level
+        j0 = -(-i0 // size)
+        j1 = min(i1 // size, len(level_mins))
+        starts = np.arange(j0, j1) * size
+        mins = level_mins[j0:j1]
+        maxs = level_maxs[j0:j1]
+        # Ragged edges that do not fill a whole pyramid block
+        head_end = min(j0 * size, i1)
+        if head_end > i0:
+            starts = np.concatenate(([i0], starts))
+            mins = np.concatenate(([y[i0:head_end].min()], mins))
+            maxs = np.concatenate(([y[i0:head_end].max()], maxs))
+        tail_start = max(j1 * size, head_end)
+        if i1 > tail_start:
+            starts = np.concatenate((starts, [tail_start]))
+            mins = np.concatenate((mins, [y[tail_start:i1].min()]))
+            maxs = np.concatenate((maxs, [y[tail_start:i1].max()]))
+
+    xs = np.repeat(x[starts], 2)
+    ys = np.empty(len(xs))
+    ys[0::2] = mins
+    ys[1::2] = maxs
+    return xs, ys
+
+def decimate_minmax_stack(x, stack, buckets):
+    """Decimate equally sampled channels (rows of stack) in one vectorized min/max pass"""
+    count = stack.shape[1]
+    if count <= 2 * buckets:
+        return x[:count], stack
+    block = count // buckets
+    usable = block * (count // block)
+    blocks = stack[:, :usable].reshape(stack.shape[0], -1, block)
+    mins = blocks.min(axis=2)
+    maxs = blocks.max(axis=2)
+    starts = np.arange(0, usable, block)
+    if usable < count:
+        # Remainder samples that do not fill a whole block
+        mins = np.hstack((mins, stack[:, usable:].min(axis=1, keepdims=True)))
+        maxs = np.hstack((maxs, stack[:, usable:].max(axis=1, keepdims=True)))
+        starts = np.append(starts, usable)
+    reduced = np.empty((stack.shape[0], 2 * len(starts)))
+    reduced[:, 0::2] = mins
+    reduced[:, 1::2] = maxs
+    return np.repeat(x[starts], 2), reduced
+
+def _nice_ticks(lo, hi, count=6):
+    """Round 1-2-5 tick positions covering [lo, hi]"""
+    span = hi - lo
+    if span <= 0 or not math.isfinite(span):
+        return [lo]
+    raw_step = span / count
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = magnitude * 10
+    for multiple in (1, 2, 5, 10):
+        if raw_step <= multiple * magnitude:
+            step = multiple * magnitude
+            break
+    first = math.ceil(lo / step) * step
+    return [v for v in np.arange(first, hi + step * 0.5, step) if lo - 1e-12 <= v <= hi + 1e-12]
+
+def _polyline_from_arrays(xs, ys):
+    """Build a QPolygonF from NumPy pixel coordinates via one QDataStream read"""
+    polyline = QPolygonF()
+    points = np.empty(len(xs), dtype=[('x', '>f8'), ('y', '>f8')])
+    points['x'] = xs
+    points['y'] = ys
+    stream = QDataStream(QByteArray(np.array([len(xs)], dtype='>u4').tobytes() + points.tobytes()))
+    stream >> polyline
+    return polyline
+
+class WaveformToolbar(QWidget):
+    """Small toolbar for WaveformView (autoscale, cursors, image export)"""
+    def __init__(self, view, parent=None):
+        super().__init__(parent)
+        self.view = view
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        autoscale_button = QPushButton("Autoscale")
+        autoscale_button.clicked.connect(view.reset_zoom)
+        cursors_button = QPushButton("Clear Cursors")
+        cursors_button.clicked.connect(view.clear_cursors)
+        save_button = QPushButton("Save Image")
+        save_button.clicked.connect(self.save_image)
+
+        layout.addWidget(autoscale_button)
+        layout.addWidget(cursors_button)
+        layout.addWidget(save_button)
+        layout.addStretch(1)
+
+    def save_image(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Plot Image", "waveform.png",
+                                              "Images (*.png *.jpg *.bmp)")
+        if path:
+            self.view.grab().save(path)
+
+class WaveformView(QWidget):
+    """Native QPainter trace view for live instrument plots.
+
+    Traces are decimated to min/max pairs per pixel column before drawing, so
+    the paint cost depends on the widget width rather than on the sample count.
+    Left-click places cursor A, right-click cursor B, the wheel zooms the time
+    axis and a double-click restores autoscaling.
+    """
+    MARGIN_LEFT = 76
+    MARGIN_RIGHT = 16
+    MARGIN_TOP = 28
+    MARGIN_BOTTOM = 40
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumSize(300, 200)
+        self.title = ""
+        self.xlabel = ""
+        self.ylabel = ""
+        self.traces = []
+        self.markers = []
+        self.xlim = None
+        self.ylim = None
+        self.zoom_xlim = None
+        self.xy = False
+        self.message = None
+        self.cursors = [None, None]
         self.animations = []
-        self.toolbar = NavigationToolbar2QT(self, parent)
-        
+        self.frame = 0
+        self.background_color = QColor('#FFFFFF')
+        self._pyramids = {}   # id of base array -> (weak reference, pyramid or None before its second paint)
+        self._decimated = {}  # id of trace array -> (key, decimated samples)
+        self.toolbar = WaveformToolbar(self, parent)
+
     def setup_plot(self, title, xlabel, ylabel):
-        """Setup the plot with appropriate labels and styling"""
-        self.axes.set_title(title)
-        self.axes.set_xlabel(xlabel)
-        self.axes.set_ylabel(ylabel)
-        self.axes.grid(True, linestyle='--', alpha=0.7)
-        self.fig.tight_layout()
-        
+        """Setup the plot labels"""
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.update()
+
+    def draw_traces(self, traces, markers=(), xlim=None, ylim=None, message=None, xy=False):
+        """Show one frame of (label, x, y, color) traces and (x, y, text, color) markers.
+
+        With xy=True the x values are not time-ordered (X-Y mode), so traces are
+        drawn as given instead of being range-sliced and decimated.
+        """
+        self.traces = [(label, np.asarray(x), np.asarray(y), color)
+                       for label, x, y, color in traces]
+        # Keep the caches to the arrays on show, so traces made afresh every frame do not pile up
+        shown = {id(y) for _, _, y, _ in self.traces}
+        bases = {id(self._pyramid_base(y)) for _, _, y, _ in self.traces}
+        self._decimated = {key: entry for key, entry in self._decimated.items() if key in shown}
+        self._pyramids = {key: entry for key, entry in self._pyramids.items() if key in bases}
+        self.xy = xy
+        self.markers = list(markers)
+        self.xlim = xlim
+        self.ylim = ylim
+        self.message = message
+        self.update()
+
     def start_animation(self, update_func, interval=50):
-        """Start a matplotlib animation"""
-        # Add save_count parameter to fix the warning
-        anim = FuncAnimation(self.fig, update_func, interval=interval, blit=False, 
-                             save_count=100)  # Limit frames cached to 100
-        self.animations.append(anim)
-        return anim
-        
+        """Call update_func(frame) from a Qt timer, like AnimatedMatplotlibCanvas"""
+        timer = QTimer(self)
+
+        def step():
+            update_func(self.frame)
+            self.frame += 1
+
+        timer.timeout.connect(step)
+        timer.start(interval)
+        self.animations.append((timer, update_func))
+        return timer
+
     def clear_animations(self):
-        """Clear all animations"""
-        for anim in self.animations:
-            anim.event_source.stop()
+        """Stop all animation timers"""
+        for timer, _ in self.animations:
+            timer.stop()
         self.animations.clear()
-        
+
+    def refresh(self):
+        """Produce a new frame immediately"""
+        for _, update_func in self.animations:
+            update_func(self.frame)
+
     def reset_plot(self):
         """Clear the plot and reset to initial state"""
         self.clear_animations()
-        self.axes.clear()
-        self.draw()
+        self.draw_traces([])
+
+    def reset_zoom(self):
+        self.zoom_xlim = None
+        self.update()
+
+    def clear_cursors(self):
+        self.cursors = [None, None]
+        self.update()
+
+    @staticmethod
+    def _pyramid_base(y):
+        """The array y is a prefix view of, or y itself"""
+        base = y.base
+        if (isinstance(base, np.ndarray) and base.ndim == 1
+                and base.__array_interface__['data'][0] == y.__array_interface__['data'][0]
+                and base.strides == y.strides):
+            return base
+        return y
+
+    def _pyramid_for(self, y):
+        """Return a cached pyramid usable for y (also for prefixes of a cached array).
+
+        The pyramid is built the second time an array is painted; one that
+        lives for a single frame is decimated directly instead.
+        """
+        base = self._pyramid_base(y)
+        if len(base) < 4 * DecimationPyramid.BASE_BLOCK:
+            return None
+        entry = self._pyramids.get(id(base))
+        if entry is None or entry[0]() is not base:
+            self._pyramids[id(base)] = (weakref.ref(base), None)
+            return None
+        if entry[1] is None:
+            entry = self._pyramids[id(base)] = (entry[0], DecimationPyramid(base))
+        return entry[1]
+
+    def _visible_samples(self, x, y, xlo, xhi, buckets):
+        """Decimated samples of one trace inside [xlo, xhi]"""
+        if len(x) == 0 or self.xy:
+            return x, y
+        i0 = max(int(np.searchsorted(x, xlo, side='left')) - 1, 0)
+        i1 = min(int(np.searchsorted(x, xhi, side='right')) + 1, len(x))
+        key = (id(y), y.__array_interface__['data'][0], len(y), i0, i1, buckets)
+        cached = self._decimated.get(id(y))
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        result = decimate_minmax(x, y, i0, i1, buckets, self._pyramid_for(y))
+        self._decimated[id(y)] = (key, result)
+        return result
+
+    def _plot_rect(self):
+        return QRectF(self.MARGIN_LEFT, self.MARGIN_TOP,
+                      max(self.width() - self.MARGIN_LEFT - self.MARGIN_RIGHT, 1),
+                      max(self.height() - self.MARGIN_TOP - self.MARGIN_BOTTOM, 1))
+
+    def _x_limits(self):
+        if self.zoom_xlim is not None:
+            return self.zoom_xlim
+        if self.xlim is not None:
+            return self.xlim
+        if self.xy:
+            starts = [np.nanmin(x) for _, x, _, _ in self.traces if len(x)]
+            ends = [np.nanmax(x) for _, x, _, _ in self.traces if len(x)]
+        else:
+            starts = [x[0] for _, x, _, _ in self.traces if len(x)]
+            ends = [x[-1] for _, x, _, _ in self.traces if len(x)]
+        if not starts:
+            return (0.0, 1.0)
+        return (float(min(starts)), float(max(ends)))
+
+    @TRACE.traced("paint plot", "plot")
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.background_color)
+        plot = self._plot_rect()
+
+        xlo, xhi = self._x_limits()
+        if xhi <= xlo:
+            xhi = xlo + 1.0
+        buckets = max(int(plot.width()), 1)
+
+        # Decimate every trace once, then derive the y range from the reduced data
+        reduced = []
+        for label, x, y, color in self.traces:
+            reduced.append(self._visible_samples(x, y, xlo, xhi, buckets))
+
+        if self.ylim is not None:
+            ylo, yhi = self.ylim
+        else:
+            finite = [(np.nanmin(ys), np.nanmax(ys)) for _, ys in reduced if len(ys)]
+            if finite:
+                ylo = min(lo for lo, _ in finite)
+                yhi = max(hi for _, hi in finite)
+                pad = (yhi - ylo) * 0.05 or max(abs(yhi) * 0.1, 1e-3)
+                ylo, yhi = ylo - pad, yhi + pad
+            else:
+                ylo, yhi = -1.0, 1.0
+        if yhi <= ylo:
+            yhi = ylo + 1.0
+
+        sx = plot.width() / (xhi - xlo)
+        sy = plot.height() / (yhi - ylo)
+
+        def to_px(xv):
+            return plot.left() + (xv - xlo) * sx
+
+        def to_py(yv):
+            return plot.bottom() - (yv - ylo) * sy
+
+        # Grid and ticks
+        grid_pen = QPen(QColor(220, 220, 220), 1, Qt.DashLine)
+        text_pen = QPen(QColor(60, 60, 60))
+        for xv in _nice_ticks(xlo, xhi):
+            px = to_px(xv)
+            painter.setPen(grid_pen)
+            painter.drawLine(QPointF(px, plot.top()), QPointF(px, plot.bottom()))
+            painter.setPen(text_pen)
+            painter.drawText(QRectF(px - 40, plot.bottom() + 2, 80, 14), Qt.AlignCenter, f"{xv:.4g}")
+        for yv in _nice_ticks(ylo, yhi):
+            py = to_py(yv)
+            painter.setPen(grid_pen)
+            painter.drawLine(QPointF(plot.left(), py), QPointF(plot.right(), py))
+            painter.setPen(text_pen)
+            painter.drawText(QRectF(0, py - 7, self.MARGIN_LEFT - 4, 14),
+                             Qt.AlignRight | Qt.AlignVCenter, f"{yv:.4g}")
+
+        painter.setPen(QPen(QColor(80, 80, 80), 1))
+        painter.setBrush(Qt.NoBrush)
+        painter.drawRect(plot)
+
+        # Labels
+        font = painter.font()
+        font.setBold(True)
+        painter.setFont(font)
+        painter.drawText(QRectF(0, 4, self.width(), 20), Qt.AlignCenter, self.title)
+        font.setBold(False)
+        painter.setFont(font)
+        painter.drawText(QRectF(0, self.height() - 20, self.width(), 18), Qt.AlignCenter, self.xlabel)
+        painter.save()
+        painter.translate(12, plot.center().y())
+        painter.rotate(-90)
+        painter.drawText(QRectF(-plot.height() / 2, -8, plot.height(), 16), Qt.AlignCenter, self.ylabel)
+        painter.restore()
+
+        # Traces
+        painter.save()
+        painter.setClipRect(plot)
+        for index, ((label, x, y, color), (xs, ys)) in enumerate(zip(self.traces, reduced)):
+            if len(xs) < 2:
+                continue
+            trace_color = QColor(color or TRACE_COLORS[index % len(TRACE_COLORS)])
+            # One-pixel cosmetic pens take Qt's fast aliased line path
+            pen = QPen(trace_color, 1)
+            pen.setCosmetic(True)
+            painter.setPen(pen)
+            painter.drawPolyline(_polyline_from_arrays(to_px(xs), to_py(ys)))
+
+        # Markers
+        painter.setRenderHint(QPainter.Antialiasing)
+        for x, y, text, color in self.markers:
+            marker_color = QColor(color or '#D62828')
+            px = to_px(x)
+            if y is None:
+                painter.setPen(QPen(marker_color, 1.5, Qt.DashLine))
+                painter.drawLine(QPointF(px, plot.top()), QPointF(px, plot.bottom()))
+                if text:
+                    painter.drawText(QRectF(px - 40, plot.top() + 2, 80, 14), Qt.AlignCenter, text)
+            else:
+                py = to_py(y)
+                painter.setPen(QPen(marker_color, 1.5))
+                painter.setBrush(QBrush(marker_color))
+                painter.drawEllipse(QPointF(px, py), 3.5, 3.5)
+                painter.setBrush(Qt.NoBrush)
+                if text:
+                    painter.drawText(QPointF(px + 6, py + 4), text)
+
+        # Cursors
+        for cursor, cursor_color in zip(self.cursors, (QColor('#E67E22'), QColor('#16A085'))):
+            if cursor is not None:
+                painter.setPen(QPen(cursor_color, 1))
+                px = to_px(cursor)
+                painter.drawLine(QPointF(px, plot.top()), QPointF(px, plot.bottom()))
+        painter.restore()
+
+        readout = []
+        for name, cursor in zip("AB", self.cursors):
+            if cursor is not None:
+                readout.append(f"{name}: {cursor:.4g}")
+        if None not in self.cursors:
+            delta = self.cursors[1] - self.cursors[0]
+            readout.append(f"Δ: {delta:.4g}")
+            if delta != 0:
+                readout.append(f"1/Δ: {1 / abs(delta):.4g}")
+        if readout:
+            painter.setPen(text_pen)
+            painter.drawText(QRectF(plot.left() + 6, plot.top() + 4, plot.width() - 12, 14),
+                             Qt.AlignLeft | Qt.AlignVCenter, "   ".join(readout))
+
+        # Legend
+        labels = [(label, color or TRACE_COLORS[i % len(TRACE_COLORS)])
+                  for i, (label, _, _, color) in enumerate(self.traces) if label]
+        if labels:
+            metrics = painter.fontMetrics()
+            width = max(metrics.horizontalAdvance(label) for label, _ in labels) + 34
+            height = 16 * len(labels) + 6
+            box = QRectF(plot.right() - width - 6, plot.top() + 22, width, height)
+            painter.setPen(QPen(QColor(200, 200, 200)))
+            painter.setBrush(QBrush(QColor(255, 255, 255, 200)))
+            painter.drawRect(box)
+            for row, (label, color) in enumerate(labels):
+                ty = box.top() + 11 + 16 * row
+                painter.setPen(QPen(QColor(color), 2))
+                painter.drawLine(QPointF(box.left() + 6, ty), QPointF(box.left() + 24, ty))
+                painter.setPen(text_pen)
+                painter.drawText(QPointF(box.left() + 28, ty + 4), label)
+
+        if not self.traces and self.message:
+            painter.setPen(QPen(QColor(128, 128, 128)))
+            painter.drawText(plot, Qt.AlignCenter, self.message)
+
+        painter.end()
+
+    def _x_at(self, pos):
+        plot = self._plot_rect()
+        xlo, xhi = self._x_limits()
+        return xlo + (pos.x() - plot.left()) / plot.width() * (xhi - xlo)
+
+    def mousePressEvent(self, event):
+        if not self._plot_rect().contains(event.position()):
+            return super().mousePressEvent(event)
+        x = self._x_at(event.position())
+        if event.button() == Qt.LeftButton:
+            self.cursors[0] = x
+        elif event.button() == Qt.RightButton:
+            self.cursors[1] = x
+        self.update()
+
+    def mouseDoubleClickEvent(self, event):
+        self.reset_zoom()
+        self.clear_cursors()
+
+    def wheelEvent(self, event):
+        # Zoom the time axis around the mouse position
+        xlo, xhi = self._x_limits()
+        center = self._x_at(event.position())
+        factor = 1 / 1.15 if event.angleDelta().y() > 0 else 1.15
+        self.zoom_xlim = (center - (center - xlo) * factor, center + (xhi - center) * factor)
+        self.update()
+
+class AnimationClock(QObject):
+    """Single frame timer shared by all live views of a dialog.
+
+    Each tick redraws only the registered views that are visible and have not
+    yet drawn the current simulation time; hidden views catch up through
+    catch_up() when they are shown. The clock pauses itself once the
+    simulation is no longer running and every visible view is current.
+    """
+    def __init__(self, time_source, running_source=None, interval=100, parent=None):
+        super().__init__(parent)
+        self.time_source = time_source
+        self.running_source = running_source
+        self.views = []  # [widget, update_func, last drawn time]
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.tick)
+        self.frame = 0
+
+    def add_view(self, widget, update_func):
+        """Register a live view and the function that draws its next frame"""
+        self.views.append([widget, update_func, None])
+
+    def start(self):
+        self.catch_up()
+        self.timer.start()
+
+    def pause(self):
+        self.timer.stop()
+
+    def is_active(self):
+        return self.timer.isActive()
+
+    def invalidate(self):
+        """Mark every view stale (e.g. after a reset) and redraw the visible ones"""
+        for view in self.views:
+            view[2] = None
+        self.catch_up()
+
+    def catch_up(self):
+        """Redraw visible views whose last frame is older than the simulation time"""
+        now = self.time_source()
+        drawn = 0
+        for view in self.views:
+            widget, update_func, last_time = view
+            if last_time == now or not widget.isVisible():
+                continue
+            with TRACE.span("plot update", "plot"):
+                update_func(self.frame)
+            view[2] = now
+            drawn += 1
+        return drawn
+
+    def tick(self):
+        self.catch_up()
+        self.frame += 1
+        if self.running_source is not None and not self.running_source():
+            # Simulation finished or stopped: nothing will change until restarted
+            self.pause()
+
+def create_live_canvas(parent=None, native=True, width=5, height=4, dpi=100):
+    """Create a live plot view: the native QPainter view or a matplotlib canvas"""
+    if native:
+        return WaveformView(parent)
+    from matplotlib_canvas import AnimatedMatplotlibCanvas
+    return AnimatedMatplotlibCanvas(parent, width, height, dpi)
+
+def run_report_export(argv):
+    """Command line report export: simulate circuit descriptions and render them headlessly"""
+    parser = argparse.ArgumentParser(
+        prog="smartlab --export-report",
+        description="Render voltage, current, power and spectrum plots plus an HTML "
+                    "summary for every circuit description, using all CPU cores."
+    )
+    parser.add_argument("out_dir", help="Output directory for the report")
+    parser.add_argument("circuits", nargs="+",
+                        help="JSON files with one circuit description or a list of them, "
+                             "or SPICE netlists (.cir)")
+    parser.add_argument("--format", default="png",
+                        help="Comma separated image formats, e.g. png,svg")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    for path in args.circuits:
+        if path.lower().endswith(NETLIST_EXTENSIONS):
+            simulator = EnhancedCircuitSimulator.from_netlist(path)
+            simulator.max_time, simulator.time_step = 0.1, 0.001
+            time_points, voltage_data, current_data = simulator.simulate(
+                simulator.max_time, simulator.time_step)
+            name = os.path.splitext(os.path.basename(path))[0]
+            jobs.append(report_job(name, simulator, time_points, voltage_data, current_data))
+            continue
+        with open(path, encoding="utf-8") as f:
+            specs = json.load(f)
+        if isinstance(specs, dict):
+            specs = [specs]
+        for index, spec in enumerate(specs):
+            name = spec.get('name') or f"{os.path.splitext(os.path.basename(path))[0]}_{index + 1}"
+            simulator = EnhancedCircuitSimulator.from_dict(spec)
+            simulator.max_time = spec.get('duration', 0.1)
+            simulator.time_step = spec.get('step', 0.001)
+            time_points, voltage_data, current_data = simulator.simulate(
+                simulator.max_time, simulator.time_step)
+            jobs.append(report_job(name, simulator, time_points, voltage_data, current_data))
+
+    formats = [fmt.strip() for fmt in args.format.split(",") if fmt.strip()]
+    index_path = export_reports(jobs, args.out_dir, formats, args.workers)
+    print(f"Exported {len(jobs)} circuit report(s) to {index_path}")
+    return 0
+
+def report_startup_profile(window):
+    """Print the --profile-startup breakdown once the event loop is idle, then quit"""
+    STARTUP.mark("first idle event loop")
+    text = STARTUP.report()
+    if sys.stdout is not None:
+        print(text)
+    else:
+        # Windowed frozen builds have no console to print to
+        path = os.path.join(QStandardPaths.writableLocation(QStandardPaths.TempLocation),
+                            "smartlab-startup-profile.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    # Closing, rather than quitting, removes the autosave files as a normal exit does
+    window.close()
+
+STARTUP.mark("run smartlab module body")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1 and sys.argv[1] == "--export-report":
+        sys.exit(run_report_export(sys.argv[2:]))
+    profile_startup = "--profile-startup" in sys.argv[1:]
+    if profile_startup:
+        sys.argv.remove("--profile-startup")
+    
     app = QApplication(sys.argv)
+    app.setApplicationName("SmartLab")  # Names the autosave folder
     
     # Set application style
     app.setStyle("Fusion")
+    STARTUP.mark("create QApplication")
     
     window = SmartLab()
+    STARTUP.mark("create toolbars and menus")
     window.show()
+    STARTUP.mark("show main window")
+    if profile_startup:
+        QTimer.singleShot(0, lambda: report_startup_profile(window))
     
     sys.exit(app.exec())
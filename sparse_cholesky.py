@@ -0,0 +1,170 @@
+"""Sparse symmetric positive definite systems, ordered and factored for reuse.
+
+A matrix is stamped as coordinates (COO): lists of rows and columns whose
+values add up where they repeat, as circuit stamps do. SymmetricPattern
+does the symbolic work for one set of coordinates once:
+
+    ordering     reverse Cuthill-McKee, so the nonzeros hug the diagonal
+    assembly     the lower triangle compressed by columns (CSC), with the
+                 slot every coordinate adds into
+    plan         blocks of columns and the envelope below them, which
+                 holds all the fill-in of the factorization
+
+factor(values) then only sums the values into their slots and runs the
+numeric Cholesky factorization block by block, with dense matrix products
+on fronts no wider than the band. Refactoring with new values, as a sweep
+or a time step does, reuses all of the symbolic work. The cost grows as
+size x bandwidth², so linearly in size while the ordered bandwidth stays
+bounded, as for a ladder or a strip, and as size^1.5 to size² for a square
+mesh rather than size³ for a dense solve.
+"""
+import numpy as np
+
+BLOCK = 64  # Fewest columns factored together; a wider band gets blocks as wide as itself
+
+
+def _last_level(start, starts, neighbours):
+    """The farthest nodes from start, and how many levels away they are"""
+    seen = {start}
+    level = [start]
+    depth = 0
+    while True:
+        following = []
+        for node in level:
+            for other in neighbours[starts[node]:starts[node + 1]]:
+                if other not in seen:
+                    seen.add(other)
+                    following.append(other)
+        if not following:
+            return level, depth
+        level = following
+        depth += 1
+
+
+def _peripheral(node, starts, neighbours, degree):
+    """A node at the far edge of node's component (George and Liu's pseudo-peripheral search)"""
+    eccentricity = -1
+    while True:
+        last, depth = _last_level(node, starts, neighbours)
+        if depth <= eccentricity:
+            return node
+        eccentricity = depth
+        node = min(last, key=degree.__getitem__)
+
+
+def reverse_cuthill_mckee(indptr, indices):
+    """Bandwidth-reducing order of a symmetric pattern: old index of each new position.
+
+    The pattern is given by rows (CSR) without its diagonal. Every
+    component is searched breadth first from a pseudo-peripheral node,
+    neighbours in increasing degree, and the whole order reversed.
+    """
+    n = len(indptr) - 1
+    degree = np.diff(indptr)
+    by_degree = np.lexsort((degree[indices], np.repeat(np.arange(n), degree)))
+    neighbours = indices[by_degree].tolist()
+    starts = indptr.tolist()
+    degree = degree.tolist()
+    placed = [False] * n
+    order = []
+    for seed in sorted(range(n), key=degree.__getitem__):
+        if placed[seed]:
+            continue
+        start = _peripheral(seed, starts, neighbours, degree)
+        placed[start] = True
+        queue = [start]
+        for node in queue:  # The queue grows while it is walked
+            for other in neighbours[starts[node]:starts[node + 1]]:
+                if not placed[other]:
+                    placed[other] = True
+                    queue.append(other)
+        order.extend(queue)
+    return np.array(order[::-1], dtype=np.intp)
+
+
+class SymmetricPattern:
+    """Symbolic analysis of a size x size symmetric matrix stamped at (rows, cols).
+
+    Every off-diagonal value must be stamped at both (r, c) and (c, r);
+    only the copy that falls in the lower triangle of the reordered matrix
+    is read.
+    """
+
+    def __init__(self, size, rows, cols):
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = np.asarray(cols, dtype=np.intp)
+        self.size = n = size
+        if n <= BLOCK:
+            self.order = np.arange(n)  # One block, factored densely whatever the order
+        else:
+            off = rows != cols
+            links = np.unique(np.concatenate([rows[off] * n + cols[off], cols[off] * n + rows[off]]))
+            linked, neighbours = np.divmod(links, n)
+            self.order = reverse_cuthill_mckee(np.searchsorted(linked, np.arange(n + 1)), neighbours)
+        position = np.empty(n, dtype=np.intp)
+        position[self.order] = np.arange(n)
+
+        i, j = position[rows], position[cols]
+        self.lower = i >= j
+        keys, self.slot = np.unique(j[self.lower] * n + i[self.lower], return_inverse=True)
+        columns, self.indices = np.divmod(keys, n)
+        self.indptr = np.searchsorted(columns, np.arange(n + 1))
+
+        # Eliminating a column spreads fill down to the last row any column up to it reaches
+        last = np.arange(n)
+        np.maximum.at(last, columns, self.indices)
+        reach = np.maximum.accumulate(last) + 1
+        self.blocks = []  # (start, stop, bottom, front offsets, first slot, end slot)
+        start = 0
+        while start < n:
+            stop = min(n, start + max(BLOCK, int(reach[start]) - start))
+            bottom = int(reach[stop - 1])
+            first, end = int(self.indptr[start]), int(self.indptr[stop])
+            offsets = (self.indices[first:end] - start) * (bottom - start) + columns[first:end] - start
+            self.blocks.append((start, stop, bottom, offsets, first, end))
+            start = stop
+
+    def factor(self, values):
+        """Numeric factorization for values stamped at the pattern's coordinates.
+
+        Raises numpy.linalg.LinAlgError if the matrix is not positive definite.
+        """
+        data = np.bincount(self.slot, weights=np.asarray(values, dtype=float)[self.lower],
+                           minlength=len(self.indices))
+        return Factorization(self, data)
+
+
+class Factorization:
+    """Cholesky factor L L^T of a pattern's matrix, kept as one pair of blocks per block of columns.
+
+    For each block, inverse is the inverse of its diagonal block of L and
+    below the rows of L under it, down to the bottom of the envelope.
+    """
+
+    def __init__(self, pattern, data):
+        self.order = pattern.order
+        self.blocks = []
+        trailing = np.zeros((0, 0))  # Schur complement carried into the next front
+        for start, stop, bottom, offsets, first, end in pattern.blocks:
+            width = bottom - start
+            front = np.zeros((width, width))
+            carried = len(trailing)
+            front[:carried, :carried] = trailing
+            front.reshape(-1)[offsets] += data[first:end]
+            columns = stop - start
+            inverse = np.linalg.inv(np.linalg.cholesky(front[:columns, :columns]))
+            below = front[columns:, :columns] @ inverse.T
+            trailing = front[columns:, columns:] - below @ below.T
+            self.blocks.append((start, stop, bottom, inverse, below))
+
+    def solve(self, rhs):
+        """x with A x = rhs; rhs may hold several right-hand sides as columns"""
+        x = np.array(rhs, dtype=float)[self.order]
+        for start, stop, bottom, inverse, below in self.blocks:
+            x[start:stop] = inverse @ x[start:stop]
+            x[stop:bottom] -= below @ x[start:stop]
+        for start, stop, bottom, inverse, below in reversed(self.blocks):
+            x[start:stop] = inverse.T @ (x[start:stop] - below.T @ x[stop:bottom])
+        solution = np.empty_like(x)
+        solution[self.order] = x
+        return solution
@@ -0,0 +1,177 @@
+"""Frequency-domain helpers shared by the spectrum analyzer and report export.
+
+This module only depends on NumPy so it can be used from worker processes
+that never load Qt.
+"""
+import numpy as np
+
+WINDOW_TYPES = ["Rectangular", "Hamming", "Hann", "Blackman", "Flat Top"]
+
+
+def calculate_fft(signal, sample_rate, window_type):
+    """Return (frequency bins, magnitude in dB) of a windowed, 2x zero-padded FFT"""
+    n = len(signal)
+    
+    # Apply window function with professional options
+    if window_type == "Hamming":
+        window = np.hamming(n)
+    elif window_type == "Hann":
+        window = np.hanning(n)
+    elif window_type == "Blackman":
+        window = np.blackman(n)
+    elif window_type == "Flat Top":
+        # Better for amplitude accuracy
+        window = np.array([0.21557895, 0.41663158, 0.277263158, 0.083578947, 0.006947368])
+        window = np.resize(window, n)  # Extend to full signal length
+    else:  # Rectangular
+        window = np.ones(n)
+        
+    # Apply window and calculate FFT with zero padding for better frequency resolution
+    windowed_signal = signal * window
+    fft_result = np.fft.rfft(windowed_signal, n=n*2)  # 2x zero padding
+    
+    # Calculate magnitude in dB with improved scaling
+    magnitude = 20 * np.log10(np.abs(fft_result) + 1e-10)  # Add small value to avoid log(0)
+    
+    # Calculate frequency bins with proper scaling
+    freq_bins = np.fft.rfftfreq(n*2, d=1/sample_rate)
+    
+    return freq_bins, magnitude
+
+
+def sample_rate_of(time_points, default=1000):
+    """Sample rate of a uniformly sampled time axis"""
+    if len(time_points) > 1:
+        return 1 / (time_points[1] - time_points[0])
+    return default  # Default if we can't determine
+
+
+# Half width, in bins of the 2x zero-padded spectrum, of each window's main lobe
+MAIN_LOBE_BINS = {"Rectangular": 2, "Hamming": 4, "Hann": 4, "Blackman": 6, "Flat Top": 10}
+
+
+def find_peaks(magnitude, min_distance=5, prominence=6.0):
+    """Indices of spectral peaks in a dB magnitude array, strongest first.
+
+    A peak is the highest bin within min_distance bins on either side, which
+    also drops the neighbouring bins of the same lobe, and must rise at least
+    prominence dB above the higher of the lowest points to its left and right
+    within that range.
+    """
+    magnitude = np.asarray(magnitude, dtype=float)
+    if len(magnitude) < 3:
+        return np.array([], dtype=int)
+
+    padded = np.pad(magnitude, min_distance, constant_values=-np.inf)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * min_distance + 1)
+    candidates = magnitude == windows.max(axis=1)
+    # A flat top would report every bin of the plateau; keep its first bin only
+    candidates[1:] &= magnitude[1:] != magnitude[:-1]
+    indices = np.flatnonzero(candidates)
+    if len(indices) == 0:
+        return indices
+
+    # Lowest bin on each side of every candidate; a side past the array edge
+    # does not count, so a peak at DC is measured against its right side alone
+    padded = np.pad(magnitude, min_distance, constant_values=np.inf)
+    side = np.arange(min_distance)
+    left = padded[indices[:, None] + side].min(axis=1)
+    right = padded[indices[:, None] + min_distance + 1 + side].min(axis=1)
+    left[np.isinf(left)] = -np.inf
+    right[np.isinf(right)] = -np.inf
+    prominences = magnitude[indices] - np.maximum(left, right)
+    indices = indices[prominences >= prominence]
+    return indices[np.argsort(magnitude[indices], kind='stable')[::-1]]
+
+
+def interpolate_peaks(freq, magnitude, indices):
+    """Sub-bin (frequency, dB magnitude) of peaks by fitting a parabola through
+    each peak bin and its two neighbours"""
+    indices = np.asarray(indices, dtype=int)
+    freq = np.asarray(freq, dtype=float)
+    magnitude = np.asarray(magnitude, dtype=float)
+    if len(indices) == 0 or len(freq) < 3:
+        return freq[indices], magnitude[indices]
+
+    inner = np.clip(indices, 1, len(magnitude) - 2)
+    a, b, c = magnitude[inner - 1], magnitude[inner], magnitude[inner + 1]
+    denominator = a - 2 * b + c
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset = np.where(denominator != 0, 0.5 * (a - c) / denominator, 0.0)
+    # Peaks on the first or last bin have no neighbour to fit against
+    offset = np.where(inner == indices, np.clip(offset, -0.5, 0.5), 0.0)
+
+    bin_width = freq[1] - freq[0]
+    peak_freq = freq[indices] + offset * bin_width
+    peak_mag = magnitude[indices] - 0.25 * (a - c) * offset
+    return peak_freq, peak_mag
+
+
+def analyze_spectrum(freq, magnitude, window_type="Hann", harmonics=5,
+                     min_distance=5, prominence=6.0):
+    """Measure a dB magnitude spectrum from calculate_fft.
+
+    Returns a dict with the interpolated peaks ('peak_freq', 'peak_mag',
+    strongest first), the 'fundamental' (Hz, dB) as the strongest peak above
+    DC, the 'harmonics' list of (Hz, dB) at its multiples below Nyquist, and
+    'thd' (ratio), 'snr' and 'sinad' (dB). Fields that cannot be measured,
+    such as THD of a pure DC signal, are None.
+    """
+    freq = np.asarray(freq, dtype=float)
+    magnitude = np.asarray(magnitude, dtype=float)
+    result = {
+        'peak_freq': np.array([]), 'peak_mag': np.array([]),
+        'fundamental': None, 'harmonics': [], 'thd': None, 'snr': None, 'sinad': None,
+    }
+    if len(freq) < 3:
+        return result
+
+    peaks = find_peaks(magnitude, min_distance, prominence)
+    result['peak_freq'], result['peak_mag'] = interpolate_peaks(freq, magnitude, peaks)
+
+    # The fundamental must clear the DC lobe
+    lobe = MAIN_LOBE_BINS.get(window_type, 4)
+    ac_peaks = peaks[peaks > lobe]
+    if len(ac_peaks) == 0:
+        return result
+    f0_freq, f0_mag = interpolate_peaks(freq, magnitude, ac_peaks[:1])
+    f0 = f0_freq[0]
+    result['fundamental'] = (f0, f0_mag[0])
+
+    # Harmonic n is the largest bin within one lobe of n * f0
+    bin_width = freq[1] - freq[0]
+    orders = np.arange(2, harmonics + 2)
+    centers = np.rint(orders * f0 / bin_width).astype(int)
+    centers = centers[centers + lobe < len(magnitude)]
+    if len(centers):
+        span = np.arange(-lobe, lobe + 1)
+        rows = centers[:, None] + span
+        harmonic_bins = rows[np.arange(len(rows)), magnitude[rows].argmax(axis=1)]
+        h_freq, h_mag = interpolate_peaks(freq, magnitude, harmonic_bins)
+        result['harmonics'] = list(zip(h_freq, h_mag))
+        amplitudes = 10 ** (h_mag / 20)
+        result['thd'] = np.sqrt(np.sum(amplitudes ** 2)) / 10 ** (f0_mag[0] / 20)
+    else:
+        harmonic_bins = np.array([], dtype=int)
+
+    # Power near the fundamental, near the harmonics and everything else above
+    # DC. Sidelobe leakage counts as noise, so integrate a few lobe widths.
+    band = 4 * lobe
+    span = np.arange(-band, band + 1)
+    power = 10 ** (magnitude / 10)
+    f0_bin = ac_peaks[0]
+    power[:max(min(band, f0_bin - lobe), 0) + 1] = 0.0
+    signal_mask = np.zeros(len(power), dtype=bool)
+    signal_mask[np.clip(f0_bin + span, 0, len(power) - 1)] = True
+    harmonic_mask = np.zeros(len(power), dtype=bool)
+    if len(harmonic_bins):
+        harmonic_mask[np.clip(harmonic_bins[:, None] + span, 0, len(power) - 1).ravel()] = True
+        harmonic_mask &= ~signal_mask
+    signal_power = power[signal_mask].sum()
+    harmonic_power = power[harmonic_mask].sum()
+    noise_power = power[~(signal_mask | harmonic_mask)].sum()
+
+    tiny = np.finfo(float).tiny
+    result['snr'] = 10 * np.log10(signal_power / max(noise_power, tiny))
+    result['sinad'] = 10 * np.log10(signal_power / max(noise_power + harmonic_power, tiny))
+    return result
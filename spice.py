@@ -0,0 +1,315 @@
+"""SPICE netlist import and export for SmartLab circuits.
+
+NetlistReader parses a netlist as a stream, one card per element line with
+'+' continuation lines joined, comments and control statements skipped and
+subcircuit definitions passed over, so a netlist of any length is read in
+constant memory. Element cards map onto SmartLab component types:
+
+    R  Resistor     R1 n1 n2 4.7k
+    C  Capacitor    C1 n1 n2 10u
+    L  Inductor     L1 n1 n2 1m
+    V  Battery      V1 n+ n- DC 9, or AC 9 or SIN(0 9 50) for an AC battery
+    D  Diode        D1 anode cathode model
+    Q  Transistor   Q1 collector base emitter [substrate] model
+
+A transistor is PNP or NPN as its .model card says, wherever in the file
+that card is, or by its model name when there is none. Other element
+types are counted in NetlistReader.skipped.
+"""
+import re
+from collections import namedtuple
+
+# SPICE element letter -> (component name, symbol, pin count)
+ELEMENT_TYPES = {
+    "R": ("Resistor", "R", 2),
+    "C": ("Capacitor", "C", 2),
+    "L": ("Inductor", "L", 2),
+    "V": ("Battery", "V", 2),
+    "D": ("Diode", "D", 2),
+    "Q": ("Transistor", "T", 3),
+}
+ELEMENT_LETTERS = {name: letter for letter, (name, _, _) in ELEMENT_TYPES.items()}
+
+# Property holding each passive's value, in the units SPICE uses
+VALUE_PROPERTIES = {
+    "Resistor": "Resistance (Ω)",
+    "Capacitor": "Capacitance (F)",
+    "Inductor": "Inductance (H)",
+    "Battery": "Voltage (V)",
+}
+
+# Component pin of each node in card order; a BJT card lists collector,
+# base, emitter and the transistor symbol has its base on the left pin
+PIN_ORDER = {"Transistor": (1, 0, 2)}
+
+# Models written for parts that do not name their own
+DEFAULT_MODELS = {"Diode": ("D_DEFAULT", "D"), "NPN": ("Q_NPN", "NPN"), "PNP": ("Q_PNP", "PNP")}
+
+NETLIST_EXTENSIONS = (".cir", ".net", ".sp", ".spice")
+NETLIST_FILTER = f"SPICE Netlists ({' '.join('*' + ext for ext in NETLIST_EXTENSIONS)});;All Files (*)"
+
+SCALE_FACTORS = {"t": 1e12, "g": 1e9, "meg": 1e6, "k": 1e3, "mil": 25.4e-6,
+                 "m": 1e-3, "u": 1e-6, "n": 1e-9, "p": 1e-12, "f": 1e-15}
+ENGINEERING_SUFFIXES = ((1e12, "T"), (1e9, "G"), (1e6, "Meg"), (1e3, "k"), (1, ""),
+                        (1e-3, "m"), (1e-6, "u"), (1e-9, "n"), (1e-12, "p"), (1e-15, "f"))
+# A number, a scale factor and any unit letters; '2N3904' is a model name, not 2n
+_NUMBER = re.compile(r"([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|mil|[tgkmunpf])?[a-zΩ]*",
+                     re.IGNORECASE)
+# Index of the amplitude among a source function's arguments; PWL takes its largest value
+_SOURCE_FUNCTIONS = {"SIN": 1, "SFFM": 1, "PULSE": 1, "EXP": 1, "PWL": None}
+_POLARITIES = ("NPN", "PNP")
+
+# One element: designator, SmartLab component type, node of each component
+# pin in pin order, and the component properties the card sets
+Card = namedtuple("Card", "name component nodes properties")
+
+
+class NetlistError(ValueError):
+    """Raised for an element card that cannot be understood"""
+
+
+def parse_value(text):
+    """Number in SPICE notation: '4.7k' -> 4700.0, '10uF' -> 1e-05; None if not a number"""
+    match = _NUMBER.fullmatch(text)
+    if match is None:
+        return None
+    value = float(match.group(1))
+    suffix = match.group(2)
+    return value * SCALE_FACTORS[suffix.lower()] if suffix else value
+
+
+def format_value(value):
+    """Number in engineering notation: 4700.0 -> '4.7k', 1e-05 -> '10u'"""
+    magnitude = abs(value)
+    for scale, suffix in ENGINEERING_SUFFIXES:
+        if magnitude >= scale:
+            return f"{value / scale:.6g}{suffix}"
+    return f"{value:.6g}"
+
+
+def _property_number(value):
+    """Property text for a number, plain decimal like the component defaults"""
+    return f"{value:.12g}"
+
+
+def _source_level(words):
+    """Voltage and Type of a V card from the words after its nodes.
+
+    A DC value alone, or with an AC magnitude as a small-signal bias, is a
+    DC battery. An AC magnitude with no DC value, or a source function such
+    as SIN or PULSE, makes an AC battery of that amplitude.
+    """
+    dc = ac = amplitude = None
+    for index, word in enumerate(words):
+        upper = word.upper()
+        following = words[index + 1] if index + 1 < len(words) else ""
+        if upper == "DC":
+            dc = parse_value(following)
+        elif upper == "AC":
+            ac = parse_value(following)
+        elif upper in _SOURCE_FUNCTIONS:
+            arguments = []
+            for argument in words[index + 1:]:
+                value = parse_value(argument)
+                if value is None:
+                    break
+                arguments.append(value)
+            position = _SOURCE_FUNCTIONS[upper]
+            if position is None:
+                amplitude = max(arguments[1::2], key=abs, default=0.0)
+            elif position < len(arguments):
+                amplitude = arguments[position]
+        elif index == 0:
+            dc = parse_value(word)
+    if amplitude is not None:
+        return amplitude, "AC"
+    if ac is not None and not dc:
+        return ac, "AC"
+    return dc or 0.0, "DC"
+
+
+def _model_kind(tokens):
+    """(name, kind) of a .model card's tokens, both in upper case, or None"""
+    if len(tokens) < 3:
+        return None
+    return tokens[1].upper(), tokens[2].upper()
+
+
+class NetlistReader:
+    """Iterate the element cards of a netlist, given as lines or a path.
+
+    The first line is the title, as in SPICE. Iteration stops at '.end'.
+    A path or a list of lines is first scanned for .model cards, so
+    transistors take their polarity from a model defined anywhere; a
+    one-pass iterator of lines only knows the models before each card.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.title = ""
+        self.skipped = {}  # element letter -> cards with no SmartLab equivalent
+        self.models = {}   # model name -> kind, such as "PNP", both in upper case
+
+    def __iter__(self):
+        if isinstance(self.source, str):
+            with open(self.source, encoding="utf-8", errors="replace") as f:
+                self._scan_models(f)
+            with open(self.source, encoding="utf-8", errors="replace") as f:
+                yield from self._cards(f)
+        else:
+            if iter(self.source) is not self.source:
+                self._scan_models(self.source)
+            yield from self._cards(self.source)
+
+    def _scan_models(self, lines):
+        for _, statement in self._statements(lines):
+            if statement[:6].upper() == ".MODEL":
+                model = _model_kind(self._tokens(statement))
+                if model is not None:
+                    self.models.setdefault(*model)
+
+    @staticmethod
+    def _tokens(statement):
+        return statement.replace("(", " ").replace(")", " ").replace(",", " ").split()
+
+    def _statements(self, lines):
+        """Logical lines: continuations joined, comments and blank lines dropped"""
+        lines = iter(lines)
+        self.title = next(lines, "").strip()
+        statement, line_number = None, 1
+        for number, line in enumerate(lines, 2):
+            line = line.split(";", 1)[0].rstrip()
+            stripped = line.lstrip()
+            if not stripped or stripped[0] == "*":
+                continue
+            if stripped[0] == "+":
+                if statement is not None:
+                    statement += " " + stripped[1:]
+                continue
+            if statement is not None:
+                yield line_number, statement
+            statement, line_number = stripped, number
+        if statement is not None:
+            yield line_number, statement
+
+    def _cards(self, lines):
+        depth = 0  # Nesting of .subckt definitions being skipped
+        for line_number, statement in self._statements(lines):
+            tokens = self._tokens(statement)
+            head = tokens[0].upper()
+            if head[0] == ".":
+                if head == ".MODEL":
+                    model = _model_kind(tokens)
+                    if model is not None:
+                        self.models.setdefault(*model)
+                elif head == ".SUBCKT":
+                    depth += 1
+                elif head == ".ENDS":
+                    depth = max(0, depth - 1)
+                elif head == ".END" and not depth:
+                    return
+                continue
+            if depth:
+                continue
+            letter = head[0]
+            if letter not in ELEMENT_TYPES:
+                self.skipped[letter] = self.skipped.get(letter, 0) + 1
+                continue
+            try:
+                yield self._card(letter, tokens)
+            except (IndexError, ValueError):
+                raise NetlistError(f"Line {line_number}: cannot read '{statement}'") from None
+
+    def _card(self, letter, tokens):
+        name, symbol, pins = ELEMENT_TYPES[letter]
+        if letter == "Q":
+            # Q c b e [substrate] model: a fifth word followed by a non-number is a substrate node
+            rest = tokens[4:]
+            model = rest[1] if len(rest) > 1 and parse_value(rest[1]) is None and "=" not in rest[1] else rest[0]
+            nodes = tokens[1:4]
+            polarity = self.models.get(model.upper())
+            if polarity not in _POLARITIES:
+                polarity = "PNP" if "PNP" in model.upper() else "NPN"
+            properties = {"Type": polarity, "Model": model}
+        elif letter == "D":
+            nodes = tokens[1:3]
+            properties = {"Model": tokens[3]}
+        elif letter == "V":
+            nodes = tokens[1:3]
+            level, source_type = _source_level(tokens[3:])
+            properties = {"Voltage (V)": _property_number(level), "Type": source_type}
+        else:
+            nodes = tokens[1:3]
+            value = parse_value(tokens[3])
+            if value is None:
+                raise ValueError(tokens[3])
+            properties = {VALUE_PROPERTIES[name]: _property_number(value)}
+        if len(nodes) < pins:
+            raise IndexError(name)
+
+        order = PIN_ORDER.get(name)
+        if order is not None:
+            by_pin = [None] * pins
+            for node, pin in zip(nodes, order):
+                by_pin[pin] = node
+            nodes = by_pin
+        return Card(tokens[0], name, tuple(nodes), properties)
+
+
+def _model(card):
+    """Model a diode or transistor card refers to, and the kind of .model card it needs"""
+    if card.component == "Diode":
+        default, kind = DEFAULT_MODELS["Diode"]
+    else:
+        default, kind = DEFAULT_MODELS["PNP" if card.properties.get("Type") == "PNP" else "NPN"]
+    return card.properties.get("Model") or default, kind
+
+
+def card_line(card):
+    """Element line for a card, or None if its component has no SPICE element"""
+    letter = ELEMENT_LETTERS.get(card.component)
+    if letter is None:
+        return None
+    nodes = card.nodes
+    order = PIN_ORDER.get(card.component)
+    if order is not None:
+        nodes = [nodes[pin] for pin in order]
+    name = card.name if card.name[:1].upper() == letter else f"{letter}{card.name}"
+    properties = card.properties
+    if card.component in ("Diode", "Transistor"):
+        return f"{name} {' '.join(nodes)} {_model(card)[0]}"
+    value = parse_value(str(properties.get(VALUE_PROPERTIES[card.component], "0"))) or 0.0
+    if card.component == "Battery":
+        # An AC battery's voltage is its amplitude, with no DC level under it
+        level = f"DC 0 AC {format_value(value)}" if properties.get("Type") == "AC" else f"DC {format_value(value)}"
+        return f"{name} {' '.join(nodes)} {level}"
+    return f"{name} {' '.join(nodes)} {format_value(value)}"
+
+
+def write_netlist(path, title, cards):
+    """Write cards as a SPICE netlist; returns (written, skipped) card counts.
+
+    Cards whose component has no SPICE element are kept as comments. A
+    model line is added for every model the diodes and transistors use, the
+    first part to use a model deciding its kind, so transistors keep their
+    polarity when read back.
+    """
+    written = skipped = 0
+    models = {}
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(f"{title or 'SmartLab circuit'}\n")
+        for card in cards:
+            line = card_line(card)
+            if line is None:
+                f.write(f"* {card.component} {card.name} ({' '.join(card.nodes)}) has no SPICE element\n")
+                skipped += 1
+                continue
+            f.write(f"{line}\n")
+            written += 1
+            if card.component in ("Diode", "Transistor"):
+                model, kind = _model(card)
+                models.setdefault(model, kind)
+        for model, kind in sorted(models.items()):
+            f.write(f".model {model} {kind}\n")
+        f.write(".end\n")
+    return written, skipped